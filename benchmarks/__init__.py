@@ -0,0 +1 @@
+"""Бенчмарки бота на локальных заглушках внешних сервисов."""
@@ -0,0 +1,73 @@
+"""Сравнивает разбор большого ответа API разными способами.
+
+Запуск: python -m benchmarks.bench_decoding [число работ]
+"""
+import json
+import sys
+import time
+import tracemalloc
+
+import decoding
+from diff import diff_homeworks
+
+
+def make_payload(homeworks_count: int) -> bytes:
+    """Создаёт тело ответа API с заданным числом работ."""
+    return json.dumps({
+        'homeworks': [
+            {
+                'id': number,
+                'homework_name': f'username__homework_{number}.zip',
+                'status': 'approved',
+                'reviewer_comment': 'Всё нравится, ' * 5,
+                'date_updated': '2020-02-13T14:40:57Z',
+                'lesson_name': f'Урок {number}',
+            }
+            for number in range(homeworks_count)
+        ],
+        'current_date': int(time.time()),
+    }, ensure_ascii=False).encode()
+
+
+def measure(name: str, func) -> None:
+    """Печатает время и пиковую память одного способа разбора."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'{name}: {elapsed * 1000:.1f} мс, '
+          f'пик памяти {peak / 2**20:.1f} МиБ')
+
+
+def main() -> None:
+    """Запускает бенчмарк и печатает результаты."""
+    homeworks_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    payload = make_payload(homeworks_count)
+    chunks = [
+        payload[i:i + decoding.STREAM_CHUNK_SIZE]
+        for i in range(0, len(payload), decoding.STREAM_CHUNK_SIZE)
+    ]
+    print(f'работ: {homeworks_count}, размер ответа: '
+          f'{len(payload) / 2**20:.1f} МиБ')
+
+    # Все работы одобрены и уже известны, поэтому изменений нет и
+    # потоковый разбор не накапливает работы в памяти.
+    known = {str(number): 'approved' for number in range(homeworks_count)}
+    measure('json.loads', lambda: diff_homeworks(
+        known, json.loads(payload)['homeworks']
+    ))
+    if decoding.orjson is not None:
+        measure('orjson.loads', lambda: diff_homeworks(
+            known, decoding.orjson.loads(payload)['homeworks']
+        ))
+    else:
+        print('orjson не установлен')
+    measure('потоковый разбор', lambda: diff_homeworks(
+        known, decoding.HomeworkStream(chunks)
+    ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Измеряет скорость поиска изменившихся статусов в большом ответе API.
+
+Запуск: python -m benchmarks.bench_diff [число работ]
+"""
+import random
+import sys
+import time
+
+from diff import diff_homeworks
+
+STATUSES = ('reviewing', 'approved', 'rejected')
+
+
+def main() -> None:
+    """Запускает бенчмарк и печатает результаты."""
+    homeworks_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    homeworks = [
+        {
+            'id': number,
+            'homework_name': f'homework_{number}',
+            'status': random.choice(STATUSES),
+        }
+        for number in range(homeworks_count)
+    ]
+    # Примерно десятая часть работ меняет статус.
+    known = {
+        str(homework['id']): (
+            homework['status'] if random.random() > 0.1 else 'reviewing'
+        )
+        for homework in homeworks
+    }
+
+    rounds = 50
+    start = time.perf_counter()
+    for _ in range(rounds):
+        transitions = diff_homeworks(known, homeworks)
+    elapsed = (time.perf_counter() - start) / rounds
+
+    print(f'работ: {homeworks_count}, изменений: {len(transitions)}')
+    print(f'время сравнения: {elapsed * 1000:.3f} мс, '
+          f'{elapsed / homeworks_count * 1e9:.0f} нс на работу')
+
+
+if __name__ == '__main__':
+    main()
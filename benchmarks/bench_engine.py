@@ -0,0 +1,67 @@
+"""Измеряет, сколько студентов обслуживает PollingEngine на одно ядро.
+
+Запуск: python -m benchmarks.bench_engine [число студентов] [число циклов]
+"""
+import asyncio
+import os
+import sys
+import time
+
+import homework
+import transport
+from engine import PollingEngine, Tenant
+
+from benchmarks.stand_in import PracticumHandler, server_url, start_server
+
+
+class NullBot:
+    """Бот, который никуда не отправляет сообщения."""
+
+    def send_message(self, chat_id, text, **kwargs) -> None:
+        """Игнорирует сообщение."""
+
+
+def main() -> None:
+    """Запускает бенчмарк и печатает результаты."""
+    tenants_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    server = start_server(PracticumHandler)
+    homework.ENDPOINT = server_url(server, '/api/user_api/homework_statuses/')
+    homework.logger.disabled = True
+    transport.configure(keep_alive=True, pool_maxsize=64, concurrency=64)
+
+    tenants = [
+        Tenant(f'token-{number}', str(number))
+        for number in range(tenants_count)
+    ]
+    engine = PollingEngine(tenants, NullBot())
+
+    async def poll_rounds() -> int:
+        polls = 0
+        for _ in range(rounds):
+            polls += await engine.poll_once()
+        return polls
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    polls = asyncio.run(poll_rounds())
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    engine.close()
+    transport.close()
+    server.shutdown()
+
+    print(f'студентов: {tenants_count}, циклов: {rounds}, '
+          f'ядер: {os.cpu_count()}')
+    print(f'опросов в секунду: {polls / wall:.0f}')
+    print(f'опросов на одно ядро в секунду: {polls / cpu:.0f}')
+    # При периоде опроса RETRY_PERIOD одно ядро обслуживает столько
+    # студентов, сколько опросов успевает выполнить за этот период.
+    print('студентов на одно ядро при периоде '
+          f'{homework.RETRY_PERIOD} с: '
+          f'{polls / cpu * homework.RETRY_PERIOD:.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Измеряет скорость расчёта статистики проверок по истории статусов.
+
+Запуск: python -m benchmarks.bench_history [число записей]
+"""
+import random
+import sys
+import tempfile
+import time
+
+import history
+from history import TransitionHistory
+
+BATCH_SIZE = 10000
+START = 1700000000
+
+
+def iso(moment: int) -> str:
+    """Форматирует момент времени, как его отдаёт API."""
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(moment))
+
+
+def transitions(rows: int):
+    """Порождает пары «на проверке» → вердикт для случайных работ."""
+    for number in range(rows // 2):
+        submitted = START + random.randrange(10 ** 7)
+        yield {'id': number, 'homework_name': f'homework_{number}',
+               'status': 'reviewing', 'date_updated': iso(submitted)}
+        yield {'id': number, 'homework_name': f'homework_{number}',
+               'status': random.choice(('approved', 'rejected')),
+               'date_updated': iso(
+                   submitted + random.randrange(60, 3 * 86400)
+               )}
+
+
+def main() -> None:
+    """Запускает бенчмарк и печатает результаты."""
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as directory:
+        store = TransitionHistory(directory)
+        start = time.perf_counter()
+        batch = []
+        for homework in transitions(rows):
+            batch.append(homework)
+            if len(batch) == BATCH_SIZE:
+                store.record('1', batch)
+                batch = []
+        store.record('1', batch)
+        written = time.perf_counter() - start
+        print(f'записей: {rows}, запись: {written:.2f} с')
+
+        numpy = history.load_numpy()
+        for name in ('numpy', 'python'):
+            if name == 'numpy' and numpy is None:
+                print('numpy не установлен')
+                continue
+            history.load_numpy = (
+                (lambda: numpy) if name == 'numpy' else (lambda: None)
+            )
+            start = time.perf_counter()
+            stats = store.stats('1')
+            elapsed = time.perf_counter() - start
+            print(f'{name}: {elapsed * 1000:.1f} мс, '
+                  f'проверок {stats["reviews"]}, '
+                  f'медиана {stats["turnaround"]["p50"]:.0f} с')
+        store.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Прогоняет настоящий main() через локальные заглушки API и Telegram.
+
+Запуск: python -m benchmarks.bench_main --cycles 200 --homeworks 50 \
+    --changed 5 --latency 0.005 --error-rate 0.01
+
+Печатает число циклов опроса в секунду, p50/p99 длительности цикла,
+число отправленных сообщений и пиковое потребление памяти.
+"""
+import argparse
+from functools import partial
+import os
+import resource
+import statistics
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+os.environ.setdefault('PRACTICUM_TOKEN', 'benchmark')
+os.environ.setdefault('TELEGRAM_TOKEN', '1234:benchmark')
+os.environ.setdefault('TELEGRAM_CHAT_ID', '12345')
+
+import telegram  # noqa: E402
+
+import homework  # noqa: E402
+import metrics  # noqa: E402
+
+from benchmarks.stand_in import (  # noqa: E402
+    PracticumHandler, TelegramHandler, make_handler, server_url,
+    start_server
+)
+
+
+class StopBenchmark(Exception):
+    """Прерывает бесконечный цикл main()."""
+
+
+class CycleClock:
+    """Подменяет паузу main() и замеряет длительность циклов."""
+
+    def __init__(self, cycles: int) -> None:
+        """Готовит замер заданного числа циклов."""
+        self.cycles = cycles
+        self.durations = []
+        self.started = time.perf_counter()
+
+    def sleep(self, seconds: float) -> None:
+        """Завершает цикл вместо паузы."""
+        now = time.perf_counter()
+        self.durations.append(now - self.started)
+        if len(self.durations) >= self.cycles:
+            raise StopBenchmark
+        self.started = time.perf_counter()
+
+
+def percentile(values: list, share: float) -> float:
+    """Возвращает перцентиль по отсортированной выборке."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def parse_args() -> argparse.Namespace:
+    """Разбирает параметры бенчмарка."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cycles', type=int, default=200)
+    parser.add_argument('--homeworks', type=int, default=20,
+                        help='число работ в каждом ответе API')
+    parser.add_argument('--changed', type=int, default=1,
+                        help='сколько работ меняет статус в каждом ответе')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='задержка заглушек в секундах')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='доля ответов заглушек с кодом 500')
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Запускает бенчмарк и печатает результаты."""
+    args = parse_args()
+    practicum = start_server(make_handler(
+        PracticumHandler, homeworks=args.homeworks, changed=args.changed,
+        latency=args.latency, error_rate=args.error_rate,
+    ))
+    telegram_handler = make_handler(
+        TelegramHandler, latency=args.latency, error_rate=args.error_rate
+    )
+    bot_api = start_server(telegram_handler)
+
+    homework.ENDPOINT = server_url(
+        practicum, '/api/user_api/homework_statuses/'
+    )
+    homework.logger.disabled = True
+    telegram.Bot = partial(telegram.Bot, base_url=server_url(bot_api, '/bot'))
+    clock = CycleClock(args.cycles)
+    # Подменяется только модуль time внутри homework, чтобы паузы
+    # заглушек и фоновых потоков оставались настоящими.
+    homework.time = SimpleNamespace(
+        time=time.time, monotonic=time.monotonic, sleep=clock.sleep
+    )
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        homework.main()
+    except StopBenchmark:
+        pass
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    practicum.shutdown()
+    bot_api.shutdown()
+
+    durations = clock.durations
+    print(f'циклов: {len(durations)}, работ в ответе: {args.homeworks}, '
+          f'меняют статус: {args.changed}')
+    print(f'циклов в секунду: {len(durations) / elapsed:.1f}')
+    print(f'длительность цикла: p50 {percentile(durations, 0.5) * 1000:.2f} '
+          f'мс, p99 {percentile(durations, 0.99) * 1000:.2f} мс, '
+          f'среднее {statistics.mean(durations) * 1000:.2f} мс')
+    print(f'сообщений отправлено: {telegram_handler.sent}')
+    print(f'пик выделенной памяти: {peak / 1024:.0f} КиБ, '
+          'максимальный RSS: '
+          f'{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss} КиБ')
+    for stage, (_, total, count) in sorted(
+        metrics.snapshot()['histograms'].items()
+    ):
+        print(f'  {stage}: {count} вызовов, '
+              f'в среднем {total / count * 1000:.3f} мс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Замеряет холодный старт бота: импорт модулей и время до первого опроса.
+
+Запуск: python -m benchmarks.bench_startup --runs 10 --top 15
+
+Печатает отчёт `python -X importtime` по самым долгим импортам,
+список тяжёлых зависимостей, загруженных при `import homework`,
+и медиану времени от запуска процесса до первого запроса к API.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.stand_in import PracticumHandler, server_url, start_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ('requests', 'telegram', 'urllib3', 'http.server')
+STARTUP_CODE = (
+    'import sys\n'
+    'import homework\n'
+    'homework.ENDPOINT = sys.argv[1]\n'
+    'homework.main()\n'
+)
+ENVIRONMENT = {
+    'PRACTICUM_TOKEN': 'benchmark',
+    'TELEGRAM_TOKEN': '1234:benchmark',
+    'TELEGRAM_CHAT_ID': '12345',
+}
+
+
+class FirstPollHandler(PracticumHandler):
+    """Отмечает момент первого запроса к заглушке API."""
+
+    polled = threading.Event()
+    arrived = 0.0
+
+    def do_GET(self) -> None:
+        """Фиксирует время запроса и отвечает пустым списком работ."""
+        arrived = time.perf_counter()
+        super().do_GET()
+        if not self.polled.is_set():
+            type(self).arrived = arrived
+            self.polled.set()
+
+    def handle(self) -> None:
+        """Не печатает ошибки соединения после остановки бота."""
+        try:
+            super().handle()
+        except ConnectionError:
+            pass
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    """Запускает интерпретатор из корня проекта."""
+    return subprocess.run(
+        [sys.executable, *args], cwd=ROOT, capture_output=True, text=True,
+        env={**os.environ, **ENVIRONMENT},
+    )
+
+
+def import_report(module: str, top: int) -> None:
+    """Печатает самые долгие импорты по отчёту `-X importtime`.
+
+    Учитываются только импорты, вызванные самим модулем: модули,
+    загруженные интерпретатором при старте, в отчёт не попадают.
+    """
+    result = run_python('-X', 'importtime', '-c', f'import {module}')
+    rows = []
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_time, cumulative, name = line[len('import time:'):].split('|')
+        if name.strip() == module:
+            total = int(cumulative)
+            rows.append((total, int(self_time), name.rstrip()))
+            break
+        # Вложенность импорта обозначается отступом после первого пробела.
+        if name[1:].startswith(' '):
+            rows.append((int(cumulative), int(self_time), name.rstrip()))
+        else:
+            # Модуль верхнего уровня не из дерева импорта `module`.
+            rows = []
+    print(f'import {module}: {total / 1000:.1f} мс')
+    for cumulative, self_time, name in sorted(rows, reverse=True)[:top]:
+        print(f'  {cumulative / 1000:8.1f} мс  (свои {self_time / 1000:6.1f})'
+              f'  {name}')
+
+
+def loaded_heavy_modules(module: str) -> None:
+    """Печатает тяжёлые зависимости, загруженные импортом модуля."""
+    result = run_python('-c', (
+        f'import sys, {module}\n'
+        f'print(" ".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    ))
+    print('тяжёлые зависимости после импорта: '
+          f'{result.stdout.strip() or "не загружены"}')
+
+
+def time_to_first_poll(url: str) -> float:
+    """Возвращает время от запуска процесса до первого запроса к API."""
+    FirstPollHandler.polled.clear()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-c', STARTUP_CODE, url], cwd=ROOT,
+        env={**os.environ, **ENVIRONMENT},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        if not FirstPollHandler.polled.wait(timeout=30):
+            raise RuntimeError('Бот не обратился к API за 30 секунд.')
+        return FirstPollHandler.arrived - started
+    finally:
+        process.kill()
+        process.wait()
+
+
+def parse_args() -> argparse.Namespace:
+    """Разбирает параметры бенчмарка."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10,
+                        help='число запусков для замера первого опроса')
+    parser.add_argument('--top', type=int, default=15,
+                        help='сколько самых долгих импортов показать')
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Запускает бенчмарк и печатает результаты."""
+    args = parse_args()
+    import_report('homework', args.top)
+    loaded_heavy_modules('homework')
+
+    server = start_server(FirstPollHandler)
+    url = server_url(server, '/api/user_api/homework_statuses/')
+    durations = [time_to_first_poll(url) for _ in range(args.runs)]
+    server.shutdown()
+    print(f'время до первого опроса: медиана '
+          f'{statistics.median(durations) * 1000:.1f} мс, '
+          f'минимум {min(durations) * 1000:.1f} мс, '
+          f'максимум {max(durations) * 1000:.1f} мс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""Сравнивает запросы с новым соединением и через общую сессию.
+
+Запуск: python -m benchmarks.bench_transport [число запросов]
+"""
+import sys
+import time
+
+import transport
+
+from benchmarks.stand_in import PracticumHandler, server_url, start_server
+
+
+def measure(requests_count: int, url: str) -> float:
+    """Возвращает среднее время одного запроса в миллисекундах."""
+    start = time.perf_counter()
+    for _ in range(requests_count):
+        transport.get(url, params={'from_date': 0}).json()
+    return (time.perf_counter() - start) / requests_count * 1000
+
+
+def main() -> None:
+    """Запускает бенчмарк и печатает результаты."""
+    requests_count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    server = start_server(PracticumHandler)
+    url = server_url(server)
+
+    transport.configure(keep_alive=False)
+    fresh = measure(requests_count, url)
+    transport.configure(keep_alive=True)
+    pooled = measure(requests_count, url)
+    transport.close()
+    server.shutdown()
+
+    print(f'новое соединение: {fresh:.3f} мс/запрос')
+    print(f'общая сессия: {pooled:.3f} мс/запрос')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Измеряет стоимость проверки одной работы в пакете.
+
+Запуск: python -m benchmarks.bench_validation [число работ]
+"""
+import sys
+import time
+
+from homework import HOMEWORK_SCHEMA, RESPONSE_SCHEMA, parse_status
+
+STATUSES = ('reviewing', 'approved', 'rejected')
+
+
+def per_record(func, records: list, rounds: int = 20) -> float:
+    """Возвращает среднее время обработки одной работы в наносекундах."""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(records)
+    return (time.perf_counter() - start) / rounds / len(records) * 1e9
+
+
+def main() -> None:
+    """Запускает бенчмарк и печатает результаты."""
+    homeworks_count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    homeworks = [
+        {
+            'id': number,
+            'homework_name': f'homework_{number}',
+            'status': STATUSES[number % len(STATUSES)],
+        }
+        for number in range(homeworks_count)
+    ]
+    response = {'homeworks': homeworks, 'current_date': 0}
+
+    def validate_response(records):
+        RESPONSE_SCHEMA.validate(response)
+
+    def parse_each(records):
+        for record in records:
+            parse_status(record)
+
+    def validate_each(records):
+        for record in records:
+            HOMEWORK_SCHEMA.validate(record)
+
+    print(f'работ в пакете: {homeworks_count}')
+    print('проверка пакета за один проход: '
+          f'{per_record(HOMEWORK_SCHEMA.partition, homeworks):.0f} нс/работу')
+    print('проверка каждой работы отдельно: '
+          f'{per_record(validate_each, homeworks):.0f} нс/работу')
+    print('parse_status для каждой работы: '
+          f'{per_record(parse_each, homeworks):.0f} нс/работу')
+    print('проверка ответа целиком: '
+          f'{per_record(validate_response, homeworks):.2f} нс/работу')
+
+
+if __name__ == '__main__':
+    main()
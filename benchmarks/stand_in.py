@@ -0,0 +1,118 @@
+"""Локальные заглушки внешних сервисов для бенчмарков."""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import itertools
+import json
+import random
+import threading
+import time
+
+STATUSES = ('reviewing', 'rejected', 'approved')
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Общая часть заглушек: задержка, ошибки и ответ в JSON."""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    latency = 0.0
+    error_rate = 0.0
+
+    def send_json(self, data: dict, status: int = 200) -> None:
+        """Отправляет JSON-ответ с заданным кодом."""
+        body = json.dumps(data, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def simulate_network(self) -> bool:
+        """Ждёт заданную задержку и решает, вернуть ли ошибку."""
+        if self.latency:
+            time.sleep(self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            self.send_json({'code': 'server_error'}, status=500)
+            return False
+        return True
+
+    def log_message(self, format: str, *args) -> None:
+        """Отключает журнал запросов сервера."""
+
+
+class PracticumHandler(StandInHandler):
+    """Отвечает как эндпоинт homework_statuses.
+
+    В ответе `homeworks` работ, у первых `changed` из них статус
+    меняется с каждым запросом.
+    """
+
+    homeworks = 0
+    changed = 0
+    counter = itertools.count()
+
+    def do_GET(self) -> None:
+        """Возвращает список домашних работ."""
+        if not self.simulate_network():
+            return
+        request_number = next(self.counter)
+        homeworks = []
+        for number in range(self.homeworks):
+            shift = request_number if number < self.changed else 0
+            homeworks.append({
+                'id': number,
+                'homework_name': f'username__homework_{number}.zip',
+                'status': STATUSES[(number + shift) % len(STATUSES)],
+                'reviewer_comment': 'Комментарий ревьюера',
+                'date_updated': '2020-02-13T14:40:57Z',
+                'lesson_name': f'Урок {number}',
+            })
+        self.send_json(
+            {'homeworks': homeworks, 'current_date': int(time.time())}
+        )
+
+
+class TelegramHandler(StandInHandler):
+    """Отвечает как метод sendMessage Bot API."""
+
+    sent = 0
+    lock = threading.Lock()
+
+    def do_POST(self) -> None:
+        """Принимает сообщение и возвращает объект Message."""
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+        if not self.simulate_network():
+            return
+        with self.lock:
+            type(self).sent += 1
+            message_id = type(self).sent
+        self.send_json({'ok': True, 'result': {
+            'message_id': message_id,
+            'date': int(time.time()),
+            'chat': {'id': int(payload.get('chat_id', 0)), 'type': 'private'},
+            'text': payload.get('text', ''),
+        }})
+
+
+def make_handler(base: type, **options) -> type:
+    """Создаёт класс заглушки с заданными параметрами."""
+    attributes = dict(options)
+    if base is TelegramHandler:
+        attributes['sent'] = 0
+    if base is PracticumHandler:
+        attributes['counter'] = itertools.count()
+    return type(base.__name__, (base,), attributes)
+
+
+def start_server(handler: type) -> ThreadingHTTPServer:
+    """Запускает сервер-заглушку на свободном порту в фоновом потоке."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def server_url(server: ThreadingHTTPServer, path: str = '/') -> str:
+    """Возвращает адрес запущенного сервера-заглушки."""
+    host, port = server.server_address[:2]
+    return f'http://{host}:{port}{path}'
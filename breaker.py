@@ -0,0 +1,178 @@
+import logging
+import random
+import threading
+import time
+import zlib
+from typing import Callable, Optional
+
+import metrics
+from settings import env_flag, env_float, env_int
+
+CIRCUIT_BREAKER = env_flag('CIRCUIT_BREAKER')
+BREAKER_FAILURE_THRESHOLD = env_int('BREAKER_FAILURE_THRESHOLD', 5)
+BREAKER_RECOVERY_TIMEOUT = env_float('BREAKER_RECOVERY_TIMEOUT', 60)
+BREAKER_MAX_RECOVERY_TIMEOUT = env_float('BREAKER_MAX_RECOVERY_TIMEOUT', 900)
+BREAKER_RECOVERY_JITTER = env_float('BREAKER_RECOVERY_JITTER', 0.2)
+BREAKER_RAMP = env_float('BREAKER_RAMP', 60)
+
+CLOSED = 'closed'
+HALF_OPEN = 'half_open'
+OPEN = 'open'
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+logger = logging.getLogger('homework_bot.breaker')
+
+
+def stagger_share(key: str) -> float:
+    """Возвращает устойчивую долю ключа в интервале [0, 1)."""
+    return zlib.crc32(key.encode()) / 2 ** 32
+
+
+def always_failure(error: Exception) -> bool:
+    """Считает сбоем сервиса любую ошибку."""
+    return True
+
+
+class CircuitBreaker:
+    """Предохранитель вызовов внешнего сервиса.
+
+    В замкнутом состоянии вызовы проходят, а сбои считаются подряд.
+    После `failure_threshold` сбоев предохранитель размыкается, и
+    вызовы отклоняются без обращения к сервису. По истечении паузы
+    пропускается один пробный вызов: успех замыкает предохранитель,
+    сбой снова размыкает его с удвоенной паузой.
+
+    Чтобы после восстановления все вызовы не обрушились на сервис
+    разом, пауза размыкания случайно удлиняется на долю `jitter`,
+    а в течение `ramp` секунд после замыкания ключи пропускаются
+    постепенно: ключ с долей `stagger_share` 0.3 возвращается через
+    0.3·`ramp` секунд. Ключ, чей пробный вызов замкнул
+    предохранитель, пропускается сразу.
+    """
+
+    def __init__(self, name: str, enabled: bool = CIRCUIT_BREAKER,
+                 failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 recovery_timeout: float = BREAKER_RECOVERY_TIMEOUT,
+                 max_recovery_timeout: float = BREAKER_MAX_RECOVERY_TIMEOUT,
+                 jitter: float = BREAKER_RECOVERY_JITTER,
+                 ramp: float = BREAKER_RAMP,
+                 is_failure: Callable[[Exception], bool] = always_failure,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Создаёт замкнутый предохранитель сервиса `name`."""
+        self.name = name
+        self.enabled = enabled
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.max_recovery_timeout = max_recovery_timeout
+        self.jitter = jitter
+        self.ramp = ramp
+        self.is_failure = is_failure
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.trips = 0
+        self.retry_at = 0.0
+        self.closed_at = float('-inf')
+        self._probe_started: Optional[float] = None
+        self._probe_key: Optional[str] = None
+        self._recovered_key: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def allow(self, key: str = '') -> bool:
+        """Проверяет, можно ли сейчас обратиться к сервису."""
+        if not self.enabled:
+            return True
+        with self._lock:
+            allowed = self._allow(key, self.clock())
+        if not allowed:
+            metrics.increment('circuit_rejections_total', self.name,
+                              label_name='circuit')
+        return allowed
+
+    def _allow(self, key: str, now: float) -> bool:
+        if self.state == CLOSED:
+            return self._ramp_wait(key, now) == 0
+        if self.state == OPEN:
+            if now < self.retry_at:
+                return False
+            self._set_state(HALF_OPEN)
+            logger.debug('Предохранитель %s пропускает пробный запрос.',
+                         self.name)
+        elif (self._probe_started is not None
+              and now - self._probe_started < self.recovery_timeout):
+            return False
+        self._probe_started = now
+        self._probe_key = key
+        return True
+
+    def _ramp_wait(self, key: str, now: float) -> float:
+        if key == self._recovered_key:
+            return 0.0
+        admitted_at = self.closed_at + stagger_share(key) * self.ramp
+        return max(0.0, admitted_at - now)
+
+    def retry_in(self, key: str = '') -> float:
+        """Возвращает, через сколько секунд ключ пропустят к сервису."""
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            now = self.clock()
+            if self.state == CLOSED:
+                return self._ramp_wait(key, now)
+            if self.state == OPEN:
+                return max(0.0, self.retry_at - now)
+            if self._probe_started is None:
+                return 0.0
+            return max(
+                0.0, self._probe_started + self.recovery_timeout - now
+            )
+
+    def record(self, error: Optional[Exception] = None) -> None:
+        """Учитывает исход вызова: сбой сервиса или ответ от него."""
+        if error is not None and self.is_failure(error):
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def record_success(self) -> None:
+        """Учитывает ответ сервиса."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.failures = 0
+            if self.state == CLOSED:
+                return
+            self.trips = 0
+            self._probe_started = None
+            self._recovered_key = self._probe_key
+            self.closed_at = self.clock()
+            self._set_state(CLOSED)
+        logger.info('Предохранитель %s замкнут, сервис снова доступен.',
+                    self.name)
+
+    def record_failure(self) -> None:
+        """Учитывает сбой сервиса и при необходимости размыкает цепь."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.failures += 1
+            if (self.state == CLOSED
+                    and self.failures < self.failure_threshold):
+                return
+            timeout = min(self.recovery_timeout * 2 ** self.trips,
+                          self.max_recovery_timeout)
+            timeout *= random.uniform(1, 1 + self.jitter)
+            self.trips += 1
+            self._probe_started = None
+            self.retry_at = self.clock() + timeout
+            self._set_state(OPEN)
+            failures = self.failures
+        logger.error(
+            'Сбой в работе программы: предохранитель %s разомкнут после '
+            '%d сбоев подряд, пробный запрос через %.0f с.',
+            self.name, failures, timeout,
+        )
+
+    def _set_state(self, state: str) -> None:
+        self.state = state
+        metrics.set_gauge(f'{self.name}_circuit_state', STATE_CODES[state])
@@ -0,0 +1,86 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+import metrics
+from settings import env_float
+
+COALESCE_TTL = env_float('COALESCE_TTL', 5)
+
+T = TypeVar('T')
+
+
+class RequestCoalescer:
+    """Объединяет одинаковые запросы к API в один.
+
+    Пока запрос с ключом `key` выполняется, остальные обращения с тем
+    же ключом ждут его результата, а не отправляют свой запрос.
+    Успешный ответ ещё `ttl` секунд отдаётся из кэша, так что студенты
+    с одним токеном, опрашиваемые в одном окне, получают один ответ.
+    Ошибка передаётся всем ожидающим, но не кэшируется.
+    """
+
+    def __init__(self, ttl: float = COALESCE_TTL,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Создаёт пустой кэш ответов."""
+        self.ttl = ttl
+        self.clock = clock
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._results: Dict[Hashable, Tuple[float, object]] = {}
+
+    def _cached(self, key: Hashable, now: float):
+        expires, value = self._results.get(key, (now, None))
+        if expires > now:
+            return True, value
+        return False, None
+
+    def _store(self, key: Hashable, value, now: float) -> None:
+        self._results = {
+            known: entry for known, entry in self._results.items()
+            if entry[0] > now
+        }
+        if self.ttl > 0:
+            self._results[key] = (now + self.ttl, value)
+
+    async def _follow(self, future: asyncio.Future):
+        try:
+            return True, await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                raise
+        # Запрос ведущего отменён: обращение повторяется само.
+        return False, None
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Возвращает результат `func` для `key`, объединяя обращения."""
+        while True:
+            hit, value = self._cached(key, self.clock())
+            if hit:
+                metrics.increment('api_coalesced_total', 'cache',
+                                  label_name='source')
+                return value
+            future = self._calls.get(key)
+            if future is None:
+                break
+            metrics.increment('api_coalesced_total', 'in_flight',
+                              label_name='source')
+            done, value = await self._follow(future)
+            if done:
+                return value
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            value = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            # Без ожидающих исключение иначе попало бы в журнал asyncio.
+            future.exception()
+            raise
+        finally:
+            del self._calls[key]
+        self._store(key, value, self.clock())
+        future.set_result(value)
+        return value
@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+from collections import deque
+import logging
+import threading
+import time
+from typing import (
+    TYPE_CHECKING, Callable, Deque, Dict, Iterable, Mapping, Optional, Tuple
+)
+
+from settings import env_flag, env_float, env_int
+from state import homework_key
+
+if TYPE_CHECKING:
+    import telegram
+
+BOT_COMMANDS = env_flag('BOT_COMMANDS')
+SNAPSHOT_TTL = env_float('SNAPSHOT_TTL', 900)
+COMMANDS_POLL_TIMEOUT = env_int('COMMANDS_POLL_TIMEOUT', 30)
+COMMANDS_RETRY_DELAY = 5
+HISTORY_SIZE = env_int('HISTORY_SIZE', 20)
+
+logger = logging.getLogger('homework_bot.commands')
+
+
+class SnapshotCache:
+    """Снимок последних известных статусов работ по чатам.
+
+    Снимок обновляет цикл опроса API, а команды бота читают только
+    его, поэтому запросы пользователей не порождают запросов к API.
+    Устаревший снимок всё равно отдаётся сразу, а его обновление
+    запрашивается у цикла опроса.
+    """
+
+    def __init__(self, verdicts: Mapping[str, str],
+                 ttl: float = SNAPSHOT_TTL,
+                 history_size: int = HISTORY_SIZE) -> None:
+        """Создаёт пустой снимок."""
+        self.verdicts = verdicts
+        self.ttl = ttl
+        self.history_size = history_size
+        self._homeworks: Dict[str, Dict[str, dict]] = {}
+        self._history: Dict[str, Deque[Tuple[float, str, str]]] = {}
+        self._fetched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def update(self, chat_id: str, homeworks: Iterable[dict],
+               now: Optional[float] = None) -> None:
+        """Учитывает очередной успешный ответ API для чата."""
+        now = time.time() if now is None else now
+        with self._lock:
+            known = self._homeworks.setdefault(chat_id, {})
+            for homework in homeworks:
+                if (isinstance(homework, dict) and 'status' in homework
+                        and 'homework_name' in homework):
+                    known[homework_key(homework)] = homework
+            self._fetched[chat_id] = now
+
+    def record_transition(self, chat_id: str, homework: dict,
+                          now: Optional[float] = None) -> None:
+        """Добавляет отправленное изменение статуса в историю чата."""
+        now = time.time() if now is None else now
+        with self._lock:
+            history = self._history.get(chat_id)
+            if history is None:
+                history = deque(maxlen=self.history_size)
+                self._history[chat_id] = history
+            history.append(
+                (now, str(homework['homework_name']), homework['status'])
+            )
+
+    def is_stale(self, chat_id: str, now: Optional[float] = None) -> bool:
+        """Проверяет, что снимок чата старше `ttl` или отсутствует."""
+        now = time.time() if now is None else now
+        fetched = self._fetched.get(chat_id)
+        return fetched is None or now - fetched > self.ttl
+
+    def _verdict(self, status: str) -> str:
+        return self.verdicts.get(status, status)
+
+    def status(self, chat_id: str) -> str:
+        """Готовит ответ на команду /status."""
+        with self._lock:
+            homeworks = list(self._homeworks.get(chat_id, {}).values())
+            fetched = self._fetched.get(chat_id)
+        if fetched is None:
+            return 'Данных о работах пока нет, они появятся после опроса API.'
+        lines = [f'Статусы работ на {format_time(fetched)}:']
+        lines.extend(
+            f'{homework["homework_name"]}: {self._verdict(homework["status"])}'
+            for homework in homeworks
+        )
+        if not homeworks:
+            lines.append('Изменений статусов пока не было.')
+        return '\n'.join(lines)
+
+    def history(self, chat_id: str) -> str:
+        """Готовит ответ на команду /history."""
+        with self._lock:
+            history = list(self._history.get(chat_id, ()))
+        if not history:
+            return 'История изменений статусов пока пуста.'
+        lines = ['Последние изменения статусов:']
+        lines.extend(
+            f'{format_time(moment)} {name}: {self._verdict(status)}'
+            for moment, name, status in history
+        )
+        return '\n'.join(lines)
+
+
+def format_time(moment: float) -> str:
+    """Форматирует момент времени для ответа пользователю."""
+    return time.strftime('%d.%m %H:%M', time.localtime(moment))
+
+
+class CommandListener:
+    """Получает команды бота длинным опросом getUpdates.
+
+    Ответы берутся из `SnapshotCache`. Если снимок чата устарел,
+    ответ всё равно отправляется сразу, а `on_stale` просит цикл
+    опроса обновить данные при ближайшей возможности. С `stats`
+    бот отвечает и на команду /stats.
+    """
+
+    def __init__(self, bot: telegram.Bot, snapshots: SnapshotCache,
+                 send: Callable[[str, str], None],
+                 chat_ids: Iterable[str],
+                 on_stale: Optional[Callable[[str], None]] = None,
+                 timeout: int = COMMANDS_POLL_TIMEOUT,
+                 stats: Optional[Callable[[str], str]] = None) -> None:
+        """Создаёт обработчик команд для разрешённых чатов."""
+        self.bot = bot
+        self.snapshots = snapshots
+        self.send = send
+        self.set_chat_ids(chat_ids)
+        self.on_stale = on_stale
+        self.timeout = timeout
+        self.offset: Optional[int] = None
+        self.handlers = {
+            '/status': snapshots.status,
+            '/history': snapshots.history,
+        }
+        if stats is not None:
+            self.handlers['/stats'] = stats
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def set_chat_ids(self, chat_ids: Iterable[str]) -> None:
+        """Меняет чаты, из которых принимаются команды."""
+        self.chat_ids = frozenset(str(chat_id) for chat_id in chat_ids)
+
+    def start(self) -> 'CommandListener':
+        """Запускает фоновый поток получения команд."""
+        self._thread = threading.Thread(
+            target=self._run, name='telegram-commands', daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def handle(self, chat_id: str, text: str) -> Optional[str]:
+        """Отвечает на команду и возвращает текст ответа."""
+        chat_id = str(chat_id)
+        if chat_id not in self.chat_ids or not text:
+            return None
+        command = text.split(maxsplit=1)[0].split('@', 1)[0].lower()
+        handler = self.handlers.get(command)
+        if handler is None:
+            return None
+        answer = handler(chat_id)
+        self.send(chat_id, answer)
+        if self.on_stale is not None and self.snapshots.is_stale(chat_id):
+            self.on_stale(chat_id)
+        return answer
+
+    def poll(self) -> int:
+        """Получает и обрабатывает одну пачку обновлений."""
+        updates = self.bot.get_updates(
+            offset=self.offset, timeout=self.timeout,
+            allowed_updates=['message'],
+        )
+        for update in updates:
+            self.offset = update.update_id + 1
+            message = update.effective_message
+            if message is not None:
+                self.handle(message.chat_id, message.text)
+        return len(updates)
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self.poll()
+            except Exception as error:
+                logger.error('Сбой при получении команд бота: %s', error)
+                self._stopped.wait(COMMANDS_RETRY_DELAY)
+
+    def stop(self) -> None:
+        """Останавливает получение команд."""
+        self._stopped.set()
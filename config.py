@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import signal
+import threading
+from typing import (
+    TYPE_CHECKING, Callable, Dict, Generic, Iterable, List, Mapping,
+    Optional, TypeVar
+)
+
+from dotenv import dotenv_values
+
+import metrics
+from exceptions import EnvironmentParameterError
+from settings import env_flag, env_float, env_str
+
+if TYPE_CHECKING:
+    from templates import Renderer
+
+CONFIG_RELOAD = env_flag('CONFIG_RELOAD')
+CONFIG_FILE = env_str('CONFIG_FILE', '.env')
+CONFIG_WATCH_INTERVAL = env_float('CONFIG_WATCH_INTERVAL', 5)
+TELEGRAM_TOKEN_PATTERN = re.compile(r'\d+:[\w-]+')
+
+logger = logging.getLogger('homework_bot.config')
+
+T = TypeVar('T')
+
+
+def read_values(path: str = CONFIG_FILE) -> Dict[str, str]:
+    """Читает переменные окружения вместе с текущим env-файлом.
+
+    Значения из файла важнее унаследованных процессом: иначе
+    сменить в файле токен, уже загруженный при запуске, было бы нельзя.
+    """
+    values = dict(os.environ)
+    if path and os.path.exists(path):
+        values.update(
+            (name, value) for name, value in dotenv_values(path).items()
+            if value is not None
+        )
+    return values
+
+
+def validate_values(values: Mapping[str, str],
+                    required: Iterable[str]) -> None:
+    """Проверяет, что новые настройки можно применить."""
+    for name in required:
+        if not values.get(name):
+            raise EnvironmentParameterError(
+                f"Отсутствует обязательная переменная окружения: '{name}'."
+            )
+    token = values.get('TELEGRAM_TOKEN')
+    if token and not TELEGRAM_TOKEN_PATTERN.fullmatch(token):
+        raise EnvironmentParameterError(
+            "Значение 'TELEGRAM_TOKEN' не похоже на токен бота."
+        )
+
+
+class Config:
+    """Проверенный снимок настроек, который применяется целиком."""
+
+    def __init__(self, values: Mapping[str, str], renderer: Renderer,
+                 tenants: Optional[List] = None) -> None:
+        """Запоминает токены, отрисовщик сообщений и список студентов."""
+        self.practicum_token = values.get('PRACTICUM_TOKEN')
+        self.telegram_token = values.get('TELEGRAM_TOKEN')
+        self.telegram_chat_id = values.get('TELEGRAM_CHAT_ID')
+        self.renderer = renderer
+        self.tenants = tenants
+
+    @property
+    def headers(self) -> dict:
+        """Возвращает заголовки запроса к API с токеном Практикума."""
+        return {'Authorization': f'OAuth {self.practicum_token}'}
+
+
+class ConfigReloader(Generic[T]):
+    """Перечитывает настройки по SIGHUP или при изменении файлов.
+
+    Чтение и проверка выполняются в фоновом потоке, а цикл опроса
+    между итерациями лишь забирает готовый снимок методом `take`.
+    Поэтому новые настройки применяются целиком и не замедляют опрос,
+    а при ошибке в них продолжают действовать прежние.
+    """
+
+    def __init__(self, load: Callable[[], T], paths: Iterable[str] = (),
+                 interval: float = CONFIG_WATCH_INTERVAL,
+                 enabled: bool = CONFIG_RELOAD) -> None:
+        """Готовит перечитывание функцией `load` и слежение за `paths`."""
+        self.load = load
+        self.enabled = enabled
+        self.paths = [path for path in paths if path]
+        self.interval = interval
+        self._mtimes = self._stat()
+        self._pending: Optional[T] = None
+        self._lock = threading.Lock()
+        self._requested = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def _stat(self) -> Dict[str, Optional[int]]:
+        mtimes = {}
+        for path in self.paths:
+            try:
+                mtimes[path] = os.stat(path).st_mtime_ns
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+
+    def start(self) -> 'ConfigReloader':
+        """Запускает фоновый поток и обработку SIGHUP, если они включены."""
+        if not self.enabled:
+            return self
+        if (hasattr(signal, 'SIGHUP')
+                and threading.current_thread() is threading.main_thread()):
+            signal.signal(signal.SIGHUP, lambda signum, frame: self.request())
+        self._thread = threading.Thread(
+            target=self._run, name='config-reload', daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def request(self) -> None:
+        """Просит перечитать настройки; годится для обработчика сигнала."""
+        self._requested.set()
+
+    def changed(self) -> bool:
+        """Проверяет, изменились ли отслеживаемые файлы."""
+        mtimes = self._stat()
+        if mtimes == self._mtimes:
+            return False
+        self._mtimes = mtimes
+        return True
+
+    def _run(self) -> None:
+        while True:
+            self._requested.wait(self.interval or None)
+            if self._stopped:
+                return
+            if self._requested.is_set() or self.changed():
+                self._requested.clear()
+                self.reload()
+
+    def reload(self) -> bool:
+        """Читает и проверяет настройки, откладывая их до `take`."""
+        try:
+            config = self.load()
+        except Exception as error:
+            metrics.increment('config_reloads_total', 'rejected',
+                              label_name='result')
+            logger.error('Сбой в работе программы: новые настройки '
+                         'не применены: %s', error)
+            return False
+        with self._lock:
+            self._pending = config
+        logger.debug('Новые настройки проверены и ждут применения.')
+        return True
+
+    def take(self) -> Optional[T]:
+        """Возвращает проверенный снимок настроек, если он появился."""
+        with self._lock:
+            config, self._pending = self._pending, None
+        if config is not None:
+            metrics.increment('config_reloads_total', 'applied',
+                              label_name='result')
+        return config
+
+    def stop(self) -> None:
+        """Останавливает фоновый поток."""
+        self._stopped = True
+        self._requested.set()
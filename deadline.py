@@ -0,0 +1,80 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+from typing import Callable, Iterator, Optional
+
+from exceptions import DeadlineExceededError
+from settings import env_float
+
+CYCLE_DEADLINE = env_float('CYCLE_DEADLINE', 60)
+
+_current: ContextVar[Optional['Deadline']] = ContextVar(
+    'deadline', default=None
+)
+
+
+class Deadline:
+    """Бюджет времени одного цикла опроса."""
+
+    def __init__(self, budget: float,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Отсчитывает `budget` секунд от текущего момента."""
+        self.clock = clock
+        self.expires_at = clock() + budget
+
+    def remaining(self) -> float:
+        """Возвращает оставшееся время в секундах."""
+        return self.expires_at - self.clock()
+
+    def timeout(self, limit: float, floor: float = 0.0) -> float:
+        """Ограничивает таймаут операции оставшимся временем.
+
+        Таймаут не становится меньше `floor`, даже если бюджет уже
+        исчерпан.
+        """
+        return min(limit, max(self.remaining(), floor))
+
+
+@contextmanager
+def scope(budget: float = CYCLE_DEADLINE) -> Iterator[Optional[Deadline]]:
+    """Задаёт бюджет времени для всех операций ввода-вывода в блоке.
+
+    Бюджет хранится в контекстной переменной, поэтому доходит и до
+    функций с фиксированной сигнатурой вроде `get_api_answer`. Без
+    бюджета действуют только таймауты отдельных операций.
+    """
+    if not budget:
+        yield None
+        return
+    deadline = Deadline(budget)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def current() -> Optional[Deadline]:
+    """Возвращает бюджет текущего цикла, если он задан."""
+    return _current.get()
+
+
+def check(operation: str) -> None:
+    """Выбрасывает `DeadlineExceededError`, если бюджет исчерпан."""
+    deadline = _current.get()
+    if deadline is not None and deadline.remaining() <= 0:
+        raise DeadlineExceededError(
+            f'Бюджет времени цикла исчерпан, {operation} пропущен.'
+        )
+
+
+def remaining() -> float:
+    """Возвращает остаток бюджета текущего цикла или бесконечность."""
+    deadline = _current.get()
+    return float('inf') if deadline is None else deadline.remaining()
+
+
+def timeout(limit: float, floor: float = 0.0) -> float:
+    """Возвращает таймаут операции с учётом бюджета текущего цикла."""
+    deadline = _current.get()
+    return limit if deadline is None else deadline.timeout(limit, floor)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import codecs
+import json
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional
+
+from exceptions import ResponseJsonError, ResponseKeyError
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if TYPE_CHECKING:
+    import requests
+
+STREAM_CHUNK_SIZE = 64 * 1024
+WHITESPACE = ' \t\n\r'
+
+_decoder = json.JSONDecoder()
+
+
+def loads(data: bytes):
+    """Разбирает JSON быстрым парсером, если он установлен."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def decode_response(response: requests.Response):
+    """Возвращает тело ответа API, разобранное из JSON.
+
+    Для настоящего `requests.Response` тело разбирается напрямую из
+    байтов; для прочих объектов, похожих на ответ, вызывается `json()`.
+    """
+    import requests
+
+    if isinstance(response, requests.Response):
+        return loads(response.content)
+    return response.json()
+
+
+class HomeworkStream:
+    """Потоково разбирает ответ API и отдаёт работы по одной.
+
+    Полный список `homeworks` в памяти не строится: из буфера
+    разбирается очередная работа, после чего прочитанная часть
+    отбрасывается. Значение `current_date` становится доступным,
+    когда разборщик до него дошёл.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        """Создаёт разборщик поверх итератора байтовых кусков."""
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._position = 0
+        self._eof = False
+        self.current_date: Optional[int] = None
+        self.has_homeworks = False
+
+    def _read(self) -> bool:
+        """Дочитывает следующий кусок, возвращает False в конце данных."""
+        if self._eof:
+            return False
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self._eof = True
+            self._buffer += self._utf8.decode(b'', final=True)
+            return False
+        self._buffer = self._buffer[self._position:] + self._utf8.decode(
+            chunk
+        )
+        self._position = 0
+        return True
+
+    def _peek(self) -> str:
+        """Возвращает следующий значащий символ, пропуская пробелы."""
+        while True:
+            while (self._position < len(self._buffer)
+                   and self._buffer[self._position] in WHITESPACE):
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._read():
+                raise ResponseJsonError(
+                    'Данные в response не соответсвуют формату JSON.'
+                )
+
+    def _expect(self, symbols: str) -> str:
+        symbol = self._peek()
+        if symbol not in symbols:
+            raise ResponseJsonError(
+                'Данные в response не соответсвуют формату JSON.'
+            )
+        self._position += 1
+        return symbol
+
+    def _value(self):
+        """Разбирает очередное значение, дочитывая данные при нехватке."""
+        self._peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if self._read():
+                    continue
+                raise ResponseJsonError(
+                    'Данные в response не соответсвуют формату JSON.'
+                )
+            # Число в конце буфера может продолжиться в следующем куске.
+            if end == len(self._buffer) and self._read():
+                continue
+            self._position = end
+            return value
+
+    def __iter__(self) -> Iterator[dict]:
+        """Отдаёт работы из ответа по одной."""
+        if self._peek() != '{':
+            raise TypeError("Полученные данные "
+                            "'response' не в виде словаря.")
+        self._position += 1
+        if self._peek() == '}':
+            self._position += 1
+        else:
+            while True:
+                key = self._value()
+                self._expect(':')
+                if key == 'homeworks':
+                    yield from self._homeworks()
+                elif key == 'current_date':
+                    self.current_date = self._value()
+                else:
+                    self._value()
+                if self._expect(',}') == '}':
+                    break
+        if not self.has_homeworks:
+            raise ResponseKeyError("Отсутвует ожидаемый ключ 'homeworks'.")
+
+    def _homeworks(self) -> Iterator[dict]:
+        self.has_homeworks = True
+        if self._peek() != '[':
+            raise TypeError("Полученные данные под ключом "
+                            "'homeworks' не в виде списка.")
+        self._position += 1
+        if self._peek() == ']':
+            self._position += 1
+            return
+        while True:
+            yield self._value()
+            if self._expect(',]') == ']':
+                return
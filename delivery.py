@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+import metrics
+import transport
+from settings import env_flag, env_float
+from templates import FormattedMessage, send_options
+
+if TYPE_CHECKING:
+    import telegram
+
+    from breaker import CircuitBreaker
+
+TELEGRAM_QUEUE = env_flag('TELEGRAM_QUEUE')
+TELEGRAM_GLOBAL_RATE = env_float('TELEGRAM_GLOBAL_RATE', 25)
+TELEGRAM_CHAT_RATE = env_float('TELEGRAM_CHAT_RATE', 1)
+TELEGRAM_CHAT_BURST = env_float('TELEGRAM_CHAT_BURST', 3)
+TELEGRAM_QUEUE_CLOSE_TIMEOUT = env_float('TELEGRAM_QUEUE_CLOSE_TIMEOUT', 10)
+TELEGRAM_MESSAGE_LIMIT = 4096
+MESSAGE_SEPARATOR = '\n\n'
+
+logger = logging.getLogger('homework_bot.delivery')
+
+
+class TokenBucket:
+    """Ограничивает частоту событий алгоритмом «ведро с токенами»."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """Создаёт полное ведро на `capacity` токенов."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    def wait_time(self) -> float:
+        """Возвращает, сколько секунд ждать до появления токена."""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        """Забирает один токен."""
+        self._refill()
+        self.tokens -= 1
+
+
+def coalesce(messages: List[str],
+             limit: int = TELEGRAM_MESSAGE_LIMIT) -> List[str]:
+    """Склеивает сообщения в как можно меньшее число частей до `limit`.
+
+    Склеиваются только соседние сообщения с одинаковым режимом
+    разметки, режим сохраняется у получившихся частей.
+    """
+    parts = []
+    current = ''
+    mode = None
+    for message in messages:
+        message_mode = getattr(message, 'parse_mode', None)
+        candidate = (
+            f'{current}{MESSAGE_SEPARATOR}{message}' if current else message
+        )
+        if len(candidate) <= limit and message_mode == mode:
+            current = candidate
+            continue
+        if current:
+            parts.append(with_mode(current, mode))
+        current = message
+        mode = message_mode
+        while len(current) > limit:
+            parts.append(with_mode(current[:limit], mode))
+            current = current[limit:]
+    if current:
+        parts.append(with_mode(current, mode))
+    return parts
+
+
+def with_mode(text: str, parse_mode: Optional[str]) -> str:
+    """Привязывает к тексту режим разметки, если он задан."""
+    if parse_mode is None:
+        return str(text)
+    return FormattedMessage(text, parse_mode)
+
+
+class DeliveryQueue:
+    """Очередь исходящих сообщений Telegram с ограничением частоты.
+
+    Повторяет интерфейс `send_message` бота: вызов лишь ставит
+    сообщение в очередь, а доставка идёт в фоновом потоке. Ожидающие
+    сообщения одного чата склеиваются в одно, частота отправки
+    ограничивается для каждого чата и для бота в целом. Пока
+    предохранитель `breaker` разомкнут, сообщения ждут в очереди.
+    Переданный с сообщением `on_done` вызывается с результатом
+    доставки пачки, в которую попало сообщение.
+    """
+
+    def __init__(self, bot: telegram.Bot,
+                 global_rate: float = TELEGRAM_GLOBAL_RATE,
+                 chat_rate: float = TELEGRAM_CHAT_RATE,
+                 chat_burst: float = TELEGRAM_CHAT_BURST,
+                 breaker: Optional[CircuitBreaker] = None) -> None:
+        """Создаёт очередь поверх настоящего бота."""
+        self.bot = bot
+        self.breaker = breaker
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._pending: 'OrderedDict[str, List[str]]' = OrderedDict()
+        self._receipts: Dict[str, List[Callable[[bool], None]]] = {}
+        self._in_flight: Dict[str, List[Callable[[bool], None]]] = {}
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'DeliveryQueue':
+        """Запускает фоновый поток доставки."""
+        self._thread = threading.Thread(
+            target=self._run, name='telegram-delivery', daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def send_message(self, chat_id: str, text: str,
+                     on_done: Optional[Callable[[bool], None]] = None,
+                     **kwargs) -> None:
+        """Ставит сообщение в очередь на отправку."""
+        with self._condition:
+            self._pending.setdefault(str(chat_id), []).append(text)
+            if on_done is not None:
+                self._receipts.setdefault(str(chat_id), []).append(on_done)
+            self._condition.notify()
+
+    def pending(self) -> int:
+        """Возвращает число чатов с неотправленными сообщениями."""
+        with self._condition:
+            return len(self._pending)
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _next_batch(self):
+        """Выбирает первый чат, которому уже можно отправить сообщение.
+
+        Возвращает пару (чат, сообщения) либо время ожидания.
+        """
+        wait = None
+        for chat_id in self._pending:
+            chat_wait = self._chat_bucket(chat_id).wait_time()
+            if self.breaker is not None:
+                chat_wait = max(chat_wait, self.breaker.retry_in(chat_id))
+            if chat_wait == 0:
+                self._in_flight[chat_id] = self._receipts.pop(chat_id, [])
+                return chat_id, self._pending.pop(chat_id)
+            wait = chat_wait if wait is None else min(wait, chat_wait)
+        return None, wait
+
+    def _drop_held(self) -> List[Callable[[bool], None]]:
+        """Снимает с очереди чаты, которые держит предохранитель.
+
+        Вызывается после `close`: ждать восстановления Telegram при
+        остановке нельзя, а сообщения с журналом останутся в нём и
+        будут отправлены после перезапуска.
+        """
+        receipts: List[Callable[[bool], None]] = []
+        if self.breaker is None:
+            return receipts
+        for chat_id in list(self._pending):
+            if self.breaker.retry_in(chat_id) > 0:
+                dropped = self._pending.pop(chat_id)
+                receipts.extend(self._receipts.pop(chat_id, []))
+                logger.warning(
+                    'Telegram недоступен, при остановке не отправлено '
+                    'сообщений в чат %s: %d.', chat_id, len(dropped)
+                )
+        return receipts
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._pending and not self._closed:
+                    self._condition.wait()
+                dropped = self._drop_held() if self._closed else []
+                if not self._pending and not dropped:
+                    return
+                chat_id, batch = self._next_batch()
+                if chat_id is None and not dropped:
+                    self._condition.wait(timeout=batch)
+                    continue
+            for on_done in dropped:
+                on_done(False)
+            if chat_id is not None:
+                self._deliver(chat_id, batch)
+
+    def _requeue(self, chat_id: str, messages: List[str],
+                 receipts: List[Callable[[bool], None]]) -> None:
+        """Возвращает неотправленные сообщения в начало очереди."""
+        with self._condition:
+            self._pending[chat_id] = messages + self._pending.get(chat_id, [])
+            self._pending.move_to_end(chat_id, last=False)
+            if receipts:
+                self._receipts[chat_id] = (
+                    receipts + self._receipts.get(chat_id, [])
+                )
+
+    def _deliver(self, chat_id: str, messages: List[str]) -> None:
+        receipts = self._in_flight.pop(chat_id, [])
+        parts = coalesce(messages)
+        delivered = True
+        for index, text in enumerate(parts):
+            if self.breaker is not None and not self.breaker.allow(chat_id):
+                self._requeue(chat_id, parts[index:], receipts)
+                return
+            time.sleep(self.global_bucket.wait_time())
+            self.global_bucket.consume()
+            self._chat_bucket(chat_id).consume()
+            try:
+                with metrics.timer('send_message'):
+                    self.bot.send_message(
+                        chat_id, text, timeout=transport.telegram_timeout(),
+                        **send_options(text)
+                    )
+                logger.debug('Бот отправил сообщение "%s"', text)
+            except Exception as error:
+                delivered = False
+                logger.error(
+                    'При отправке сообщения выдало ошибку "%s"', error
+                )
+                if self.breaker is not None:
+                    self.breaker.record(error)
+            else:
+                if self.breaker is not None:
+                    self.breaker.record()
+        for on_done in receipts:
+            on_done(delivered)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Дожидается отправки очереди и останавливает поток.
+
+        Сообщения чатов, которые держит предохранитель, не ждут его
+        восстановления и отбрасываются.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,38 @@
+from typing import Callable, Iterable, List, Mapping, Tuple
+
+from state import homework_key
+from validation import Schema
+
+
+def diff_homeworks(known: Mapping[str, str],
+                   homeworks: Iterable[dict]) -> List[dict]:
+    """Возвращает домашние работы, статус которых изменился.
+
+    API отдаёт работы от новых к старым, поэтому для каждой работы
+    учитывается первая запись, а изменения возвращаются в
+    хронологическом порядке.
+    """
+    seen = set()
+    transitions = []
+    for homework in homeworks:
+        key = homework_key(homework)
+        if key in seen:
+            continue
+        seen.add(key)
+        if known.get(key) != homework.get('status'):
+            transitions.append(homework)
+    transitions.reverse()
+    return transitions
+
+
+def render_transitions(
+    transitions: Iterable[dict], schema: Schema,
+    render: Callable[[dict], str]
+) -> Tuple[List[Tuple[dict, str]], List[Exception]]:
+    """Проверяет работы пакетом и готовит сообщения для корректных.
+
+    Некорректные работы не мешают остальным: их ошибки возвращаются
+    отдельным списком.
+    """
+    valid, errors = schema.partition(transitions)
+    return [(homework, render(homework)) for homework in valid], errors
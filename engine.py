@@ -0,0 +1,586 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import functools
+import json
+import random
+import time
+from typing import (
+    TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Tuple
+)
+
+import deadline
+import metrics
+import transport
+from coalescing import RequestCoalescer
+from commands import BOT_COMMANDS, CommandListener
+from config import CONFIG_FILE, CONFIG_RELOAD, Config, ConfigReloader
+from delivery import (
+    TELEGRAM_GLOBAL_RATE, TELEGRAM_QUEUE, TELEGRAM_QUEUE_CLOSE_TIMEOUT,
+    DeliveryQueue,
+)
+from diff import diff_homeworks
+from error_digest import ErrorAggregator
+from exceptions import EnvironmentParameterError, StateStoreError
+from fanout import parse_chat_ids
+from governor import admitted, tenant_priority
+from homework import (
+    FANOUT, GOVERNOR, HISTORY, RETRY_PERIOD, SNAPSHOTS,
+    TELEGRAM_BREAKER, TELEGRAM_TOKEN, apply_config, check_response,
+    deliver_outbox, init_logger, load_config, logger, rebind_bot,
+    render_homeworks, request_api_answer, send_message_to_chat,
+    send_message_to_chats, stream_api_answer
+)
+from metrics import METRICS_PORT
+from outbox import OUTBOX_FILE, Outbox, open_outbox
+from scheduler import PollScheduler
+from settings import env_flag, env_int, env_str
+from state import STATE_FILE, STATE_FLUSH_INTERVAL, StateStore
+from templates import TEMPLATES_FILE
+
+TENANTS_FILE = env_str('TENANTS_FILE', 'tenants.json')
+MAX_CONCURRENT_REQUESTS = env_int('MAX_CONCURRENT_REQUESTS', 64)
+JSON_STREAMING = env_flag('JSON_STREAMING')
+
+if TYPE_CHECKING:
+    import telegram
+
+
+class Tenant:
+    """Состояние опроса API для одной пары токен/чат.
+
+    Сообщения отправляются во все чаты `destinations`; первый из них,
+    `chat_id`, — основной: по нему хранится состояние опроса.
+    """
+
+    def __init__(self, practicum_token: str, chat_id: str,
+                 timestamp: Optional[int] = None,
+                 destinations: Optional[List[str]] = None) -> None:
+        """Создаёт состояние студента с собственной меткой времени."""
+        self.scheduler = PollScheduler(RETRY_PERIOD)
+        self.set_token(practicum_token)
+        self.chat_id = chat_id
+        self.destinations = destinations or [chat_id]
+        self.timestamp = (
+            int(time.time()) if timestamp is None else timestamp
+        )
+        self.errors = ErrorAggregator()
+        self.retry_period = RETRY_PERIOD
+        self.wake: Optional[asyncio.Event] = None
+
+    def set_token(self, practicum_token: str) -> None:
+        """Меняет токен студента, не сбрасывая состояние опроса.
+
+        Разброс пауз планировщика зависит от токена, поэтому чаты
+        одного студента опрашиваются в одно время.
+        """
+        self.practicum_token = practicum_token
+        self.headers = {'Authorization': f'OAuth {practicum_token}'}
+        self.scheduler.random.seed(practicum_token)
+
+    def __repr__(self) -> str:
+        """Возвращает представление студента без токена."""
+        return f'Tenant(chat_id={self.chat_id!r})'
+
+
+def read_tenants(path: str) -> List[Tenant]:
+    """Читает и проверяет список студентов из JSON-файла."""
+    try:
+        with open(path, encoding='utf-8') as file:
+            records = json.load(file)
+    except (OSError, ValueError) as error:
+        raise EnvironmentParameterError(
+            f"Не удалось прочитать файл '{path}' со списком студентов: "
+            f'{error}.'
+        )
+
+    tenants = []
+    for record in records:
+        chat_ids = parse_chat_ids(record.get('chat_id'))
+        if not record.get('practicum_token') or not chat_ids:
+            raise EnvironmentParameterError(
+                'В файле со списком студентов отсутствует '
+                "'practicum_token' или 'chat_id'."
+            )
+        tenants.append(Tenant(
+            record['practicum_token'], chat_ids[0], destinations=chat_ids
+        ))
+    return tenants
+
+
+def load_tenants(path: str) -> List[Tenant]:
+    """Загружает список студентов при запуске бота."""
+    try:
+        return read_tenants(path)
+    except EnvironmentParameterError as error:
+        logger.critical('%s Программа принудительно остановлена.', error)
+        raise
+
+
+class PollingEngine:
+    """Асинхронно опрашивает API для множества студентов в одном процессе.
+
+    Блокирующие запросы к API и Telegram выполняются в пуле потоков,
+    семафор ограничивает число одновременных запросов. С журналом
+    `outbox` сообщения о новых статусах отправляются через него.
+    Одинаковые запросы студентов с общим токеном объединяются.
+    """
+
+    def __init__(self, tenants: Iterable[Tenant], bot: telegram.Bot,
+                 max_concurrency: int = MAX_CONCURRENT_REQUESTS,
+                 request: Callable[[dict, int], dict] = request_api_answer,
+                 state: Optional[StateStore] = None,
+                 stream: bool = JSON_STREAMING,
+                 outbox: Optional[Outbox] = None,
+                 ) -> None:
+        """Создаёт движок с пулом потоков для блокирующих запросов."""
+        self.tenants = list(tenants)
+        self._index_tokens()
+        self.bot = bot
+        self.state = state or StateStore()
+        self.outbox = outbox
+        for tenant in self.tenants:
+            self._restore_cursor(tenant)
+        self.request = request
+        self.stream = stream
+        self.max_concurrency = max_concurrency
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.coalescer = RequestCoalescer()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _index_tokens(self) -> None:
+        self._by_token: Dict[str, List[Tenant]] = {}
+        for tenant in self.tenants:
+            self._by_token.setdefault(tenant.practicum_token, []).append(
+                tenant
+            )
+
+    def _shared_cursor(self, tenant: Tenant) -> int:
+        """Возвращает самый ранний курсор среди чатов токена студента."""
+        return min(
+            (known.timestamp
+             for known in self._by_token.get(tenant.practicum_token, ())),
+            default=tenant.timestamp,
+        )
+
+    def _restore_cursor(self, tenant: Tenant) -> None:
+        tenant.timestamp = self.state.get_cursor(
+            tenant.chat_id, tenant.timestamp
+        )
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        """Создаёт семафор внутри работающего цикла событий."""
+        loop = asyncio.get_running_loop()
+        if self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _in_thread(self, func: Callable, *args):
+        """Выполняет блокирующую функцию в пуле потоков.
+
+        Функция видит контекст задачи, в том числе бюджет времени
+        текущего цикла опроса студента.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(context.run, func, *args)
+        )
+
+    async def send(self, tenant: Tenant, message: str) -> None:
+        """Отправляет сообщение во все чаты студента."""
+        await self._in_thread(
+            send_message_to_chats, self.bot, tenant.destinations, message
+        )
+
+    def stream_transitions(self,
+                           tenant: Tenant) -> Tuple[list, Optional[int]]:
+        """Разбирает работы из потокового ответа API по одной.
+
+        Полный список работ в памяти не строится.
+        """
+        known = self.state.statuses(tenant.chat_id)
+        homeworks = stream_api_answer(tenant.headers, tenant.timestamp)
+        return diff_homeworks(known, homeworks), homeworks.current_date
+
+    async def _request_api(self, tenant: Tenant, func: Callable, *args):
+        """Дожидается очереди запросов к API и вызывает `func` в пуле."""
+        await GOVERNOR.acquire_async(
+            tenant_priority(self.state.statuses(tenant.chat_id).values()),
+            deadline.remaining(),
+        )
+        async with self.semaphore:
+            with admitted():
+                return await self._in_thread(func, *args)
+
+    async def _fetch_shared(self, tenant: Tenant,
+                            cursor: int) -> Tuple[int, dict]:
+        response = await self._request_api(
+            tenant, self.request, tenant.headers, cursor
+        )
+        return cursor, response
+
+    async def fetch_transitions(self,
+                                tenant: Tenant) -> Tuple[list, Optional[int]]:
+        """Запрашивает API и находит работы студента с новым статусом.
+
+        Чаты с одним токеном получают ответ одного запроса с самого
+        раннего из их курсоров, а новые статусы сравниваются для
+        каждого чата. Ответ с более позднего курсора, чем у студента,
+        не подходит, и тогда студент запрашивает API сам.
+        """
+        if self.stream:
+            return await self._request_api(
+                tenant, self.stream_transitions, tenant
+            )
+        cursor, response = await self.coalescer.do(
+            tenant.practicum_token,
+            functools.partial(
+                self._fetch_shared, tenant, self._shared_cursor(tenant)
+            ),
+        )
+        if cursor > tenant.timestamp:
+            response = await self._request_api(
+                tenant, self.request, tenant.headers, tenant.timestamp
+            )
+        homeworks = check_response(response)
+        known = self.state.statuses(tenant.chat_id)
+        return diff_homeworks(known, homeworks), response.get('current_date')
+
+    async def notify_transitions(self, tenant: Tenant,
+                                 transitions: list) -> int:
+        """Отправляет студенту сообщения обо всех изменившихся статусах.
+
+        Запись в журнал сообщений и в историю идёт в пуле потоков, чтобы
+        медленный диск не задерживал опрос остальных студентов.
+        """
+        messages, errors = render_homeworks(transitions)
+        if self.outbox is not None and messages:
+            await self._in_thread(
+                self.append_outbox, tenant,
+                [message for _, message in messages],
+            )
+        for homework, message in messages:
+            if self.outbox is None:
+                await self.send(tenant, message)
+            self.state.set_status(tenant.chat_id, homework)
+            SNAPSHOTS.record_transition(tenant.chat_id, homework)
+        if messages:
+            await self._in_thread(
+                HISTORY.record, tenant.chat_id,
+                [homework for homework, _ in messages],
+            )
+        await self.deliver_outbox()
+        if errors:
+            raise errors[0]
+        return len(messages)
+
+    def append_outbox(self, tenant: Tenant, messages: List[str]) -> None:
+        """Записывает сообщения для всех чатов студента в журнал."""
+        for message in messages:
+            for chat_id in tenant.destinations:
+                self.outbox.append(chat_id, message)
+
+    async def poll_tenant(self, tenant: Tenant) -> None:
+        """Выполняет один цикл опроса API для студента.
+
+        Все запросы цикла укладываются в общий бюджет времени.
+        """
+        with deadline.scope():
+            await self._poll_tenant(tenant)
+
+    async def _poll_tenant(self, tenant: Tenant) -> None:
+        try:
+            transitions, current_date = await self.fetch_transitions(tenant)
+            if current_date is not None:
+                tenant.timestamp = current_date
+            self.state.set_cursor(tenant.chat_id, tenant.timestamp)
+            SNAPSHOTS.update(tenant.chat_id, transitions)
+            changed = await self.notify_transitions(tenant, transitions)
+            tenant.scheduler.record_success(
+                changed, self.state.statuses(tenant.chat_id).values()
+            )
+
+        except Exception as error:
+            tenant.scheduler.record_error()
+            message = tenant.errors.record(error)
+            if message:
+                await self.send(tenant, message)
+
+        for digest in tenant.errors.pop_digests():
+            await self.send(tenant, digest)
+
+    async def poll_once(self) -> int:
+        """Опрашивает всех студентов один раз и возвращает их число."""
+        await asyncio.gather(
+            *(self.poll_tenant(tenant) for tenant in self.tenants)
+        )
+        await self.flush_state()
+        return len(self.tenants)
+
+    async def flush_state(self, force: bool = False) -> None:
+        """Записывает накопленное состояние на диск в пуле потоков."""
+        try:
+            await self._in_thread(self.state.flush, force)
+        except StateStoreError as error:
+            logger.error('Сбой в работе программы: %s', error)
+
+    async def deliver_outbox(self) -> None:
+        """Отправляет недоставленные сообщения из журнала в пуле потоков."""
+        if self.outbox is not None:
+            await self._in_thread(deliver_outbox, self.bot, self.outbox)
+
+    async def run_flusher(self) -> None:
+        """Периодически записывает состояние всех студентов пакетом.
+
+        Заодно повторяет отправку сообщений, не доставленных из-за
+        сбоя Telegram.
+        """
+        while True:
+            await self.deliver_outbox()
+            await asyncio.sleep(self.state.flush_interval)
+            await self.flush_state()
+
+    async def run_tenant(self, tenant: Tenant) -> None:
+        """Бесконечно опрашивает API для одного студента."""
+        # Первые запросы размазываются по периоду, чтобы не создавать
+        # одновременную нагрузку на API при старте. Сдвиг зависит от
+        # токена: чаты одного студента опрашиваются вместе, и их
+        # запросы объединяются.
+        offset = random.Random(tenant.practicum_token).uniform(
+            0, tenant.retry_period
+        )
+        self._loop = asyncio.get_running_loop()
+        tenant.wake = asyncio.Event()
+        await asyncio.sleep(offset)
+        while True:
+            await self.poll_tenant(tenant)
+            await self.pause(tenant, tenant.scheduler.next_delay())
+
+    async def pause(self, tenant: Tenant, delay: float) -> None:
+        """Ждёт следующего опроса студента, пока его не ускорят.
+
+        После `expedite` опрос происходит не позже чем через
+        `POLL_FLOOR` секунд от начала паузы.
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        wake_at = started + delay
+        while True:
+            remaining = wake_at - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(tenant.wake.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+            tenant.wake.clear()
+            wake_at = min(wake_at, started + tenant.scheduler.floor)
+        tenant.scheduler.expedited = False
+
+    async def run_lag_monitor(self, interval: float = 1.0) -> None:
+        """Измеряет задержку цикла событий относительно ожидаемой паузы."""
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            metrics.set_gauge(
+                'event_loop_lag_seconds', loop.time() - started - interval
+            )
+
+    async def run_reloader(self, reloader: ConfigReloader,
+                           apply: Callable[[Config], None],
+                           interval: float = 1.0) -> None:
+        """Применяет перечитанные настройки между опросами."""
+        while True:
+            await asyncio.sleep(interval)
+            config = reloader.take()
+            if config is not None:
+                apply(config)
+
+    def _start_tenant(self, tenant: Tenant) -> None:
+        self._tasks[tenant.chat_id] = asyncio.get_running_loop().create_task(
+            self.run_tenant(tenant)
+        )
+
+    def update_tenants(self, tenants: Iterable[Tenant]) -> None:
+        """Применяет новый список студентов, не прерывая опрос остальных.
+
+        Новые студенты начинают опрашиваться сразу, удалённые перестают.
+        У оставшихся сохраняются курсор, планировщик и накопленные
+        ошибки, меняются только токен и список чатов для сообщений.
+        """
+        current = {tenant.chat_id: tenant for tenant in self.tenants}
+        updated = []
+        for tenant in tenants:
+            known = current.pop(tenant.chat_id, None)
+            if known is None:
+                self._restore_cursor(tenant)
+                self._start_tenant(tenant)
+                known = tenant
+            else:
+                if known.practicum_token != tenant.practicum_token:
+                    known.set_token(tenant.practicum_token)
+                known.destinations = tenant.destinations
+            updated.append(known)
+        for tenant in current.values():
+            task = self._tasks.pop(tenant.chat_id, None)
+            if task is not None:
+                task.cancel()
+        self.tenants = updated
+        self._index_tokens()
+        logger.debug('Список студентов обновлён: опрашивается %d, '
+                     'исключено %d.', len(updated), len(current))
+
+    async def run(self, reloader: Optional[ConfigReloader] = None,
+                  apply: Optional[Callable[[Config], None]] = None) -> None:
+        """Запускает опрос всех студентов.
+
+        С `reloader` перечитанные настройки передаются в `apply`.
+        """
+        for tenant in self.tenants:
+            self._start_tenant(tenant)
+        background = [self.run_flusher(), self.run_lag_monitor()]
+        if reloader is not None:
+            background.append(self.run_reloader(reloader, apply))
+        try:
+            await asyncio.gather(*background)
+        finally:
+            for task in self._tasks.values():
+                task.cancel()
+
+    def expedite(self, chat_id: str) -> None:
+        """Просит ускорить следующий опрос API для чата.
+
+        Опрос ускоряется для всех чатов того же токена, чтобы их
+        запросы и дальше объединялись. Вызывается и из потока команд
+        бота: текущая пауза прерывается через цикл событий.
+        """
+        tokens = {
+            tenant.practicum_token for tenant in self.tenants
+            if tenant.chat_id == chat_id
+        }
+        for token in tokens:
+            for tenant in self._by_token.get(token, ()):
+                tenant.scheduler.expedite()
+                if self._loop is not None and tenant.wake is not None:
+                    self._loop.call_soon_threadsafe(tenant.wake.set)
+
+    def close(self) -> None:
+        """Освобождает пул потоков."""
+        self._executor.shutdown(wait=False)
+
+
+def main() -> None:
+    """Запускает многопользовательский режим бота."""
+    init_logger()
+    if not TELEGRAM_TOKEN:
+        logger.critical(
+            "Отсутствует обязательная переменная окружения: "
+            "'TELEGRAM_TOKEN'. Программа принудительно остановлена."
+        )
+        raise EnvironmentParameterError(
+            "Отсутствует обязательная переменная окружения: "
+            "'TELEGRAM_TOKEN'. Программа принудительно остановлена."
+        )
+    serve(
+        load_tenants(TENANTS_FILE),
+        StateStore(STATE_FILE, STATE_FLUSH_INTERVAL),
+        reload_tenants=lambda: read_tenants(TENANTS_FILE),
+        outbox=open_outbox(OUTBOX_FILE),
+    )
+
+
+def apply_engine_config(config: Config, engine: PollingEngine,
+                        listener: Optional[CommandListener]) -> None:
+    """Применяет перечитанные настройки к работающему движку."""
+    if apply_config(config):
+        import telegram
+
+        telegram_bot = telegram.Bot(
+            token=config.telegram_token,
+            request=transport.telegram_request(MAX_CONCURRENT_REQUESTS),
+        )
+        engine.bot = rebind_bot(engine.bot, telegram_bot)
+        if listener is not None:
+            listener.bot = telegram_bot
+    engine.update_tenants(config.tenants)
+    if listener is not None:
+        listener.set_chat_ids(tenant.chat_id for tenant in engine.tenants)
+
+
+def serve(tenants: List[Tenant], state: StateStore,
+          metrics_port: str = METRICS_PORT, commands: bool = BOT_COMMANDS,
+          global_rate: float = TELEGRAM_GLOBAL_RATE,
+          reload_tenants: Optional[Callable[[], List[Tenant]]] = None,
+          outbox: Optional[Outbox] = None) -> None:
+    """Опрашивает API для списка студентов, пока процесс не остановят.
+
+    Используется и отдельным процессом, и каждым рабочим процессом
+    супервизора со своей долей студентов. `reload_tenants` заново
+    читает список студентов при перечитывании настроек, `outbox` —
+    журнал исходящих сообщений процесса.
+    """
+    transport.configure(keep_alive=True,
+                        pool_maxsize=MAX_CONCURRENT_REQUESTS,
+                        concurrency=MAX_CONCURRENT_REQUESTS)
+    import telegram
+
+    bot = telegram.Bot(
+        token=TELEGRAM_TOKEN,
+        request=transport.telegram_request(MAX_CONCURRENT_REQUESTS),
+    )
+    telegram_bot = bot
+    if TELEGRAM_QUEUE:
+        bot = DeliveryQueue(
+            bot, global_rate=global_rate, breaker=TELEGRAM_BREAKER
+        ).start()
+    if metrics_port:
+        metrics.start_server(int(metrics_port))
+    engine = PollingEngine(tenants, bot, state=state, outbox=outbox)
+    reloader = ConfigReloader(
+        lambda: load_config(('TELEGRAM_TOKEN',), reload_tenants()),
+        (CONFIG_FILE, TEMPLATES_FILE, TENANTS_FILE),
+        enabled=CONFIG_RELOAD and reload_tenants is not None,
+    ).start()
+    listener = None
+    if commands:
+        listener = CommandListener(
+            telegram_bot, SNAPSHOTS,
+            send=lambda chat_id, text: send_message_to_chat(
+                engine.bot, chat_id, text
+            ),
+            chat_ids=[tenant.chat_id for tenant in tenants],
+            on_stale=engine.expedite,
+            stats=HISTORY.report if HISTORY.path else None,
+        ).start()
+    logger.debug('Запущен опрос API для %d студентов.', len(tenants))
+    try:
+        asyncio.run(engine.run(
+            reloader,
+            lambda config: apply_engine_config(config, engine, listener),
+        ))
+    finally:
+        engine.state.flush(force=True)
+        HISTORY.close()
+        engine.close()
+        reloader.stop()
+        if listener is not None:
+            listener.stop()
+        if TELEGRAM_QUEUE:
+            bot.close(TELEGRAM_QUEUE_CLOSE_TIMEOUT)
+        FANOUT.close()
+        if outbox is not None:
+            outbox.close()
+        transport.close()
+
+
+if __name__ == '__main__':
+    main()
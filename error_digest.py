@@ -0,0 +1,63 @@
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from settings import env_float
+
+ERROR_DIGEST_WINDOW = env_float('ERROR_DIGEST_WINDOW', 3600)
+
+NUMBER_PATTERN = re.compile(r'\d+')
+
+
+def fingerprint(error: Exception) -> Tuple[str, str]:
+    """Возвращает отпечаток ошибки: тип и сообщение без чисел."""
+    return type(error).__name__, NUMBER_PATTERN.sub('N', str(error))
+
+
+class ErrorAggregator:
+    """Группирует повторяющиеся ошибки по отпечаткам.
+
+    О первой ошибке с новым отпечатком сообщается сразу, повторы
+    в течение окна `window` только подсчитываются, а по истечении
+    окна по каждому отпечатку отправляется одна сводка. Окно без
+    повторов закрывается, и следующая такая ошибка снова считается новой.
+    """
+
+    def __init__(self, window: float = ERROR_DIGEST_WINDOW) -> None:
+        """Создаёт пустой агрегатор с окном `window` секунд."""
+        self.window = window
+        self._windows: Dict[Tuple[str, str], dict] = {}
+
+    def record(self, error: Exception,
+               now: Optional[float] = None) -> Optional[str]:
+        """Учитывает ошибку и возвращает сообщение для немедленной отправки."""
+        now = time.monotonic() if now is None else now
+        key = fingerprint(error)
+        window = self._windows.get(key)
+        if window is None:
+            self._windows[key] = {'started': now, 'repeats': 0,
+                                  'last': str(error)}
+            return f'Сбой в работе программы: {error}'
+        window['repeats'] += 1
+        window['last'] = str(error)
+        return None
+
+    def pop_digests(self, now: Optional[float] = None) -> List[str]:
+        """Возвращает сводки по окнам, время которых истекло."""
+        now = time.monotonic() if now is None else now
+        digests = []
+        for key, window in list(self._windows.items()):
+            if now - window['started'] < self.window:
+                continue
+            if not window['repeats']:
+                del self._windows[key]
+                continue
+            digests.append(
+                f'Сбой в работе программы: {window["last"]} '
+                f'(повторился {window["repeats"]} раз за '
+                f'{int(self.window // 60)} мин.)'
+            )
+            # Пока ошибка повторяется, о ней сообщают только сводки.
+            self._windows[key] = {'started': now, 'repeats': 0,
+                                  'last': window['last']}
+        return digests
@@ -10,6 +10,12 @@ class RequestStatusCodeError(Exception):
     pass
 
 
+class RateLimitedError(RequestStatusCodeError):
+    """Исключение при ответе API о превышении частоты запросов."""
+
+    pass
+
+
 class RequestError(Exception):
     """Обработка исключения 'requests.RequestException'."""
 
@@ -38,3 +44,33 @@ class ResponseJsonError(Exception):
     """Исключение при не соответсвии даннных формату JSON."""
 
     pass
+
+
+class StateStoreError(Exception):
+    """Исключение при ошибке чтения или записи файла состояния."""
+
+    pass
+
+
+class TemplateError(Exception):
+    """Исключение при ошибке в шаблонах сообщений."""
+
+    pass
+
+
+class CircuitOpenError(Exception):
+    """Исключение при пропуске запроса к недоступному сервису."""
+
+    pass
+
+
+class DeadlineExceededError(Exception):
+    """Исключение при исчерпании бюджета времени цикла опроса."""
+
+    pass
+
+
+class OutboxError(Exception):
+    """Исключение при ошибке чтения или записи журнала сообщений."""
+
+    pass
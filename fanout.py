@@ -0,0 +1,218 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+import time
+from typing import (
+    Callable, Deque, Dict, Iterable, List, Optional, Tuple, Union
+)
+
+import metrics
+import transport
+from settings import env_float, env_int
+
+FANOUT_WORKERS = env_int('FANOUT_WORKERS', 8)
+FANOUT_RETRIES = env_int('FANOUT_RETRIES', 2)
+FANOUT_RETRY_DELAY = env_float('FANOUT_RETRY_DELAY', 1)
+
+logger = logging.getLogger('homework_bot.fanout')
+
+Deliver = Callable[[str, str], None]
+OnDone = Optional[Callable[[bool], None]]
+
+
+def parse_chat_ids(value: Union[str, int, Iterable, None]) -> List[str]:
+    """Разбирает список чатов: строку через запятую или список JSON.
+
+    Повторы отбрасываются, порядок чатов сохраняется.
+    """
+    if value is None:
+        return []
+    if isinstance(value, (str, int)):
+        value = str(value).split(',')
+    chat_ids: List[str] = []
+    for item in value:
+        chat_id = str(item).strip()
+        if chat_id and chat_id not in chat_ids:
+            chat_ids.append(chat_id)
+    return chat_ids
+
+
+class Destination:
+    """Очередь сообщений и счётчики доставки одного чата."""
+
+    def __init__(self) -> None:
+        """Создаёт пустую очередь чата."""
+        self.pending: Deque[Tuple[Deliver, str, OnDone]] = deque()
+        self.active = False
+        self.delivered = 0
+        self.failed = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+
+class FanOut:
+    """Рассылает сообщения по чатам через ограниченный пул потоков.
+
+    У каждого чата своя очередь: его сообщения отправляются по
+    порядку, а разные чаты обслуживаются одновременно не более чем
+    `workers` потоками. Поэтому медленный или заблокировавший бота
+    чат не задерживает остальных. Отправка при недоступности Telegram
+    повторяется до `retries` раз с растущей паузой, отказы конкретного
+    чата не повторяются. Пока `defer` просит подождать, например, при
+    разомкнутом предохранителе, сообщения чата остаются в его очереди
+    и отправляются позже. Доставленные и недоставленные сообщения
+    считаются для каждого чата отдельно.
+    """
+
+    def __init__(self, workers: int = FANOUT_WORKERS,
+                 retries: int = FANOUT_RETRIES,
+                 retry_delay: float = FANOUT_RETRY_DELAY,
+                 is_retryable: Callable[[Exception], bool] = (
+                     transport.is_telegram_outage
+                 ),
+                 sleep: Callable[[float], None] = time.sleep,
+                 defer: Callable[[str], float] = lambda chat_id: 0.0
+                 ) -> None:
+        """Готовит рассылку; потоки пула создаются по мере надобности."""
+        self.workers = workers
+        self.defer = defer
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.is_retryable = is_retryable
+        self.sleep = sleep
+        self.destinations: Dict[str, Destination] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._timers: Dict[str, threading.Timer] = {}
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix='telegram-fanout',
+                )
+            return self._executor
+
+    def submit(self, deliver: Deliver,
+               messages: Iterable[Tuple[str, str, OnDone]]) -> None:
+        """Ставит сообщения в очереди их чатов и запускает доставку.
+
+        `deliver` отправляет текст в чат и выбрасывает исключение при
+        неудаче; `on_done` сообщения вызывается с результатом его
+        доставки. Сообщения единственного свободного чата
+        отправляются сразу в вызывающем потоке.
+        """
+        chat_ids = set()
+        started = []
+        with self._lock:
+            for chat_id, text, on_done in messages:
+                chat_id = str(chat_id)
+                chat_ids.add(chat_id)
+                destination = self.destinations.setdefault(
+                    chat_id, Destination()
+                )
+                destination.pending.append((deliver, text, on_done))
+                if not destination.active:
+                    destination.active = True
+                    started.append(chat_id)
+        if len(chat_ids) == 1 and started:
+            self._drain(started[0])
+            return
+        for chat_id in started:
+            self._pool().submit(self._drain, chat_id)
+
+    def _drain(self, chat_id: str) -> None:
+        """Отправляет сообщения из очереди чата, пока она не опустеет."""
+        destination = self.destinations[chat_id]
+        while True:
+            with self._lock:
+                if not destination.pending:
+                    destination.active = False
+                    return
+            wait = self.defer(chat_id)
+            if wait > 0:
+                self._postpone(chat_id, wait)
+                return
+            with self._lock:
+                deliver, text, on_done = destination.pending.popleft()
+            delivered = self._deliver(destination, chat_id, deliver, text)
+            if on_done is not None:
+                try:
+                    on_done(delivered)
+                except Exception as error:
+                    logger.error('Сбой при учёте доставки сообщения: %s',
+                                 error)
+
+    def _postpone(self, chat_id: str, wait: float) -> None:
+        """Откладывает очередь чата, не занимая поток пула."""
+        logger.warning('Telegram недоступен, сообщения в чат %s отложены '
+                       'на %.0f с.', chat_id, wait)
+        timer = threading.Timer(wait, self._resume, (chat_id,))
+        timer.daemon = True
+        with self._lock:
+            self._timers[chat_id] = timer
+        timer.start()
+
+    def _resume(self, chat_id: str) -> None:
+        with self._lock:
+            self._timers.pop(chat_id, None)
+        self._pool().submit(self._drain, chat_id)
+
+    def _deliver(self, destination: Destination, chat_id: str,
+                 deliver: Deliver, text: str) -> bool:
+        """Отправляет сообщение в чат с повторами и учитывает результат."""
+        attempt = 0
+        while True:
+            try:
+                deliver(chat_id, text)
+            except Exception as error:
+                if attempt < self.retries and self.is_retryable(error):
+                    self.sleep(self._retry_delay(error, attempt))
+                    attempt += 1
+                    continue
+                self._record(destination, error)
+                logger.error(
+                    'При отправке сообщения в чат %s выдало ошибку "%s"',
+                    chat_id, error,
+                )
+                return False
+            self._record(destination)
+            return True
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Возвращает паузу перед повтором, не меньше запрошенной."""
+        delay = self.retry_delay * 2 ** attempt
+        return max(delay, float(getattr(error, 'retry_after', 0) or 0))
+
+    def _record(self, destination: Destination,
+                error: Optional[Exception] = None) -> None:
+        with self._lock:
+            if error is None:
+                destination.delivered += 1
+                destination.failures = 0
+            else:
+                destination.failed += 1
+                destination.failures += 1
+                destination.last_error = str(error)
+        metrics.increment(
+            'fanout_messages_total',
+            'failed' if error is not None else 'delivered',
+            label_name='result',
+        )
+
+    def close(self) -> None:
+        """Дожидается отправки поставленных сообщений и закрывает пул.
+
+        Отложенные сообщения остаются в очередях и отправляются со
+        следующим сообщением своего чата.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            timers, self._timers = self._timers, {}
+            for chat_id, timer in timers.items():
+                timer.cancel()
+                self.destinations[chat_id].active = False
+        if executor is not None:
+            executor.shutdown(wait=True)
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import (
+    TYPE_CHECKING, Callable, Iterable, Iterator, List, Optional, Tuple
+)
+
+import metrics
+from exceptions import DeadlineExceededError
+from scheduler import ACTIVE_STATUSES
+from settings import env_float
+
+if TYPE_CHECKING:
+    import asyncio
+
+API_RATE = env_float('API_RATE', 0)
+API_BURST = env_float('API_BURST', 5)
+
+ACTIVE = 0
+WAITING = 1
+IDLE = 2
+
+logger = logging.getLogger('homework_bot.governor')
+
+_admitted: ContextVar[bool] = ContextVar('admitted', default=False)
+
+
+def tenant_priority(statuses: Iterable[str]) -> int:
+    """Возвращает приоритет опроса по статусам работ студента.
+
+    Раньше всех опрашиваются студенты с работами на проверке, затем
+    студенты с проверенными работами и последними — без работ.
+    """
+    priority = IDLE
+    for status in statuses:
+        if status in ACTIVE_STATUSES:
+            return ACTIVE
+        priority = WAITING
+    return priority
+
+
+def parse_retry_after(value: Optional[str],
+                      now: Callable[[], float] = time.time
+                      ) -> Optional[float]:
+    """Переводит заголовок Retry-After в паузу в секундах."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - now(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+@contextmanager
+def admitted() -> Iterator[None]:
+    """Отмечает, что запрос блока уже получил разрешение ограничителя.
+
+    Так асинхронный движок, дождавшийся очереди по приоритету,
+    не ждёт второй раз внутри `send_api_request` в пуле потоков.
+    """
+    token = _admitted.set(True)
+    try:
+        yield
+    finally:
+        _admitted.reset(token)
+
+
+class RateGovernor:
+    """Общий ограничитель частоты запросов к API Практикума.
+
+    Запросы всех студентов процесса расходуют одно «ведро с
+    токенами» на `rate` запросов в секунду с запасом `burst`.
+    Ожидающие асинхронные запросы обслуживаются по приоритету,
+    а полученный от API Retry-After приостанавливает все запросы.
+    Без `rate` частота не ограничивается, но Retry-After
+    соблюдается.
+    """
+
+    def __init__(self, rate: float = API_RATE, burst: float = API_BURST,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Создаёт ограничитель с полным ведром."""
+        self.clock = clock
+        self.set_rate(rate, burst)
+        self.paused_until = float('-inf')
+        self._lock = threading.Lock()
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def set_rate(self, rate: float, burst: Optional[float] = None) -> None:
+        """Меняет частоту запросов, например, для доли процесса."""
+        self.rate = rate
+        self.burst = max(burst if burst is not None else self.burst, 1)
+        self.tokens = self.burst
+        self.updated = self.clock()
+
+    def _refill(self, now: float) -> None:
+        if self.rate > 0:
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+        self.updated = now
+
+    def _delay(self, now: float) -> float:
+        self._refill(now)
+        delay = max(self.paused_until - now, 0.0)
+        if self.rate > 0 and self.tokens < 1:
+            delay = max(delay, (1 - self.tokens) / self.rate)
+        return delay
+
+    def delay(self) -> float:
+        """Возвращает, сколько секунд ждать разрешения на запрос."""
+        with self._lock:
+            return self._delay(self.clock())
+
+    def _take(self) -> None:
+        if self.rate > 0:
+            self.tokens -= 1
+
+    def pause(self, seconds: float) -> None:
+        """Приостанавливает все запросы, например, по Retry-After."""
+        with self._lock:
+            self.paused_until = max(
+                self.paused_until, self.clock() + seconds
+            )
+        metrics.increment('api_rate_limited_total', 'retry_after',
+                          label_name='source')
+        logger.warning('API просит повторить запросы через %.0f с.', seconds)
+
+    def acquire(self, max_wait: float = float('inf')) -> float:
+        """Дожидается разрешения на запрос и возвращает время ожидания.
+
+        Вызывающий поток сразу резервирует токен, поэтому
+        одновременные запросы ждут друг за другом. Если ждать
+        дольше `max_wait`, запрос пропускается.
+        """
+        if _admitted.get():
+            return 0.0
+        with self._lock:
+            wait = self._delay(self.clock())
+            if wait > max_wait:
+                raise DeadlineExceededError(
+                    'Бюджета времени цикла не хватает, чтобы дождаться '
+                    'очереди запросов к API, запрос пропущен.'
+                )
+            self._take()
+        if wait > 0:
+            metrics.observe('rate_governor_wait', wait)
+            time.sleep(wait)
+        return wait
+
+    def try_acquire(self) -> bool:
+        """Берёт разрешение на запрос, только если его не нужно ждать.
+
+        Подходит для необязательных запросов: они не занимают очередь
+        и не отнимают токены у ожидающих.
+        """
+        with self._lock:
+            if self._waiters or self._delay(self.clock()) > 0:
+                return False
+            self._take()
+            return True
+
+    async def acquire_async(self, priority: int = ACTIVE,
+                            max_wait: Optional[float] = None) -> None:
+        """Дожидается разрешения на запрос в очереди по приоритету.
+
+        Меньшее значение `priority` обслуживается раньше, при равном
+        приоритете — в порядке обращения.
+        """
+        import asyncio
+
+        with self._lock:
+            if not self._waiters and self._delay(self.clock()) == 0:
+                self._take()
+                return
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(
+            self._waiters, (priority, next(self._sequence), future)
+        )
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+        started = loop.time()
+        try:
+            await asyncio.wait_for(future, max_wait)
+        except asyncio.TimeoutError:
+            raise DeadlineExceededError(
+                'Бюджета времени цикла не хватает, чтобы дождаться '
+                'очереди запросов к API, запрос пропущен.'
+            )
+        metrics.observe('rate_governor_wait', loop.time() - started)
+
+    async def _dispatch(self) -> None:
+        """Выдаёт разрешения ожидающим по мере появления токенов."""
+        import asyncio
+
+        while self._waiters:
+            future = self._waiters[0][2]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            wait = self.delay()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            heapq.heappop(self._waiters)
+            with self._lock:
+                self._take()
+            future.set_result(None)
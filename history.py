@@ -0,0 +1,385 @@
+from array import array
+from datetime import datetime
+import json
+import logging
+import math
+import mmap
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import metrics
+from settings import env_str
+from state import homework_key
+
+HISTORY_DIR = env_str('HISTORY_DIR', '')
+COLUMNS = (
+    ('observed_at', 'q'),
+    ('date_updated', 'q'),
+    ('chat', 'I'),
+    ('homework', 'I'),
+    ('status', 'I'),
+    ('comment', 'I'),
+)
+STRINGS_FILE = 'strings.jsonl'
+REVIEWING = 'reviewing'
+VERDICTS = ('approved', 'rejected')
+REJECTED = 'rejected'
+DATE_OFFSET_LIMIT = 2 ** 32 - 1
+
+logger = logging.getLogger('homework_bot.history')
+
+
+def parse_date(value: Optional[str], default: int) -> int:
+    """Переводит дату из ответа API в секунды от начала эпохи."""
+    if not value:
+        return default
+    try:
+        return int(datetime.fromisoformat(
+            str(value).replace('Z', '+00:00')
+        ).timestamp())
+    except ValueError:
+        return default
+
+
+def load_numpy():
+    """Возвращает модуль numpy или None, если он не установлен.
+
+    numpy импортируется только при расчёте статистики, чтобы не
+    замедлять запуск бота.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+class TransitionHistory:
+    """Колоночное хранилище истории изменений статусов работ.
+
+    Каждая колонка хранится в отдельном файле значениями
+    фиксированной ширины и только дописывается, поэтому для расчёта
+    статистики файлы отображаются в память без чтения и разбора.
+    Строки (чаты, работы, статусы, комментарии ревьюера) заменяются
+    номерами из общего словаря. Без каталога история не ведётся.
+    """
+
+    def __init__(self, path: Optional[str] = HISTORY_DIR) -> None:
+        """Готовит хранилище; файлы открываются при первой записи."""
+        self.path = path or None
+        self._strings: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._files = None
+        self._strings_file = None
+        self._lock = threading.Lock()
+
+    def _column_path(self, name: str, typecode: str) -> str:
+        return os.path.join(self.path, f'{name}.{typecode}')
+
+    def _open(self) -> None:
+        """Открывает файлы колонок, отбрасывая недописанные записи."""
+        os.makedirs(self.path, exist_ok=True)
+        strings_path = os.path.join(self.path, STRINGS_FILE)
+        self._strings_file = open(strings_path, 'ab+')
+        self._strings_file.seek(0)
+        valid = 0
+        for line in self._strings_file:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                self._add_string(json.loads(line))
+            except ValueError:
+                break
+            valid += len(line)
+        self._strings_file.truncate(valid)
+        rows = self._rows_on_disk()
+        self._files = {}
+        for name, typecode in COLUMNS:
+            file = open(self._column_path(name, typecode), 'ab')
+            file.truncate(rows * array(typecode).itemsize)
+            self._files[name] = file
+
+    def _rows_on_disk(self) -> int:
+        rows = None
+        for name, typecode in COLUMNS:
+            try:
+                size = os.path.getsize(self._column_path(name, typecode))
+            except FileNotFoundError:
+                size = 0
+            count = size // array(typecode).itemsize
+            rows = count if rows is None else min(rows, count)
+        return rows or 0
+
+    def _add_string(self, value: str) -> int:
+        code = len(self._strings)
+        self._strings.append(value)
+        self._codes[value] = code
+        return code
+
+    def _code(self, value: str, new: List[str]) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._add_string(value)
+            new.append(value)
+        return code
+
+    def record(self, chat_id: str, homeworks: Iterable[dict],
+               now: Optional[float] = None) -> int:
+        """Дописывает в историю изменения статусов работ чата."""
+        if not self.path:
+            return 0
+        observed_at = int(time.time() if now is None else now)
+        try:
+            with self._lock:
+                return self._record(str(chat_id), homeworks, observed_at)
+        except OSError as error:
+            metrics.count_error(error)
+            logger.error('Сбой в работе программы: не удалось записать '
+                         "историю статусов в '%s': %s", self.path, error)
+            return 0
+
+    def _record(self, chat_id: str, homeworks: Iterable[dict],
+                observed_at: int) -> int:
+        if self._files is None:
+            self._open()
+        new: List[str] = []
+        columns = {name: array(typecode) for name, typecode in COLUMNS}
+        for homework in homeworks:
+            columns['observed_at'].append(observed_at)
+            columns['date_updated'].append(
+                parse_date(homework.get('date_updated'), observed_at)
+            )
+            columns['chat'].append(self._code(chat_id, new))
+            columns['homework'].append(self._code(
+                f'{chat_id}/{homework_key(homework)}', new
+            ))
+            columns['status'].append(self._code(homework['status'], new))
+            columns['comment'].append(self._code(
+                str(homework.get('reviewer_comment') or ''), new
+            ))
+        # Словарь записывается раньше колонок, чтобы на диске не
+        # оказалось номеров строк, которых в нём нет.
+        for value in new:
+            self._strings_file.write(
+                (json.dumps(value, ensure_ascii=False) + '\n').encode()
+            )
+        self._strings_file.flush()
+        for name, values in columns.items():
+            self._files[name].write(values.tobytes())
+            self._files[name].flush()
+        return len(columns['status'])
+
+    def code(self, value: str) -> Optional[int]:
+        """Возвращает номер строки в словаре, если она встречалась."""
+        with self._lock:
+            if self._files is None and self.path:
+                self._open()
+            return self._codes.get(value)
+
+    def columns(self) -> Dict[str, Sequence[int]]:
+        """Отображает колонки в память и возвращает их значения.
+
+        С numpy колонки возвращаются массивами numpy без копирования,
+        без него — представлениями `memoryview`.
+        """
+        numpy = load_numpy()
+        with self._lock:
+            if self._files is None and self.path:
+                self._open()
+            rows = self._rows_on_disk() if self.path else 0
+        result = {}
+        for name, typecode in COLUMNS:
+            if not rows:
+                result[name] = (
+                    numpy.zeros(0, typecode) if numpy else memoryview(
+                        array(typecode)
+                    )
+                )
+                continue
+            with open(self._column_path(name, typecode), 'rb') as file:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            if numpy is not None:
+                result[name] = numpy.frombuffer(
+                    mapped, dtype=typecode, count=rows
+                )
+            else:
+                size = rows * array(typecode).itemsize
+                result[name] = memoryview(mapped)[:size].cast(typecode)
+        return result
+
+    def stats(self, chat_id: Optional[str] = None) -> dict:
+        """Считает статистику проверок по всей истории или по чату."""
+        columns = self.columns()
+        codes = {
+            'chat': None if chat_id is None else self.code(str(chat_id)),
+            'reviewing': self.code(REVIEWING),
+            'rejected': self.code(REJECTED),
+            'verdicts': [
+                code for code in map(self.code, VERDICTS) if code is not None
+            ],
+        }
+        if chat_id is not None and codes['chat'] is None:
+            return empty_stats()
+        numpy = load_numpy()
+        if numpy is not None:
+            return numpy_stats(numpy, columns, codes)
+        return python_stats(columns, codes)
+
+    def report(self, chat_id: str) -> str:
+        """Готовит ответ на команду /stats."""
+        try:
+            stats = self.stats(chat_id)
+        except OSError as error:
+            logger.error('Сбой при расчёте статистики: %s', error)
+            return 'Статистика сейчас недоступна.'
+        if not stats['reviews']:
+            return 'Статистики пока нет: ни одна проверка не завершилась.'
+        turnaround = stats['turnaround']
+        return '\n'.join((
+            'Статистика проверок:',
+            f'проверок: {stats["reviews"]}, '
+            f'возвратов: {stats["rejection_rate"]:.0%};',
+            f'время проверки: медиана {format_duration(turnaround["p50"])}, '
+            f'90% — до {format_duration(turnaround["p90"])}, '
+            f'максимум {format_duration(turnaround["max"])};',
+            'в среднем на проверке за работу: '
+            f'{format_duration(stats["time_in_reviewing"])}.',
+        ))
+
+    def close(self) -> None:
+        """Закрывает файлы колонок."""
+        with self._lock:
+            if self._files is None:
+                return
+            for file in self._files.values():
+                file.close()
+            self._strings_file.close()
+            self._files = None
+
+
+def empty_stats() -> dict:
+    """Возвращает статистику для пустой истории."""
+    return {
+        'rows': 0, 'reviews': 0, 'rejection_rate': 0.0,
+        'turnaround': {'p50': 0.0, 'p90': 0.0, 'max': 0.0},
+        'time_in_reviewing': 0.0,
+    }
+
+
+def numpy_stats(numpy, columns: Dict[str, Sequence[int]],
+                codes: dict) -> dict:
+    """Считает статистику проверок векторно средствами numpy.
+
+    Записи упорядочиваются по работе и дате изменения одной
+    сортировкой составного ключа, после чего длительность каждой
+    проверки — разность дат соседних записей одной работы, первая
+    из которых имеет статус «на проверке».
+    """
+    homework = columns['homework']
+    status = columns['status']
+    date = columns['date_updated']
+    if codes['chat'] is not None:
+        mask = columns['chat'] == codes['chat']
+        homework, status, date = homework[mask], status[mask], date[mask]
+    result = empty_stats()
+    result['rows'] = int(len(status))
+    if not len(status):
+        return result
+    offset = numpy.clip(date - date.min(), 0, DATE_OFFSET_LIMIT)
+    # Записи одной работы с одинаковой датой должны остаться в порядке
+    # записи, как при сортировке без numpy.
+    order = numpy.argsort(
+        (homework.astype(numpy.int64) << 32) | offset, kind='stable'
+    )
+    homework, status, date = homework[order], status[order], date[order]
+    is_verdict = numpy.zeros(len(status), dtype=bool)
+    for code in codes['verdicts']:
+        is_verdict |= status == code
+    pairs = (homework[:-1] == homework[1:]) & (
+        status[:-1] == codes['reviewing']
+    )
+    durations = (date[1:] - date[:-1])[pairs].astype(numpy.float64)
+    turnaround = durations[is_verdict[1:][pairs]]
+    verdicts = int(numpy.count_nonzero(is_verdict))
+    result['reviews'] = int(len(turnaround))
+    if verdicts:
+        result['rejection_rate'] = float(
+            numpy.count_nonzero(status == codes['rejected']) / verdicts
+        )
+    if len(turnaround):
+        result['turnaround'] = {
+            'p50': float(numpy.percentile(turnaround, 50)),
+            'p90': float(numpy.percentile(turnaround, 90)),
+            'max': float(turnaround.max()),
+        }
+    if len(durations):
+        # Работы отсортированы, поэтому число разных работ — число
+        # мест, где меняется номер работы.
+        reviewed = homework[:-1][pairs]
+        homeworks = numpy.count_nonzero(reviewed[1:] != reviewed[:-1]) + 1
+        result['time_in_reviewing'] = float(durations.sum() / homeworks)
+    return result
+
+
+def python_stats(columns: Dict[str, Sequence[int]], codes: dict) -> dict:
+    """Считает ту же статистику без numpy, заметно медленнее."""
+    rows = sorted((
+        (homework, date, status)
+        for chat, homework, date, status in zip(
+            columns['chat'], columns['homework'],
+            columns['date_updated'], columns['status'],
+        )
+        if codes['chat'] is None or chat == codes['chat']
+    ), key=lambda row: row[:2])
+    verdict_codes = set(codes['verdicts'])
+    turnaround = []
+    totals: Dict[int, float] = {}
+    for current, following in zip(rows, rows[1:]):
+        if current[0] != following[0] or current[2] != codes['reviewing']:
+            continue
+        duration = float(following[1] - current[1])
+        totals[current[0]] = totals.get(current[0], 0.0) + duration
+        if following[2] in verdict_codes:
+            turnaround.append(duration)
+    verdicts = sum(1 for row in rows if row[2] in verdict_codes)
+    result = empty_stats()
+    result['rows'] = len(rows)
+    result['reviews'] = len(turnaround)
+    if verdicts:
+        result['rejection_rate'] = sum(
+            1 for row in rows if row[2] == codes['rejected']
+        ) / verdicts
+    if turnaround:
+        turnaround.sort()
+        result['turnaround'] = {
+            'p50': percentile(turnaround, 50),
+            'p90': percentile(turnaround, 90),
+            'max': turnaround[-1],
+        }
+    if totals:
+        result['time_in_reviewing'] = sum(totals.values()) / len(totals)
+    return result
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Считает перцентиль отсортированных значений, как numpy."""
+    position = (len(values) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (
+        position - lower
+    )
+
+
+def format_duration(seconds: float) -> str:
+    """Форматирует длительность для ответа пользователю."""
+    minutes = int(seconds // 60)
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    if days:
+        return f'{days} д {hours} ч'
+    if hours:
+        return f'{hours} ч {minutes} мин'
+    return f'{minutes} мин'
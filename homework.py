@@ -1,21 +1,57 @@
+from __future__ import annotations
+
+import functools
 import logging
 from logging import StreamHandler
 import os
 import sys
 import time
+from typing import (
+    TYPE_CHECKING, Callable, Iterable, List, Optional, Tuple
+)
 
-import requests
-
-import telegram
-
-from dotenv import load_dotenv
-
+import deadline
+import metrics
+import transport
+from breaker import CircuitBreaker
+from commands import BOT_COMMANDS, CommandListener, SnapshotCache
+from config import (
+    CONFIG_FILE, Config, ConfigReloader, read_values, validate_values
+)
+from decoding import STREAM_CHUNK_SIZE, HomeworkStream, decode_response
+from delivery import (
+    TELEGRAM_QUEUE, TELEGRAM_QUEUE_CLOSE_TIMEOUT, DeliveryQueue
+)
+from diff import diff_homeworks, render_transitions
+from error_digest import ErrorAggregator
 from exceptions import (
     EnvironmentParameterError, RequestStatusCodeError, RequestError,
-    ResponseKeyError, HomeworkKeyError, StatusHomeworkError, ResponseJsonError
+    ResponseKeyError, HomeworkKeyError, StatusHomeworkError,
+    ResponseJsonError, CircuitOpenError, DeadlineExceededError,
+    RateLimitedError
+)
+from fanout import FanOut, parse_chat_ids
+from governor import RateGovernor, parse_retry_after
+from history import TransitionHistory
+from log_pipeline import JsonFormatter, make_async
+from metrics import METRICS_PORT
+from outbox import Outbox, open_outbox
+from revalidation import NOT_MODIFIED, ResponseCache
+from scheduler import PollScheduler
+from settings import env_flag
+from state import STATE_FILE, StateStore
+from templates import (
+    MESSAGE_FORMAT, MESSAGE_LOCALE, TEMPLATES_FILE, TemplateRegistry,
+    send_options
 )
+from validation import Schema
+
+if TYPE_CHECKING:
+    import requests
+    import telegram
 
-load_dotenv()
+# Тяжёлые зависимости (requests, python-telegram-bot) импортируются
+# при первом использовании, а env-файл загружает модуль settings.
 
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
@@ -24,6 +60,10 @@ TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
 RETRY_PERIOD = 600
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
+LOGGER_NAME = 'homework_bot'
+TOO_MANY_REQUESTS = 429
+LOG_ASYNC = env_flag('LOG_ASYNC')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
 
 
 HOMEWORK_VERDICTS = {
@@ -32,20 +72,71 @@ HOMEWORK_VERDICTS = {
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
 
+RESPONSE_SCHEMA = Schema(
+    'response', {'homeworks': list}, missing_error=ResponseKeyError
+)
+HOMEWORK_SCHEMA = Schema(
+    'homework',
+    {'homework_name': None, 'status': frozenset(HOMEWORK_VERDICTS)},
+    missing_error=HomeworkKeyError,
+    value_error=StatusHomeworkError,
+    value_message="Неожиданный статус домашней работы. {key}: '{value}'.",
+)
+
+LOCALES = {
+    'ru': {
+        'message': 'Изменился статус проверки работы "{homework_name}". '
+                   '{verdict}',
+        'verdicts': HOMEWORK_VERDICTS,
+    },
+}
+REQUIRED_VARIABLES = ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID')
+
+TEMPLATES = TemplateRegistry(LOCALES)
+if TEMPLATES_FILE:
+    TEMPLATES.load_file(TEMPLATES_FILE)
+RENDERER = TEMPLATES.renderer()
+SNAPSHOTS = SnapshotCache(HOMEWORK_VERDICTS)
+HISTORY = TransitionHistory()
+RESPONSES = ResponseCache()
+API_BREAKER = CircuitBreaker('practicum_api')
+GOVERNOR = RateGovernor()
+TELEGRAM_BREAKER = CircuitBreaker(
+    'telegram', is_failure=transport.is_telegram_outage
+)
+FANOUT = FanOut(
+    defer=lambda chat_id: TELEGRAM_BREAKER.retry_in(str(chat_id))
+)
+
 
 def init_logger() -> logging.Logger:
-    """Создаёт и настраивает логер."""
+    """Создаёт и настраивает логер.
+
+    С LOG_ASYNC запись в stdout выполняется фоновым потоком,
+    с LOG_FORMAT=json каждая запись выводится строкой JSON.
+    Вызывается при запуске бота, а не при импорте модуля; повторный
+    вызов не добавляет второй обработчик.
+    """
+    logger = logging.getLogger(LOGGER_NAME)
+    if logger.handlers:
+        return logger
     handler = StreamHandler(stream=sys.stdout)
-    formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
+    if LOG_FORMAT == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            '%(asctime)s [%(levelname)s] %(message)s'
+        )
     handler.setFormatter(formatter)
+    if LOG_ASYNC:
+        handler = make_async(handler)
 
-    logger = logging.getLogger(__name__)
     logger.setLevel(level=logging.DEBUG)
     logger.addHandler(handler)
     return logger
 
 
-logger = init_logger()
+logger = logging.getLogger(LOGGER_NAME)
 
 
 def check_tokens() -> None:
@@ -60,7 +151,7 @@ def check_tokens() -> None:
         if not value:
             logger.critical(
                 "Отсутствует обязательная переменная окружения: "
-                f"'{key}'. Программа принудительно остановлена."
+                "'%s'. Программа принудительно остановлена.", key
             )
 
             raise EnvironmentParameterError(
@@ -70,131 +161,470 @@ def check_tokens() -> None:
 
 
 def send_message(bot: telegram.bot.Bot, message: str) -> None:
-    """Отправляет сообщение в Telegram чат."""
+    """Отправляет сообщение в Telegram чат.
+
+    Если вместо бота передана `DeliveryQueue`, сообщение только
+    ставится в очередь на отправку. Если в TELEGRAM_CHAT_ID
+    перечислено несколько чатов, сообщение получает каждый.
+    """
+    send_message_to_chats(bot, chat_destinations(), message)
+
+
+def chat_destinations() -> List[str]:
+    """Возвращает чаты из TELEGRAM_CHAT_ID, перечисленные через запятую.
+
+    Первый чат — основной: по нему хранится состояние опроса, и в нём
+    работают команды бота.
+    """
+    return parse_chat_ids(TELEGRAM_CHAT_ID) or [TELEGRAM_CHAT_ID]
+
+
+def send_message_to_chat(bot: telegram.bot.Bot, chat_id: str, message: str,
+                         on_done: Optional[Callable[[bool], None]] = None
+                         ) -> None:
+    """Отправляет сообщение в указанный Telegram чат.
+
+    `on_done` вызывается с результатом доставки. Очередь
+    `DeliveryQueue` вызывает его после фактической отправки.
+    """
+    send_messages(bot, [(chat_id, message, on_done)])
+
+
+def send_message_to_chats(bot: telegram.bot.Bot, chat_ids: Iterable[str],
+                          message: str) -> None:
+    """Отправляет одно сообщение в несколько Telegram чатов."""
+    send_messages(bot, [(chat_id, message, None) for chat_id in chat_ids])
+
+
+def send_messages(bot: telegram.bot.Bot,
+                  messages: Iterable[Tuple[str, str, Optional[Callable]]]
+                  ) -> None:
+    """Отправляет сообщения в их чаты.
+
+    Каждое сообщение задаётся тройкой (чат, текст, `on_done`). Разные
+    чаты обслуживаются одновременно пулом `FANOUT`, а сообщения
+    единственного чата отправляются сразу в вызывающем потоке. Пока
+    предохранитель Telegram не пропускает чат, его сообщения ждут в
+    очереди и не теряются.
+    """
+    if isinstance(bot, DeliveryQueue):
+        for chat_id, message, on_done in messages:
+            bot.send_message(chat_id, message, on_done=on_done)
+        return
+    FANOUT.submit(functools.partial(post_message, bot), messages)
+
+
+def post_message(bot: telegram.bot.Bot, chat_id: str, message: str) -> None:
+    """Отправляет сообщение через бота или выбрасывает исключение.
+
+    Пока Telegram недоступен, сообщение не отправляется.
+    """
+    if not TELEGRAM_BREAKER.allow(str(chat_id)):
+        raise CircuitOpenError(
+            f'Telegram недоступен, сообщение "{message}" не отправлено.'
+        )
     try:
-        bot.send_message(TELEGRAM_CHAT_ID, message)
-        logger.debug(f'Бот отправил сообщение "{message}"')
+        with metrics.timer('send_message'):
+            bot.send_message(chat_id, message,
+                             timeout=transport.telegram_timeout(),
+                             **send_options(message))
     except Exception as error:
-        logger.error(f'При отправке сообщения выдало ошибку "{error}"')
+        TELEGRAM_BREAKER.record(error)
+        raise
+    logger.debug('Бот отправил сообщение "%s"', message)
+    TELEGRAM_BREAKER.record()
+
+
+def deliver_outbox(bot: telegram.bot.Bot, outbox: Optional[Outbox]) -> int:
+    """Отправляет недоставленные сообщения из журнала.
+
+    Перед отправкой новые записи журнала сбрасываются на диск одним
+    fsync. Сообщения разных чатов отправляются одновременно, а те,
+    что не удалось доставить, остаются в журнале до следующего вызова.
+    """
+    if outbox is None:
+        return 0
+    outbox.sync()
+    entries = outbox.take_pending()
+    send_messages(bot, [
+        (chat_id, message, functools.partial(outbox.complete, entry_id))
+        for entry_id, chat_id, message in entries
+    ])
+    outbox.compact()
+    return len(entries)
+
+
+def load_config(required: Iterable[str] = REQUIRED_VARIABLES,
+                tenants: Optional[List] = None) -> Config:
+    """Читает и проверяет настройки для применения без перезапуска.
+
+    Шаблоны сообщений компилируются здесь же, чтобы ошибка в них
+    обнаружилась до применения настроек. Набор статусов и схема
+    домашней работы не перечитываются.
+    """
+    values = read_values()
+    validate_values(values, required)
+    registry = TemplateRegistry(LOCALES)
+    templates_file = values.get('TEMPLATES_FILE', TEMPLATES_FILE)
+    if templates_file:
+        registry.load_file(templates_file)
+    renderer = registry.renderer(
+        values.get('MESSAGE_LOCALE', MESSAGE_LOCALE),
+        values.get('MESSAGE_FORMAT', MESSAGE_FORMAT),
+    )
+    return Config(values, renderer, tenants)
+
+
+def apply_config(config: Config) -> bool:
+    """Подменяет настройки модуля проверенным снимком.
+
+    Возвращает True, если сменился токен Telegram и бота нужно
+    создать заново.
+    """
+    global PRACTICUM_TOKEN, TELEGRAM_TOKEN, TELEGRAM_CHAT_ID
+    global HEADERS, RENDERER
+    rotated = config.telegram_token != TELEGRAM_TOKEN
+    PRACTICUM_TOKEN = config.practicum_token
+    TELEGRAM_TOKEN = config.telegram_token
+    TELEGRAM_CHAT_ID = config.telegram_chat_id
+    HEADERS = config.headers
+    RENDERER = config.renderer
+    logger.info('Применены новые настройки.')
+    return rotated
+
+
+def use_connection_pool(bot: telegram.bot.Bot) -> telegram.bot.Bot:
+    """Переводит бота на пул постоянных соединений Telegram.
+
+    Бот общий для потоков рассылки и долгого опроса команд, поэтому
+    соединений в пуле хватает им всем одновременно. Транспорт по
+    умолчанию держит одно соединение, и каждая параллельная отправка
+    открывала бы новое.
+    """
+    request = getattr(bot, '_request', None)
+    if request is not None:
+        request.stop()
+        bot._request = transport.telegram_request(FANOUT.workers + 1)
+    return bot
+
+
+def rebind_bot(bot: telegram.bot.Bot,
+               telegram_bot: telegram.bot.Bot) -> telegram.bot.Bot:
+    """Подключает нового бота к очереди сообщений или возвращает его."""
+    if isinstance(bot, DeliveryQueue):
+        bot.bot = telegram_bot
+        return bot
+    return telegram_bot
+
+
+def apply_pending_config(reloader: ConfigReloader, bot: telegram.bot.Bot,
+                         listener: Optional[CommandListener]
+                         ) -> telegram.bot.Bot:
+    """Применяет перечитанные настройки между циклами опроса."""
+    config = reloader.take()
+    if config is None:
+        return bot
+    rotated = apply_config(config)
+    if listener is not None:
+        listener.set_chat_ids(chat_destinations()[:1])
+    if not rotated:
+        return bot
+    import telegram
+
+    telegram_bot = use_connection_pool(telegram.Bot(token=TELEGRAM_TOKEN))
+    if listener is not None:
+        listener.bot = telegram_bot
+    return rebind_bot(bot, telegram_bot)
 
 
 def get_api_answer(timestamp: int) -> dict:
     """Делает запрос к эндпоинту и проверяет его корректность."""
+    return request_api_answer(HEADERS, timestamp)
+
+
+@metrics.timed('get_api_answer')
+def request_api_answer(headers: dict, timestamp: int) -> dict:
+    """Делает запрос к эндпоинту с заголовками конкретного токена.
+
+    Если ответ не изменился с прошлого запроса того же токена,
+    возвращаются прошлые данные без повторного разбора JSON.
+    """
+    response = send_api_request(RESPONSES.request_headers(headers), timestamp)
+    cached = RESPONSES.match(headers, response)
+    if cached is not None:
+        return cached
+
+    try:
+        with metrics.timer('response_json', count_errors=False):
+            data = decode_response(response)
+    except Exception:
+        logger.error(
+            'Сбой в работе программы: Данные в response '
+            'не соответсвуют формату JSON.'
+        )
+        raise ResponseJsonError(
+            'Данные в response не соответсвуют формату JSON.'
+        )
+    RESPONSES.store(headers, response, data)
+    return data
+
+
+def stream_api_answer(headers: dict, timestamp: int) -> HomeworkStream:
+    """Делает запрос к эндпоинту и разбирает работы из ответа по одной."""
+    response = send_api_request(headers, timestamp, stream=True)
+    return HomeworkStream(response.iter_content(STREAM_CHUNK_SIZE))
+
+
+def send_api_request(headers: dict, timestamp: int,
+                     stream: bool = False) -> requests.Response:
+    """Отправляет запрос к эндпоинту и проверяет код ответа.
+
+    Пока API недоступно, запрос не отправляется, а сразу
+    выбрасывается `CircuitOpenError`. Таймауты запроса ограничены
+    бюджетом времени текущего цикла опроса. На ответ 429
+    выбрасывается `RateLimitedError`.
+    """
+    import requests
+
+    admit_api_request(headers)
     payload = {'from_date': timestamp}
 
     try:
-        response = requests.get(ENDPOINT, headers=HEADERS, params=payload)
+        with metrics.timer('request', count_errors=False):
+            response = transport.get(
+                ENDPOINT, GOVERNOR.try_acquire,
+                headers=headers, params=payload, stream=stream,
+            )
     except requests.RequestException as error:
+        API_BREAKER.record_failure()
         logger.error('Сбой в работе программы: '
                      'При запросе к API '
-                     f'произошла ошибка {error}.')
+                     'произошла ошибка %s.', error)
         raise RequestError('При запросе к API '
                            f'произошла ошибка {error}.')
 
-    if response.status_code != 200:
+    if is_server_error(response.status_code):
+        API_BREAKER.record_failure()
+        honor_retry_after(response)
+    else:
+        API_BREAKER.record_success()
+    conditional = 'If-None-Match' in headers or 'If-Modified-Since' in headers
+    if response.status_code != 200 and not (
+        conditional and response.status_code == NOT_MODIFIED
+    ):
         logger.error(
-            f'Сбой в работе программы: Эндпоинт {ENDPOINT}. '
-            f'Код ответа API: {response.status_code}'
+            'Сбой в работе программы: Эндпоинт %s. '
+            'Код ответа API: %s', ENDPOINT, response.status_code
         )
-        raise RequestStatusCodeError(
+        error_class = (
+            RateLimitedError if response.status_code == TOO_MANY_REQUESTS
+            else RequestStatusCodeError
+        )
+        raise error_class(
             f'Эндпоинт {ENDPOINT}. Код ответа API: {response.status_code}'
         )
+    return response
+
 
+def admit_api_request(headers: dict) -> None:
+    """Проверяет, что запрос к API можно отправить, и ждёт очереди.
+
+    Запрос пропускается, если исчерпан бюджет времени цикла или API
+    недоступно, а иначе ждёт разрешения общего ограничителя частоты.
+    """
     try:
-        return response.json()
-    except Exception:
-        logger.error(
-            'Сбой в работе программы: Данные в response '
-            'не соответсвуют формату JSON.'
-        )
-        raise ResponseJsonError(
-            'Данные в response не соответсвуют формату JSON.'
-        )
+        deadline.check('запрос к API')
+        if not API_BREAKER.allow(headers.get('Authorization', '')):
+            raise CircuitOpenError(
+                f'Эндпоинт {ENDPOINT} недоступен, запрос к API пропущен.'
+            )
+        GOVERNOR.acquire(deadline.remaining())
+    except DeadlineExceededError as error:
+        logger.error('Сбой в работе программы: %s', error)
+        raise
 
 
-def check_response(response: dict) -> list:
-    """Проверяет ответ API на соответствие документации."""
-    if not isinstance(response, dict):
-        logger.error(
-            "Сбой в работе программы: "
-            "Получены данные "
-            "'response' не в виде словаря."
-        )
-        raise TypeError("Полученные данные "
-                        "'response' не в виде словаря.")
+def honor_retry_after(response: requests.Response) -> None:
+    """Приостанавливает запросы к API на время из Retry-After."""
+    headers = getattr(response, 'headers', None) or {}
+    retry_after = parse_retry_after(headers.get('Retry-After'))
+    if retry_after is not None:
+        GOVERNOR.pause(retry_after)
 
-    if 'homeworks' not in response:
-        logger.error("Сбой в работе программы: "
-                     "Отсутвует ожидаемый ключ 'homeworks'.")
-        raise ResponseKeyError("Отсутвует ожидаемый ключ 'homeworks'.")
 
-    if not response['homeworks']:
-        logger.debug('Новый статус домашней работы отсутсвует.')
+def is_server_error(status_code: int) -> bool:
+    """Проверяет, что код ответа говорит о перегрузке или сбое API."""
+    return status_code == TOO_MANY_REQUESTS or status_code >= 500
 
-    if not isinstance(response['homeworks'], list):
-        logger.error(
-            "Сбой в работе программы: "
-            "Получены данные под ключом "
-            "'homeworks' не в виде списка."
-        )
-        raise TypeError("Полученные данные под ключом "
-                        "'homeworks' не в виде списка.")
 
+@metrics.timed('check_response')
+def check_response(response: dict) -> list:
+    """Проверяет ответ API на соответствие документации."""
+    RESPONSE_SCHEMA.validate(response)
     return response['homeworks']
 
 
+@metrics.timed('parse_status')
 def parse_status(homework: dict) -> str:
     """Извлекает информацию о конкретной домашней работе."""
-    if 'homework_name' not in homework:
-        logger.error(
-            "Сбой в работе программы: "
-            "Отсутвует ожидаемый ключ 'homework_name'."
-        )
-        raise HomeworkKeyError("Отсутвует ожидаемый ключ 'homework_name'.")
+    HOMEWORK_SCHEMA.validate(homework)
+    return render_status(homework)
 
-    if 'status' not in homework:
-        logger.error(
-            "Сбой в работе программы: "
-            "Отсутвует ожидаемый ключ 'status'."
-        )
-        raise HomeworkKeyError("Отсутвует ожидаемый ключ 'status'.")
 
-    if homework['status'] not in HOMEWORK_VERDICTS:
-        logger.error(
-            "Сбой в работе программы: Неожиданный статус домашней работы. "
-            f"status: '{homework['status']}'."
-        )
-        raise StatusHomeworkError("Неожиданный статус домашней работы. "
-                                  f"status: '{homework['status']}'.")
+def render_status(homework: dict) -> str:
+    """Готовит сообщение об уже проверенной домашней работе.
+
+    Текст берётся из заранее скомпилированного шаблона, повторные
+    сообщения для той же работы и статуса отдаются из кэша.
+    """
+    return RENDERER.render(str(homework['homework_name']), homework['status'])
+
+
+def render_homeworks(transitions: Iterable[dict]
+                     ) -> Tuple[List[Tuple[dict, str]], List[Exception]]:
+    """Проверяет работы и готовит сообщения пакетом.
 
-    homework_name = homework['homework_name']
-    verdict = HOMEWORK_VERDICTS[homework['status']]
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+    Пакет измеряется отдельным этапом render_transitions: в этапе
+    parse_status каждое наблюдение — одна работа. Ошибки некорректных
+    работ учитываются в показателе ошибок, как и при вызове
+    `parse_status`.
+    """
+    with metrics.timer('render_transitions'):
+        messages, errors = render_transitions(
+            transitions, HOMEWORK_SCHEMA, render_status
+        )
+    for error in errors:
+        metrics.count_error(error)
+    return messages, errors
+
+
+def notify_transitions(bot: telegram.bot.Bot, state: StateStore,
+                       homeworks: list,
+                       outbox: Optional[Outbox] = None) -> int:
+    """Отправляет сообщения обо всех изменившихся статусах работ.
+
+    С журналом `outbox` сообщения сначала записываются в него и
+    отправляются из журнала, поэтому сбой Telegram их не теряет.
+    """
+    chat_ids = chat_destinations()
+    chat_id = chat_ids[0]
+    transitions = diff_homeworks(state.statuses(chat_id), homeworks)
+    messages, errors = render_homeworks(transitions)
+    for homework, message in messages:
+        if outbox is None:
+            send_message(bot, message)
+        else:
+            for destination in chat_ids:
+                outbox.append(destination, message)
+        state.set_status(chat_id, homework)
+        SNAPSHOTS.record_transition(chat_id, homework)
+    HISTORY.record(chat_id, [homework for homework, _ in messages])
+    deliver_outbox(bot, outbox)
+    if errors:
+        raise errors[0]
+    return len(messages)
+
+
+def poll_api(bot: telegram.bot.Bot, state: StateStore,
+             scheduler: PollScheduler, timestamp: int,
+             outbox: Optional[Outbox] = None) -> int:
+    """Опрашивает API, сообщает о новых статусах и возвращает курсор."""
+    chat_id = chat_destinations()[0]
+    response = get_api_answer(timestamp)
+    homeworks = check_response(response)
+    SNAPSHOTS.update(chat_id, homeworks or ())
+    timestamp = response.get('current_date', timestamp)
+    state.set_cursor(chat_id, timestamp)
+    changed = (
+        notify_transitions(bot, state, homeworks, outbox)
+        if homeworks else 0
+    )
+    scheduler.record_success(changed, state.statuses(chat_id).values())
+    state.flush()
+    return timestamp
+
+
+def send_error_reports(bot: telegram.bot.Bot, errors: ErrorAggregator,
+                       error: Optional[Exception] = None) -> None:
+    """Сообщает об ошибке цикла и сводки её повторов.
+
+    Повторяющаяся ошибка отправляется один раз, а её повторы
+    накапливаются в сводку.
+    """
+    messages = [errors.record(error)] if error is not None else []
+    for message in [*messages, *errors.pop_digests()]:
+        if message:
+            send_message(bot, message)
 
 
 def main() -> None:
     """Основная логика работы бота."""
+    init_logger()
     check_tokens()
+    import telegram
+
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    timestamp = int(time.time())
-    old_error_message = ''
-
-    while True:
-        try:
-            response = get_api_answer(timestamp)
-            homeworks = check_response(response)
-            if homeworks:
-                message = parse_status(homeworks[0])
-                send_message(bot, message)
-
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            if message != old_error_message:
-                send_message(bot, message)
-                old_error_message = message
-
-        timestamp = int(time.time())
-        time.sleep(RETRY_PERIOD)
+    use_connection_pool(bot)
+    telegram_bot = bot
+    if TELEGRAM_QUEUE:
+        bot = DeliveryQueue(bot, breaker=TELEGRAM_BREAKER).start()
+    state = StateStore(STATE_FILE)
+    outbox = open_outbox()
+    timestamp = state.get_cursor(chat_destinations()[0], int(time.time()))
+    errors = ErrorAggregator()
+    scheduler = PollScheduler(RETRY_PERIOD)
+    if METRICS_PORT:
+        metrics.start_server(int(METRICS_PORT))
+    reloader = ConfigReloader(
+        load_config, (CONFIG_FILE, TEMPLATES_FILE)
+    ).start()
+    listener = None
+    if BOT_COMMANDS:
+        listener = CommandListener(
+            telegram_bot, SNAPSHOTS,
+            send=lambda chat_id, text: send_message_to_chat(
+                bot, chat_id, text
+            ),
+            chat_ids=chat_destinations()[:1],
+            on_stale=lambda chat_id: scheduler.expedite(),
+            stats=HISTORY.report if HISTORY.path else None,
+        ).start()
+
+    try:
+        while True:
+            bot = apply_pending_config(reloader, bot, listener)
+            deliver_outbox(bot, outbox)
+            with deadline.scope():
+                try:
+                    timestamp = poll_api(
+                        bot, state, scheduler, timestamp, outbox
+                    )
+                except Exception as error:
+                    scheduler.record_error()
+                    send_error_reports(bot, errors, error)
+                else:
+                    send_error_reports(bot, errors)
+            delay = scheduler.next_delay()
+            sleep_started = time.monotonic()
+            # Паузу прерывает /status, которому нужны свежие данные.
+            if listener is None:
+                time.sleep(delay)
+            elif scheduler.wait(delay):
+                continue
+            metrics.set_gauge(
+                'loop_lag_seconds', time.monotonic() - sleep_started - delay
+            )
+    finally:
+        state.flush(force=True)
+        HISTORY.close()
+        reloader.stop()
+        if listener is not None:
+            listener.stop()
+        if TELEGRAM_QUEUE:
+            bot.close(TELEGRAM_QUEUE_CLOSE_TIMEOUT)
+        FANOUT.close()
+        if outbox is not None:
+            outbox.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,64 @@
+import atexit
+import json
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+
+
+class JsonFormatter(logging.Formatter):
+    """Форматирует запись журнала в одну строку JSON."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Возвращает запись в виде JSON-объекта."""
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class LazyQueueHandler(QueueHandler):
+    """Кладёт записи в очередь без форматирования.
+
+    Стандартный `QueueHandler` форматирует сообщение в вызывающем
+    потоке; здесь подстановка аргументов и запись в поток вывода
+    выполняются фоновым потоком `QueueListener`. При переполнении
+    очереди запись отбрасывается, чтобы медленный приёмник журнала
+    не останавливал опрос API.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Возвращает запись без изменений."""
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Кладёт запись в очередь, не дожидаясь свободного места."""
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            pass
+
+
+class Listener(QueueListener):
+    """Фоновый поток записи журнала, который можно остановить повторно."""
+
+    def stop(self) -> None:
+        """Дописывает очередь и останавливает поток, если он запущен."""
+        if self._thread is not None:
+            super().stop()
+
+
+def make_async(handler: logging.Handler,
+               maxsize: int = 10000) -> logging.Handler:
+    """Оборачивает обработчик в очередь с фоновым потоком записи."""
+    records = queue.Queue(maxsize=maxsize)
+    listener = Listener(records, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    queue_handler = LazyQueueHandler(records)
+    queue_handler.listener = listener
+    return queue_handler
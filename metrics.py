@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+import threading
+import time
+from typing import (
+    TYPE_CHECKING, Callable, Dict, Iterable, Iterator, Optional, Tuple
+)
+
+from settings import env_str
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+METRICS_HOST = env_str('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = env_str('METRICS_PORT', '')
+
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+_lock = threading.Lock()
+_histograms: Dict[str, list] = {}
+_counters: Dict[Tuple[str, str, str], float] = {}
+_gauges: Dict[str, float] = {}
+
+
+def observe(stage: str, seconds: float) -> None:
+    """Добавляет длительность этапа в его гистограмму."""
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0]
+            _histograms[stage] = histogram
+        histogram[0][bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        histogram[1] += seconds
+        histogram[2] += 1
+
+
+def increment(name: str, label: str = '', value: float = 1,
+              label_name: str = 'exception') -> None:
+    """Увеличивает счётчик `name` с меткой `label_name`=`label`."""
+    key = (name, label_name, label)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name: str, value: float) -> None:
+    """Устанавливает текущее значение показателя."""
+    with _lock:
+        _gauges[name] = value
+
+
+def count_error(error: Exception) -> None:
+    """Учитывает исключение по имени его класса."""
+    increment('errors_total', type(error).__name__)
+
+
+@contextmanager
+def timer(stage: str, count_errors: bool = True) -> Iterator[None]:
+    """Измеряет длительность блока и учитывает ошибки в нём."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as error:
+        if count_errors:
+            count_error(error)
+        raise
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def timed(stage: str) -> Callable:
+    """Декоратор, измеряющий длительность вызовов функции."""
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def reset() -> None:
+    """Сбрасывает все накопленные показатели."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+
+
+def snapshot() -> dict:
+    """Возвращает копию всех показателей для объединения и вывода."""
+    with _lock:
+        return {
+            'histograms': {
+                stage: [list(buckets), total, count]
+                for stage, (buckets, total, count) in _histograms.items()
+            },
+            'counters': dict(_counters),
+            'gauges': dict(_gauges),
+        }
+
+
+def merge(snapshots: Iterable[dict]) -> dict:
+    """Объединяет снимки показателей нескольких процессов.
+
+    Гистограммы и счётчики суммируются, для показателей берётся
+    наибольшее значение.
+    """
+    merged = {'histograms': {}, 'counters': {}, 'gauges': {}}
+    histograms = merged['histograms']
+    counters = merged['counters']
+    gauges = merged['gauges']
+    for data in snapshots:
+        for stage, (buckets, total, count) in data['histograms'].items():
+            histogram = histograms.get(stage)
+            if histogram is None:
+                histograms[stage] = [list(buckets), total, count]
+                continue
+            histogram[0] = [a + b for a, b in zip(histogram[0], buckets)]
+            histogram[1] += total
+            histogram[2] += count
+        for key, value in data['counters'].items():
+            counters[key] = counters.get(key, 0) + value
+        for name, value in data['gauges'].items():
+            gauges[name] = max(gauges.get(name, value), value)
+    return merged
+
+
+def render(data: Optional[dict] = None) -> str:
+    """Возвращает показатели в текстовом формате Prometheus."""
+    data = snapshot() if data is None else data
+    lines = []
+    if data['histograms']:
+        lines.append('# TYPE homework_bot_stage_seconds histogram')
+    for stage, (buckets, total, count) in sorted(data['histograms'].items()):
+        cumulative = 0
+        for bound, bucket in zip(LATENCY_BUCKETS, buckets):
+            cumulative += bucket
+            lines.append(
+                'homework_bot_stage_seconds_bucket'
+                f'{{stage="{stage}",le="{bound}"}} {cumulative}'
+            )
+        lines.append(
+            f'homework_bot_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} '
+            f'{count}'
+        )
+        lines.append(
+            f'homework_bot_stage_seconds_sum{{stage="{stage}"}} {total}'
+        )
+        lines.append(
+            f'homework_bot_stage_seconds_count{{stage="{stage}"}} {count}'
+        )
+
+    previous = None
+    for (name, label_name, label), value in sorted(data['counters'].items()):
+        if name != previous:
+            lines.append(f'# TYPE homework_bot_{name} counter')
+            previous = name
+        labels = f'{{{label_name}="{label}"}}' if label else ''
+        lines.append(f'homework_bot_{name}{labels} {value:g}')
+
+    for name, value in sorted(data['gauges'].items()):
+        lines.append(f'# TYPE homework_bot_{name} gauge')
+        lines.append(f'homework_bot_{name} {value:g}')
+    return '\n'.join(lines) + '\n'
+
+
+def start_server(port: int, host: str = METRICS_HOST,
+                 source: Callable[[], dict] = snapshot,
+                 ) -> ThreadingHTTPServer:
+    """Запускает HTTP-сервер показателей в фоновом потоке.
+
+    Показатели для ответа берутся из `source`. Модуль сервера
+    импортируется только здесь, чтобы http.server не загружался
+    при старте бота без METRICS_PORT.
+    """
+    from metrics_server import MetricsHandler, ThreadingHTTPServer
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.source = source
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name='metrics', daemon=True
+    ).start()
+    return server
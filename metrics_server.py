@@ -0,0 +1,24 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from metrics import render
+
+__all__ = ('MetricsHandler', 'ThreadingHTTPServer')
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Отдаёт показатели по адресу /metrics."""
+
+    def do_GET(self) -> None:
+        """Возвращает показатели в текстовом формате Prometheus."""
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render(self.server.source()).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        """Отключает журнал запросов к показателям."""
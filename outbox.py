@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+import metrics
+from delivery import with_mode
+from exceptions import OutboxError
+from settings import env_int, env_str
+
+OUTBOX_FILE = env_str('OUTBOX_FILE', '')
+OUTBOX_COMPACT_RECORDS = env_int('OUTBOX_COMPACT_RECORDS', 1000)
+
+logger = logging.getLogger('homework_bot.outbox')
+
+
+def entry_record(entry_id: int, chat_id: str, text: str) -> dict:
+    """Готовит запись журнала о сообщении вместе с режимом разметки."""
+    return {
+        'id': entry_id, 'chat_id': chat_id, 'text': str(text),
+        'parse_mode': getattr(text, 'parse_mode', None),
+    }
+
+
+class Outbox:
+    """Журнал исходящих сообщений Telegram, дописываемый в файл.
+
+    Сообщение записывается в журнал до отправки, а после доставки
+    в журнал дописывается отметка о ней. Записи о новых сообщениях
+    сбрасываются на диск одним fsync на группу в `sync`, отметки о
+    доставке — вместе со следующей группой: их потеря приводит лишь
+    к повторной отправке. При запуске недоставленные сообщения
+    восстанавливаются из журнала, а когда в нём накапливается
+    много доставленных записей, он переписывается без них.
+    """
+
+    def __init__(self, path: str,
+                 compact_records: int = OUTBOX_COMPACT_RECORDS) -> None:
+        """Открывает журнал и восстанавливает недоставленные сообщения."""
+        self.path = path
+        self.compact_records = compact_records
+        self._entries: Dict[int, Tuple[str, str]] = {}
+        self._in_flight: Set[int] = set()
+        self._next_id = 1
+        self._records = 0
+        self._unsynced = False
+        self._file = None
+        self._lock = threading.Lock()
+        self.load()
+        try:
+            self._rewrite()
+        except OSError as error:
+            raise OutboxError(
+                f"Не удалось записать журнал сообщений '{self.path}': "
+                f'{error}.'
+            )
+
+    def load(self) -> None:
+        """Читает журнал, пропуская повреждённые записи."""
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            return
+        except OSError as error:
+            raise OutboxError(
+                f"Не удалось прочитать журнал сообщений '{self.path}': "
+                f'{error}.'
+            )
+        for number, line in enumerate(lines, 1):
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                logger.warning(
+                    "Пропущена повреждённая запись %d журнала сообщений "
+                    "'%s'.", number, self.path
+                )
+        if self._entries:
+            logger.info('В журнале найдено недоставленных сообщений: %d.',
+                        len(self._entries))
+
+    def _apply(self, record: dict) -> None:
+        entry_id = int(record['id'])
+        self._next_id = max(self._next_id, entry_id + 1)
+        if record.get('done'):
+            self._entries.pop(entry_id, None)
+            return
+        self._entries[entry_id] = (
+            str(record['chat_id']),
+            with_mode(record['text'], record.get('parse_mode')),
+        )
+
+    def _write(self, record: dict) -> None:
+        """Дописывает запись в журнал, не дожидаясь записи на диск."""
+        try:
+            self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self._file.flush()
+        except (OSError, ValueError) as error:
+            metrics.count_error(error)
+            logger.error('Сбой в работе программы: не удалось дописать '
+                         "журнал сообщений '%s': %s", self.path, error)
+            return
+        self._records += 1
+        self._unsynced = True
+
+    def append(self, chat_id: str, text: str) -> int:
+        """Записывает сообщение в журнал и возвращает его номер."""
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (str(chat_id), text)
+            self._write(entry_record(entry_id, str(chat_id), text))
+        metrics.increment('outbox_messages_total', 'appended',
+                          label_name='result')
+        return entry_id
+
+    def sync(self) -> bool:
+        """Сбрасывает дописанные записи на диск одним вызовом fsync."""
+        with self._lock:
+            if not self._unsynced:
+                return False
+            try:
+                with metrics.timer('outbox_fsync'):
+                    os.fsync(self._file.fileno())
+            except OSError as error:
+                logger.error('Сбой в работе программы: не удалось записать '
+                             "журнал сообщений '%s': %s", self.path, error)
+                return False
+            self._unsynced = False
+            return True
+
+    def take_pending(self) -> List[Tuple[int, str, str]]:
+        """Возвращает недоставленные сообщения, ещё не взятые в отправку.
+
+        Сообщения помечаются отправляемыми до вызова `complete`, чтобы
+        повторная выборка не отправила их дважды.
+        """
+        with self._lock:
+            entries = [
+                (entry_id, chat_id, text)
+                for entry_id, (chat_id, text) in self._entries.items()
+                if entry_id not in self._in_flight
+            ]
+            self._in_flight.update(entry_id for entry_id, _, _ in entries)
+            metrics.set_gauge('outbox_pending', len(self._entries))
+        return entries
+
+    def complete(self, entry_id: int, delivered: bool) -> None:
+        """Отмечает доставку сообщения или возвращает его к повтору."""
+        with self._lock:
+            self._in_flight.discard(entry_id)
+            if not delivered or self._entries.pop(entry_id, None) is None:
+                return
+            self._write({'id': entry_id, 'done': True})
+        metrics.increment('outbox_messages_total', 'delivered',
+                          label_name='result')
+
+    def pending(self) -> int:
+        """Возвращает число недоставленных сообщений."""
+        with self._lock:
+            return len(self._entries)
+
+    def compact(self, force: bool = False) -> bool:
+        """Переписывает журнал, оставляя только недоставленные сообщения.
+
+        Без `force` журнал переписывается, когда в нём не меньше
+        `compact_records` записей и хотя бы половина из них устарела.
+        """
+        with self._lock:
+            if not force and (
+                self._records < self.compact_records
+                or self._records < 2 * len(self._entries)
+            ):
+                return False
+            try:
+                self._rewrite()
+            except OSError as error:
+                logger.error('Сбой в работе программы: не удалось сжать '
+                             "журнал сообщений '%s': %s", self.path, error)
+                return False
+        return True
+
+    def _rewrite(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=directory, prefix='.outbox-'
+        )
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+                for entry_id, (chat_id, text) in self._entries.items():
+                    file.write(json.dumps(
+                        entry_record(entry_id, chat_id, text),
+                        ensure_ascii=False,
+                    ) + '\n')
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._records = len(self._entries)
+        self._unsynced = False
+
+    def close(self) -> None:
+        """Сбрасывает журнал на диск и закрывает файл."""
+        self.sync()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def open_outbox(path: str = OUTBOX_FILE) -> Optional[Outbox]:
+    """Открывает журнал сообщений, если для него задан файл."""
+    if not path:
+        return None
+    return Outbox(path)
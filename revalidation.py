@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+import metrics
+from settings import env_flag
+
+if TYPE_CHECKING:
+    import requests
+
+HTTP_REVALIDATE = env_flag('HTTP_REVALIDATE')
+
+NOT_MODIFIED = 304
+CURRENT_DATE_PATTERN = re.compile(rb'"current_date"\s*:\s*(-?\d+)')
+
+
+def body_digest(body: bytes) -> Tuple[bytes, Optional[int]]:
+    """Возвращает хэш тела ответа без поля `current_date` и само поле.
+
+    API возвращает в `current_date` текущее время, поэтому тело
+    меняется при каждом опросе; для сравнения с прошлым ответом это
+    поле вырезается из байтов без разбора JSON.
+    """
+    matches = list(CURRENT_DATE_PATTERN.finditer(body))
+    if len(matches) != 1:
+        return hashlib.blake2b(body, digest_size=16).digest(), None
+    match = matches[0]
+    digest = hashlib.blake2b(body[:match.start()], digest_size=16)
+    digest.update(body[match.end():])
+    return digest.digest(), int(match.group(1))
+
+
+class CachedResponse:
+    """Последний разобранный ответ API для одного токена."""
+
+    __slots__ = ('etag', 'last_modified', 'digest', 'data', 'size')
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str],
+                 digest: bytes, data: dict, size: int) -> None:
+        """Запоминает валидаторы, хэш тела и разобранные данные."""
+        self.etag = etag
+        self.last_modified = last_modified
+        self.digest = digest
+        self.data = data
+        self.size = size
+
+
+class ResponseCache:
+    """Условные запросы к API и пропуск разбора неизменившихся ответов.
+
+    Если эндпоинт отдаёт `ETag` или `Last-Modified`, следующий запрос
+    с тем же токеном уходит с `If-None-Match`/`If-Modified-Since`,
+    и на ответ 304 возвращаются прошлые данные. Иначе тело ответа
+    сравнивается с прошлым по хэшу байтов: при совпадении разбор JSON
+    пропускается, а из тела берётся только новый `current_date`.
+    """
+
+    def __init__(self, enabled: bool = HTTP_REVALIDATE) -> None:
+        """Создаёт пустой кэш ответов."""
+        self.enabled = enabled
+        self._entries: Dict[str, CachedResponse] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(headers: dict) -> str:
+        return headers.get('Authorization', '')
+
+    def request_headers(self, headers: dict) -> dict:
+        """Добавляет к заголовкам валидаторы прошлого ответа."""
+        entry = self._entries.get(self._key(headers)) if self.enabled else None
+        if entry is None or not (entry.etag or entry.last_modified):
+            return headers
+        headers = dict(headers)
+        if entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def match(self, headers: dict,
+              response: requests.Response) -> Optional[dict]:
+        """Возвращает прошлые данные, если ответ не изменился."""
+        if not self.enabled:
+            return None
+        entry = self._entries.get(self._key(headers))
+        if response.status_code == NOT_MODIFIED:
+            if entry is None:
+                return None
+            metrics.increment('response_savings_total', 'not_modified',
+                              label_name='kind')
+            metrics.increment('response_saved_bytes_total', 'not_modified',
+                              entry.size, label_name='kind')
+            return entry.data
+        body = getattr(response, 'content', None)
+        if not isinstance(body, bytes):
+            return None
+        count_compression(response, body)
+        if entry is None:
+            return None
+        digest, current_date = body_digest(body)
+        if digest != entry.digest:
+            return None
+        metrics.increment('response_savings_total', 'body_unchanged',
+                          label_name='kind')
+        metrics.increment('response_saved_bytes_total', 'body_unchanged',
+                          len(body), label_name='kind')
+        if current_date is None:
+            return entry.data
+        return {**entry.data, 'current_date': current_date}
+
+    def store(self, headers: dict, response: requests.Response,
+              data: dict) -> None:
+        """Запоминает разобранный ответ и его валидаторы."""
+        body = getattr(response, 'content', None)
+        if not self.enabled or not isinstance(body, bytes):
+            return
+        response_headers = getattr(response, 'headers', None) or {}
+        entry = CachedResponse(
+            response_headers.get('ETag'),
+            response_headers.get('Last-Modified'),
+            body_digest(body)[0], data, len(body),
+        )
+        with self._lock:
+            self._entries[self._key(headers)] = entry
+
+    def clear(self) -> None:
+        """Забывает все сохранённые ответы."""
+        with self._lock:
+            self._entries.clear()
+
+
+def count_compression(response: requests.Response, body: bytes) -> None:
+    """Учитывает байты, сэкономленные сжатием ответа."""
+    if not response.headers.get('Content-Encoding'):
+        return
+    try:
+        wire_size = response.raw.tell()
+    except (AttributeError, OSError):
+        return
+    if 0 < wire_size < len(body):
+        metrics.increment('response_saved_bytes_total', 'compression',
+                          len(body) - wire_size, label_name='kind')
@@ -0,0 +1,102 @@
+import random
+import threading
+import time
+from typing import Iterable, Optional
+
+from settings import env_float
+
+POLL_FLOOR = env_float('POLL_FLOOR', 120)
+POLL_CEILING = env_float('POLL_CEILING', 1800)
+POLL_BACKOFF = env_float('POLL_BACKOFF', 2)
+POLL_JITTER = env_float('POLL_JITTER', 0.2)
+
+ACTIVE_STATUSES = frozenset(('reviewing',))
+
+
+class PollScheduler:
+    """Подбирает паузу между запросами к API.
+
+    Пока работа на проверке, опрос идёт с минимальной паузой `floor`.
+    Подряд идущие пустые ответы и ошибки увеличивают паузу от `base`
+    в `backoff` раз вплоть до `ceiling`; случайный разброс `jitter`
+    применяется только к приросту паузы сверх `base`. Планировщики с
+    одинаковым `seed` при одинаковых ответах выбирают одинаковые паузы.
+    """
+
+    def __init__(self, base: float, floor: float = POLL_FLOOR,
+                 ceiling: float = POLL_CEILING,
+                 backoff: float = POLL_BACKOFF,
+                 jitter: float = POLL_JITTER,
+                 seed: Optional[str] = None) -> None:
+        """Создаёт планировщик с заданными границами паузы."""
+        self.base = base
+        self.floor = min(floor, base)
+        self.ceiling = max(ceiling, base)
+        self.backoff = backoff
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.active = False
+        self.idle_streak = 0
+        self.error_streak = 0
+        self.expedited = False
+        self._wake = threading.Event()
+
+    def record_success(self, changed: bool,
+                       statuses: Iterable[str] = ()) -> None:
+        """Учитывает успешный ответ API и текущие статусы работ."""
+        self.error_streak = 0
+        self.active = any(status in ACTIVE_STATUSES for status in statuses)
+        self.idle_streak = 0 if changed else self.idle_streak + 1
+
+    def record_error(self) -> None:
+        """Учитывает неудачный запрос к API."""
+        self.error_streak += 1
+
+    def expedite(self) -> None:
+        """Сокращает текущую или следующую паузу до `floor`."""
+        self.expedited = True
+        self._wake.set()
+
+    def wait(self, delay: float) -> bool:
+        """Выдерживает паузу `delay`, которую может прервать `expedite`.
+
+        После `expedite` опрос происходит не позже чем через `floor`
+        секунд от начала паузы. Возвращает True, если пауза сокращена.
+        """
+        started = time.monotonic()
+        wake_at = started + delay
+        shortened = False
+        while True:
+            remaining = wake_at - time.monotonic()
+            if remaining <= 0:
+                break
+            if self._wake.wait(remaining):
+                self._wake.clear()
+                shortened = started + self.floor < wake_at
+                wake_at = min(wake_at, started + self.floor)
+        self.expedited = False
+        return shortened
+
+    def _backoff_delay(self, streak: int) -> float:
+        delay = min(self.base * self.backoff ** (streak - 1), self.ceiling)
+        growth = delay - self.base
+        if growth > 0:
+            delay = self.base + growth * self.random.uniform(
+                1 - self.jitter, 1
+            )
+        return delay
+
+    def next_delay(self) -> float:
+        """Возвращает паузу перед следующим запросом в секундах."""
+        delay = self._next_delay()
+        if self.expedited:
+            self.expedited = False
+            return min(delay, self.floor)
+        return delay
+
+    def _next_delay(self) -> float:
+        if self.error_streak:
+            return self._backoff_delay(self.error_streak)
+        if self.active:
+            return self.floor
+        return self._backoff_delay(max(self.idle_streak, 1))
@@ -0,0 +1,29 @@
+import os
+
+from dotenv import load_dotenv
+
+# Настройки модулей читаются при импорте, поэтому env-файл
+# загружается до первого обращения к переменным окружения.
+load_dotenv()
+
+TRUE_VALUES = ('1', 'true', 'yes')
+
+
+def env_str(name: str, default: str = '') -> str:
+    """Возвращает строковую переменную окружения."""
+    return os.getenv(name, default)
+
+
+def env_int(name: str, default: int) -> int:
+    """Возвращает целочисленную переменную окружения."""
+    return int(os.getenv(name, default))
+
+
+def env_float(name: str, default: float) -> float:
+    """Возвращает дробную переменную окружения."""
+    return float(os.getenv(name, default))
+
+
+def env_flag(name: str) -> bool:
+    """Проверяет, что переменная окружения включает режим."""
+    return os.getenv(name, '').lower() in TRUE_VALUES
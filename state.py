@@ -0,0 +1,137 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from exceptions import StateStoreError
+from settings import env_float, env_str
+
+STATE_FILE = env_str('STATE_FILE', '')
+STATE_FLUSH_INTERVAL = env_float('STATE_FLUSH_INTERVAL', 5)
+
+
+def homework_key(homework: dict) -> str:
+    """Возвращает ключ домашней работы: её id или название."""
+    if 'id' in homework:
+        return str(homework['id'])
+    return str(homework.get('homework_name'))
+
+
+class StateStore:
+    """Хранит курсор опроса и последние отправленные статусы.
+
+    Изменения копятся в памяти и записываются на диск не чаще,
+    чем раз в `flush_interval` секунд, через временный файл и
+    атомарное переименование. Без пути хранилище работает только
+    в памяти.
+    """
+
+    def __init__(self, path: Optional[str] = None,
+                 flush_interval: float = STATE_FLUSH_INTERVAL) -> None:
+        """Создаёт хранилище и загружает сохранённое состояние."""
+        self.path = path or None
+        self.flush_interval = flush_interval
+        self._tenants = {}
+        self._dirty = False
+        self._last_flush = float('-inf')
+        self._lock = threading.Lock()
+        if self.path:
+            self.load()
+
+    def load(self) -> None:
+        """Загружает состояние с диска, если файл существует."""
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as error:
+            raise StateStoreError(
+                f"Не удалось прочитать файл состояния '{self.path}': "
+                f'{error}.'
+            )
+        self._tenants = data.get('tenants', {})
+
+    def export(self) -> dict:
+        """Возвращает копию состояния всех студентов."""
+        with self._lock:
+            return json.loads(json.dumps(self._tenants))
+
+    def replace(self, tenants: dict) -> None:
+        """Заменяет состояние всех студентов и помечает его к записи."""
+        with self._lock:
+            self._tenants = dict(tenants)
+            self._dirty = True
+
+    def _tenant(self, tenant_key: str) -> dict:
+        return self._tenants.setdefault(
+            str(tenant_key), {'cursor': None, 'statuses': {}}
+        )
+
+    def get_cursor(self, tenant_key: str, default: int) -> int:
+        """Возвращает сохранённый курсор или значение по умолчанию."""
+        cursor = self._tenants.get(str(tenant_key), {}).get('cursor')
+        return default if cursor is None else cursor
+
+    def set_cursor(self, tenant_key: str, cursor: int) -> None:
+        """Запоминает курсор, с которого продолжится опрос."""
+        with self._lock:
+            tenant = self._tenant(tenant_key)
+            if tenant['cursor'] != cursor:
+                tenant['cursor'] = cursor
+                self._dirty = True
+
+    def statuses(self, tenant_key: str) -> dict:
+        """Возвращает отправленные статусы всех работ студента."""
+        return self._tenants.get(str(tenant_key), {}).get('statuses', {})
+
+    def get_status(self, tenant_key: str, homework: dict) -> Optional[str]:
+        """Возвращает последний отправленный статус домашней работы."""
+        return self.statuses(tenant_key).get(homework_key(homework))
+
+    def is_new_status(self, tenant_key: str, homework: dict) -> bool:
+        """Проверяет, отличается ли статус от последнего отправленного."""
+        return self.get_status(tenant_key, homework) != homework.get('status')
+
+    def set_status(self, tenant_key: str, homework: dict) -> None:
+        """Запоминает отправленный статус домашней работы."""
+        with self._lock:
+            statuses = self._tenant(tenant_key)['statuses']
+            key = homework_key(homework)
+            if statuses.get(key) != homework.get('status'):
+                statuses[key] = homework.get('status')
+                self._dirty = True
+
+    def flush(self, force: bool = False) -> bool:
+        """Записывает накопленные изменения и сообщает, была ли запись."""
+        if not self.path or not self._dirty:
+            return False
+        if (not force
+                and time.monotonic() - self._last_flush < self.flush_interval):
+            return False
+
+        with self._lock:
+            data = json.dumps({'tenants': self._tenants}, ensure_ascii=False)
+            self._dirty = False
+        directory = os.path.dirname(os.path.abspath(self.path))
+        temp_path = None
+        try:
+            descriptor, temp_path = tempfile.mkstemp(
+                dir=directory, prefix='.state-'
+            )
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, self.path)
+        except OSError as error:
+            self._dirty = True
+            if temp_path and os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise StateStoreError(
+                f"Не удалось записать файл состояния '{self.path}': {error}."
+            )
+        self._last_flush = time.monotonic()
+        return True
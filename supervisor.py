@@ -0,0 +1,370 @@
+from bisect import bisect
+import glob
+import hashlib
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from typing import Dict, Iterable, List, Mapping, Optional
+
+import metrics
+from config import CONFIG_RELOAD
+from delivery import TELEGRAM_GLOBAL_RATE
+from engine import TENANTS_FILE, Tenant, load_tenants, read_tenants, serve
+from exceptions import EnvironmentParameterError
+from governor import API_BURST, API_RATE
+from history import HISTORY_DIR
+from homework import GOVERNOR, HISTORY, TELEGRAM_TOKEN, init_logger, logger
+from metrics import METRICS_PORT
+from outbox import OUTBOX_FILE, Outbox, open_outbox
+from settings import env_float, env_int
+from state import STATE_FILE, STATE_FLUSH_INTERVAL, StateStore
+
+WORKER_COUNT = env_int('WORKER_COUNT', os.cpu_count() or 1)
+RING_REPLICAS = env_int('RING_REPLICAS', 100)
+WORKER_RESTART_DELAY = env_float('WORKER_RESTART_DELAY', 5)
+WORKER_RESTART_MAX_DELAY = 300
+WORKER_STABLE_AFTER = 60
+METRICS_PUSH_INTERVAL = env_float('METRICS_PUSH_INTERVAL', 5)
+
+
+def ring_hash(value: str) -> int:
+    """Возвращает устойчивый между процессами хэш строки."""
+    return int.from_bytes(
+        hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big'
+    )
+
+
+class HashRing:
+    """Кольцо согласованного хэширования.
+
+    Каждый узел занимает на кольце `replicas` точек; ключ достаётся
+    узлу первой точки по часовой стрелке. При добавлении узла к нему
+    переходит лишь около 1/N ключей, остальные остаются на месте.
+    """
+
+    def __init__(self, nodes: Iterable[int],
+                 replicas: int = RING_REPLICAS) -> None:
+        """Строит кольцо для заданных узлов."""
+        points = sorted(
+            (ring_hash(f'{node}#{replica}'), node)
+            for node in nodes for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node_for(self, key: str) -> int:
+        """Возвращает узел, которому принадлежит ключ."""
+        index = bisect(self._hashes, ring_hash(str(key)))
+        return self._nodes[index % len(self._nodes)]
+
+
+def shard_state_path(state_file: str, shard: int) -> str:
+    """Возвращает путь к файлу состояния рабочего процесса."""
+    root, extension = os.path.splitext(state_file)
+    return f'{root}.{shard}{extension}'
+
+
+def shard_state_files(state_file: str) -> Dict[int, str]:
+    """Находит файлы состояния рабочих процессов по номерам."""
+    root, extension = os.path.splitext(state_file)
+    files = {}
+    for path in glob.glob(f'{glob.escape(root)}.*{glob.escape(extension)}'):
+        shard = path[len(root) + 1:len(path) - len(extension)]
+        if shard.isdigit():
+            files[int(shard)] = path
+    return files
+
+
+def rebalance_state(state_file: str, ring: HashRing, shards: int,
+                    owners: Optional[Mapping[str, str]] = None) -> None:
+    """Раскладывает сохранённое состояние по файлам рабочих процессов.
+
+    Выполняется до запуска рабочих процессов: при изменении их числа
+    курсоры и статусы переехавших студентов попадают в файл нового
+    владельца. `owners` сопоставляет чату ключ кольца — токен
+    Практикума; чаты без него распределяются по своему номеру. Для
+    студента, найденного в нескольких файлах, берётся запись с самым
+    поздним курсором.
+    """
+    if not state_file:
+        return
+    existing = shard_state_files(state_file)
+    entries = {}
+    for path in [state_file, *existing.values()]:
+        for key, entry in StateStore(path).export().items():
+            known = entries.get(key)
+            if known is None or (entry.get('cursor') or 0) > (
+                known.get('cursor') or 0
+            ):
+                entries[key] = entry
+    owned: List[dict] = [{} for _ in range(shards)]
+    owners = owners or {}
+    for key, entry in entries.items():
+        owned[ring.node_for(owners.get(key, key))][key] = entry
+    for shard in range(shards):
+        store = StateStore(shard_state_path(state_file, shard))
+        store.replace(owned[shard])
+        store.flush(force=True)
+    for shard, path in existing.items():
+        if shard >= shards:
+            os.unlink(path)
+
+
+def rebalance_outboxes(outbox_file: str, ring: HashRing, shards: int,
+                       owners: Optional[Mapping[str, str]] = None) -> int:
+    """Переносит недоставленные сообщения из журналов без владельца.
+
+    Выполняется до запуска рабочих процессов: когда их становится
+    меньше, журналы лишних долей, как и общий журнал однопроцессного
+    режима, больше никто не читает. Их сообщения дописываются в
+    журнал процесса, которому по кольцу принадлежит чат, а сами
+    журналы удаляются. `owners` сопоставляет чату ключ кольца — токен
+    Практикума. Возвращает число перенесённых сообщений.
+    """
+    if not outbox_file:
+        return 0
+    orphans = [
+        path for shard, path in sorted(shard_state_files(outbox_file).items())
+        if shard >= shards
+    ]
+    if os.path.exists(outbox_file):
+        orphans.insert(0, outbox_file)
+    owners = owners or {}
+    targets: Dict[int, Outbox] = {}
+    moved = 0
+    for path in orphans:
+        source = Outbox(path)
+        for _, chat_id, text in source.take_pending():
+            shard = ring.node_for(owners.get(chat_id, chat_id))
+            if shard not in targets:
+                targets[shard] = Outbox(shard_state_path(outbox_file, shard))
+            targets[shard].append(chat_id, text)
+            moved += 1
+        source.close()
+    for target in targets.values():
+        target.close()
+    # Журналы удаляются только после записи сообщений на диск: при
+    # сбое сообщения будут отправлены дважды, но не потеряются.
+    for path in orphans:
+        os.unlink(path)
+    if moved:
+        logger.info('Перенесено недоставленных сообщений: %d.', moved)
+    return moved
+
+
+def push_metrics(updates, shard: int, interval: float) -> None:
+    """Периодически отправляет показатели процесса супервизору."""
+    while True:
+        time.sleep(interval)
+        updates.put((shard, os.getpid(), metrics.snapshot()))
+
+
+def stop_worker(signum, frame) -> None:
+    """Завершает рабочий процесс так, чтобы сработали блоки finally."""
+    raise SystemExit(0)
+
+
+def shard_tenants(tenants: Iterable[Tenant], ring: HashRing,
+                  shard: int) -> List[Tenant]:
+    """Оставляет студентов, которые принадлежат доле `shard`.
+
+    Доля определяется по токену Практикума: чаты одного студента
+    попадают в один процесс, и их запросы к API объединяются.
+    """
+    return [
+        tenant for tenant in tenants
+        if ring.node_for(tenant.practicum_token) == shard
+    ]
+
+
+def run_worker(shard: int, shards: int, replicas: int, updates) -> None:
+    """Опрашивает API для студентов своей доли кольца."""
+    signal.signal(signal.SIGTERM, stop_worker)
+    init_logger()
+    ring = HashRing(range(shards), replicas)
+    tenants = shard_tenants(load_tenants(TENANTS_FILE), ring, shard)
+    threading.Thread(
+        target=push_metrics, args=(updates, shard, METRICS_PUSH_INTERVAL),
+        name='metrics-push', daemon=True,
+    ).start()
+    logger.debug('Рабочий процесс %d опрашивает API для %d студентов.',
+                 shard, len(tenants))
+    state_path = shard_state_path(STATE_FILE, shard) if STATE_FILE else None
+    outbox_path = shard_state_path(OUTBOX_FILE, shard) if OUTBOX_FILE else ''
+    if HISTORY_DIR:
+        # История только дописывается, поэтому у каждого процесса
+        # свой каталог с номером доли.
+        HISTORY.path = f'{HISTORY_DIR.rstrip(os.sep)}.{shard}'
+    # Запросы к API идут с одного адреса, поэтому общий лимит
+    # запросов делится между процессами поровну.
+    GOVERNOR.set_rate(API_RATE / shards, API_BURST / shards)
+    # Получать команды getUpdates может только один процесс на токен,
+    # а общий лимит сообщений бота делится между процессами.
+    serve(
+        tenants, StateStore(state_path, STATE_FLUSH_INTERVAL),
+        metrics_port='', commands=False,
+        global_rate=TELEGRAM_GLOBAL_RATE / shards,
+        reload_tenants=lambda: shard_tenants(
+            read_tenants(TENANTS_FILE), ring, shard
+        ),
+        outbox=open_outbox(outbox_path),
+    )
+
+
+class Supervisor:
+    """Запускает рабочие процессы и перезапускает упавшие.
+
+    Студенты распределяются между процессами согласованным
+    хэшированием по токену Практикума. Показатели процессов собираются в
+    супервизоре и отдаются одним HTTP-сервером.
+    """
+
+    def __init__(self, workers: int = WORKER_COUNT,
+                 replicas: int = RING_REPLICAS,
+                 restart_delay: float = WORKER_RESTART_DELAY) -> None:
+        """Готовит супервизор для `workers` процессов."""
+        self.workers = workers
+        self.replicas = replicas
+        self.restart_delay = restart_delay
+        self._context = multiprocessing.get_context('spawn')
+        self.updates = self._context.Queue()
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self._started: Dict[int, float] = {}
+        self._crashes: Dict[int, int] = {}
+        self._restart_at: Dict[int, float] = {}
+        self._snapshots: Dict[int, dict] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def start_worker(self, shard: int) -> None:
+        """Запускает рабочий процесс для доли `shard`."""
+        process = self._context.Process(
+            target=run_worker, name=f'worker-{shard}',
+            args=(shard, self.workers, self.replicas, self.updates),
+        )
+        process.start()
+        self.processes[shard] = process
+        self._started[shard] = time.monotonic()
+        logger.debug('Запущен рабочий процесс %d (pid %s).',
+                     shard, process.pid)
+
+    def check_workers(self, now: Optional[float] = None) -> None:
+        """Планирует перезапуск упавших процессов и запускает их."""
+        now = time.monotonic() if now is None else now
+        for shard, process in list(self.processes.items()):
+            if process.is_alive() or shard in self._restart_at:
+                continue
+            if now - self._started[shard] > WORKER_STABLE_AFTER:
+                self._crashes[shard] = 0
+            crashes = self._crashes.get(shard, 0)
+            delay = min(self.restart_delay * 2 ** crashes,
+                        WORKER_RESTART_MAX_DELAY)
+            self._crashes[shard] = crashes + 1
+            self._restart_at[shard] = now + delay
+            metrics.increment('worker_restarts_total', str(shard),
+                              label_name='worker')
+            logger.error(
+                'Сбой в работе программы: рабочий процесс %d завершился '
+                'с кодом %s, перезапуск через %.0f с.',
+                shard, process.exitcode, delay,
+            )
+        for shard, restart_at in list(self._restart_at.items()):
+            if now >= restart_at:
+                del self._restart_at[shard]
+                self.start_worker(shard)
+
+    def collect_metrics(self) -> None:
+        """Принимает снимки показателей от рабочих процессов."""
+        while not self._stopped.is_set():
+            try:
+                shard, pid, data = self.updates.get(timeout=1)
+            except queue.Empty:
+                continue
+            with self._lock:
+                self._snapshots[pid] = data
+
+    def combined_metrics(self) -> dict:
+        """Объединяет показатели супервизора и всех процессов.
+
+        Снимки завершившихся процессов продолжают учитываться, чтобы
+        счётчики не уменьшались после перезапуска; их текущие
+        показатели отбрасываются.
+        """
+        alive = {process.pid for process in self.processes.values()}
+        with self._lock:
+            snapshots = [
+                data if pid in alive else {**data, 'gauges': {}}
+                for pid, data in self._snapshots.items()
+            ]
+        return metrics.merge([metrics.snapshot(), *snapshots])
+
+    def run(self, interval: float = 1.0) -> None:
+        """Запускает процессы и следит за ними до остановки."""
+        for shard in range(self.workers):
+            self.start_worker(shard)
+        threading.Thread(
+            target=self.collect_metrics, name='metrics-collect', daemon=True
+        ).start()
+        while not self._stopped.wait(interval):
+            self.check_workers()
+
+    def reload(self) -> None:
+        """Просит рабочие процессы перечитать настройки."""
+        for process in self.processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGHUP)
+
+    def stop(self, timeout: float = 10) -> None:
+        """Останавливает рабочие процессы, дав им сохранить состояние."""
+        self._stopped.set()
+        for process in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in self.processes.values():
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+
+
+def main() -> None:
+    """Запускает многопроцессный режим бота."""
+    init_logger()
+    if not TELEGRAM_TOKEN:
+        logger.critical(
+            "Отсутствует обязательная переменная окружения: "
+            "'TELEGRAM_TOKEN'. Программа принудительно остановлена."
+        )
+        raise EnvironmentParameterError(
+            "Отсутствует обязательная переменная окружения: "
+            "'TELEGRAM_TOKEN'. Программа принудительно остановлена."
+        )
+    tenants = load_tenants(TENANTS_FILE)
+    supervisor = Supervisor()
+    ring = HashRing(range(supervisor.workers), supervisor.replicas)
+    owners = {
+        chat_id: tenant.practicum_token
+        for tenant in tenants for chat_id in tenant.destinations
+    }
+    rebalance_state(STATE_FILE, ring, supervisor.workers, owners)
+    rebalance_outboxes(OUTBOX_FILE, ring, supervisor.workers, owners)
+    if METRICS_PORT:
+        metrics.start_server(
+            int(METRICS_PORT), source=supervisor.combined_metrics
+        )
+    signal.signal(signal.SIGTERM, lambda signum, frame: supervisor.stop())
+    if CONFIG_RELOAD:
+        signal.signal(
+            signal.SIGHUP, lambda signum, frame: supervisor.reload()
+        )
+    try:
+        supervisor.run()
+    finally:
+        supervisor.stop()
+
+
+if __name__ == '__main__':
+    main()
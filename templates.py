@@ -0,0 +1,154 @@
+from functools import lru_cache
+import html
+import json
+import re
+from typing import Dict, Optional, Tuple
+
+from exceptions import TemplateError
+from settings import env_int, env_str
+
+PLAIN = 'plain'
+HTML = 'html'
+MARKDOWN_V2 = 'markdown_v2'
+PARSE_MODES = {PLAIN: None, HTML: 'HTML', MARKDOWN_V2: 'MarkdownV2'}
+EMPHASIS = {PLAIN: '{}', HTML: '<b>{}</b>', MARKDOWN_V2: '*{}*'}
+
+MESSAGE_FORMAT = env_str('MESSAGE_FORMAT', PLAIN)
+MESSAGE_LOCALE = env_str('MESSAGE_LOCALE', 'ru')
+TEMPLATES_FILE = env_str('TEMPLATES_FILE', '')
+RENDER_CACHE_SIZE = env_int('RENDER_CACHE_SIZE', 1024)
+
+MARKDOWN_V2_SPECIAL = re.compile(r'([_*\[\]()~`>#+\-=|{}.!\\])')
+
+BUILTIN_LOCALES = {
+    'en': {
+        'message': 'Review status of "{homework_name}" has changed. '
+                   '{verdict}',
+        'verdicts': {
+            'approved': 'The reviewer approved the work. Hooray!',
+            'reviewing': 'The work is being reviewed.',
+            'rejected': 'The reviewer has some remarks.',
+        },
+    },
+}
+
+
+class FormattedMessage(str):
+    """Текст сообщения с режимом разметки Telegram."""
+
+    parse_mode: Optional[str] = None
+
+    def __new__(cls, text: str, parse_mode: Optional[str]):
+        """Создаёт строку с привязанным режимом разметки."""
+        message = super().__new__(cls, text)
+        message.parse_mode = parse_mode
+        return message
+
+
+def send_options(message: str) -> dict:
+    """Возвращает параметры `send_message` для режима разметки текста."""
+    parse_mode = getattr(message, 'parse_mode', None)
+    return {'parse_mode': parse_mode} if parse_mode else {}
+
+
+def escape(text: str, message_format: str) -> str:
+    """Экранирует текст для выбранного формата разметки."""
+    if message_format == HTML:
+        return html.escape(text, quote=False)
+    if message_format == MARKDOWN_V2:
+        return MARKDOWN_V2_SPECIAL.sub(r'\\\1', text)
+    return text
+
+
+class TemplateRegistry:
+    """Набор шаблонов сообщений по локалям.
+
+    Шаблон локали — строка с полями `{homework_name}` и `{verdict}`
+    и словарь вердиктов по статусам. При компиляции для каждой тройки
+    (статус, локаль, формат) заранее готовятся экранированные части
+    текста до и после названия работы.
+    """
+
+    def __init__(self, locales: Dict[str, dict]) -> None:
+        """Создаёт набор из встроенных и переданных локалей."""
+        self.locales = dict(BUILTIN_LOCALES)
+        self.locales.update(locales)
+        self.default_locale = next(iter(locales), 'en')
+        self._compiled: Dict[Tuple[str, str, str], Tuple[str, str]] = {}
+        self.compile()
+
+    def load_file(self, path: str) -> None:
+        """Добавляет локали из JSON-файла и перекомпилирует шаблоны."""
+        try:
+            with open(path, encoding='utf-8') as file:
+                self.locales.update(json.load(file))
+        except (OSError, ValueError) as error:
+            raise TemplateError(
+                f"Не удалось прочитать файл шаблонов '{path}': {error}."
+            )
+        self.compile()
+
+    def compile(self) -> None:
+        """Готовит части сообщений для всех статусов, локалей и форматов."""
+        default = self.locales[self.default_locale]['verdicts']
+        compiled = {}
+        for locale, spec in self.locales.items():
+            message = spec.get('message', '')
+            if message.count('{homework_name}') != 1:
+                raise TemplateError(
+                    f"Шаблон локали '{locale}' должен содержать "
+                    'ровно одно поле {homework_name}.'
+                )
+            verdicts = {**default, **spec.get('verdicts', {})}
+            for status, verdict in verdicts.items():
+                for message_format in PARSE_MODES:
+                    compiled[status, locale, message_format] = tuple(
+                        escape(part, message_format).replace(
+                            escape('{verdict}', message_format),
+                            escape(verdict, message_format),
+                        )
+                        for part in message.split('{homework_name}')
+                    )
+        self._compiled = compiled
+
+    def parts(self, status: str, locale: str,
+              message_format: str) -> Tuple[str, str]:
+        """Возвращает части сообщения до и после названия работы."""
+        return self._compiled[status, locale, message_format]
+
+    def renderer(self, locale: str = MESSAGE_LOCALE,
+                 message_format: str = MESSAGE_FORMAT,
+                 cache_size: int = RENDER_CACHE_SIZE) -> 'Renderer':
+        """Возвращает отрисовщик сообщений для локали и формата."""
+        if message_format not in PARSE_MODES:
+            raise TemplateError(
+                f"Неизвестный формат сообщений '{message_format}'."
+            )
+        if locale not in self.locales:
+            raise TemplateError(f"Неизвестная локаль '{locale}'.")
+        return Renderer(self, locale, message_format, cache_size)
+
+
+class Renderer:
+    """Отрисовывает сообщения о статусе с кэшем последних результатов."""
+
+    def __init__(self, registry: TemplateRegistry, locale: str,
+                 message_format: str, cache_size: int) -> None:
+        """Создаёт отрисовщик с ограниченным LRU-кэшем."""
+        self.registry = registry
+        self.locale = locale
+        self.message_format = message_format
+        self.parse_mode = PARSE_MODES[message_format]
+        self.render = lru_cache(maxsize=cache_size)(self._render)
+
+    def _render(self, homework_name: str, status: str) -> str:
+        before, after = self.registry.parts(
+            status, self.locale, self.message_format
+        )
+        name = EMPHASIS[self.message_format].format(
+            escape(homework_name, self.message_format)
+        )
+        text = f'{before}{name}{after}'
+        if self.parse_mode is None:
+            return text
+        return FormattedMessage(text, self.parse_mode)
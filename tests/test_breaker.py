@@ -0,0 +1,250 @@
+import pytest
+import requests
+
+import utils
+
+
+def make_breaker(clock, **kwargs):
+    from breaker import CircuitBreaker
+    options = {
+        'enabled': True, 'failure_threshold': 3, 'recovery_timeout': 10,
+        'jitter': 0, 'ramp': 0, 'clock': clock,
+    }
+    options.update(kwargs)
+    return CircuitBreaker('test', **options)
+
+
+class TestCircuitBreaker:
+
+    def test_opens_after_threshold_and_probes(self):
+        from breaker import CLOSED, HALF_OPEN, OPEN
+        clock = utils.FakeClock()
+        breaker = make_breaker(clock)
+        for _ in range(2):
+            breaker.record_failure()
+        assert breaker.state == CLOSED, (
+            'До порога сбоев предохранитель должен оставаться замкнутым.'
+        )
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow(), (
+            'Разомкнутый предохранитель должен отклонять вызовы.'
+        )
+        clock.now += 10
+        assert breaker.allow(), (
+            'По истечении паузы должен пропускаться пробный вызов.'
+        )
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow(), (
+            'Пока идёт пробный вызов, остальные должны отклоняться.'
+        )
+        breaker.record_success()
+        assert breaker.state == CLOSED and breaker.allow()
+
+    def test_failed_probe_doubles_pause(self):
+        from breaker import OPEN
+        clock = utils.FakeClock()
+        breaker = make_breaker(clock, failure_threshold=1)
+        breaker.record_failure()
+        clock.now += 10
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.retry_in() == 20, (
+            'После неудачной пробы пауза должна удваиваться.'
+        )
+
+    def test_success_resets_failures(self):
+        from breaker import CLOSED
+        breaker = make_breaker(utils.FakeClock())
+        for _ in range(5):
+            breaker.record_failure()
+            breaker.record_failure()
+            breaker.record_success()
+        assert breaker.state == CLOSED, (
+            'Сбои должны считаться только подряд.'
+        )
+
+    def test_recovery_is_staggered(self):
+        from breaker import stagger_share
+        clock = utils.FakeClock()
+        breaker = make_breaker(clock, failure_threshold=1, ramp=100)
+        breaker.record_failure()
+        clock.now += 10
+        assert breaker.allow('probe')
+        breaker.record_success()
+        keys = [f'OAuth token-{number}' for number in range(200)]
+        admitted = sum(breaker.allow(key) for key in keys)
+        assert admitted < 20, (
+            'Сразу после восстановления должна пропускаться лишь '
+            'малая часть вызовов.'
+        )
+        clock.now += 50
+        key = max(keys, key=stagger_share)
+        assert not breaker.allow(key)
+        assert breaker.retry_in(key) == pytest.approx(
+            stagger_share(key) * 100 - 50
+        )
+        clock.now += 50
+        assert all(breaker.allow(key) for key in keys), (
+            'По истечении `ramp` должны пропускаться все вызовы.'
+        )
+
+    def test_probe_key_skips_ramp(self):
+        from breaker import stagger_share
+        clock = utils.FakeClock()
+        breaker = make_breaker(clock, failure_threshold=1, ramp=100)
+        key = '123456789'
+        assert stagger_share(key) > 0.1
+        breaker.record_failure()
+        clock.now += 10
+        assert breaker.allow(key)
+        breaker.record_success()
+        clock.now += 1
+        assert breaker.allow(key) and breaker.retry_in(key) == 0, (
+            'Ключ, чья проба прошла успешно, не должен ждать '
+            'постепенного восстановления.'
+        )
+
+    def test_disabled_breaker_allows_everything(self):
+        breaker = make_breaker(utils.FakeClock(), enabled=False)
+        for _ in range(10):
+            breaker.record_failure()
+        assert breaker.allow() and breaker.retry_in() == 0
+
+    def test_telegram_outage_classification(self):
+        import telegram
+        from transport import is_telegram_outage
+        assert is_telegram_outage(telegram.error.TimedOut())
+        assert is_telegram_outage(telegram.error.RetryAfter(5))
+        assert not is_telegram_outage(
+            telegram.error.BadRequest('Chat not found')
+        ), 'Отказ в конкретном чате не должен считаться сбоем Telegram.'
+
+
+class TestBreakerIntegration:
+
+    @pytest.fixture
+    def api_breaker(self, monkeypatch):
+        import homework
+        breaker = make_breaker(utils.FakeClock(), failure_threshold=2)
+        monkeypatch.setattr(homework, 'API_BREAKER', breaker)
+        return breaker
+
+    def test_open_breaker_skips_api_request(self, monkeypatch, api_breaker):
+        import homework
+        from exceptions import CircuitOpenError, RequestError
+        calls = []
+
+        def failing_get(*args, **kwargs):
+            calls.append(1)
+            raise requests.ConnectionError('down')
+
+        monkeypatch.setattr(requests, 'get', failing_get)
+        for _ in range(2):
+            with pytest.raises(RequestError):
+                homework.get_api_answer(0)
+        with pytest.raises(CircuitOpenError):
+            homework.get_api_answer(0)
+        assert len(calls) == 2, (
+            'При разомкнутом предохранителе запрос к API '
+            'не должен отправляться.'
+        )
+
+    def test_client_errors_do_not_open_breaker(self, monkeypatch,
+                                               api_breaker):
+        import homework
+        from breaker import CLOSED
+        from exceptions import RequestStatusCodeError
+        monkeypatch.setattr(
+            requests, 'get',
+            lambda *args, **kwargs: utils.MockResponseGET(
+                *args, http_status=401, **kwargs
+            ),
+        )
+        for _ in range(5):
+            with pytest.raises(RequestStatusCodeError):
+                homework.get_api_answer(0)
+        assert api_breaker.state == CLOSED, (
+            'Ответы 4xx не говорят о недоступности API.'
+        )
+
+    def test_queue_holds_messages_while_open(self):
+        import telegram
+        from delivery import DeliveryQueue
+
+        class FlakyBot(utils.MockTelegramBot):
+            def __init__(self, **kwargs):
+                super().__init__(**kwargs)
+                self.sent = []
+                self.down = True
+
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                if self.down:
+                    raise telegram.error.TimedOut()
+                self.sent.append(text)
+
+        clock = utils.FakeClock()
+        breaker = make_breaker(clock, failure_threshold=1)
+        bot = FlakyBot()
+        queue = DeliveryQueue(bot, chat_rate=100, chat_burst=100,
+                              breaker=breaker)
+        queue.send_message('1', 'lost')
+        queue._deliver('1', queue._pending.pop('1'))
+        queue.send_message('1', 'held')
+        chat_id, wait = queue._next_batch()
+        assert chat_id is None and wait == 10, (
+            'Пока предохранитель разомкнут, сообщения должны ждать.'
+        )
+        bot.down = False
+        clock.now += 10
+        chat_id, batch = queue._next_batch()
+        queue._deliver(chat_id, batch)
+        assert bot.sent == ['held'] and not queue.pending()
+
+    def test_close_does_not_wait_for_breaker(self):
+        from delivery import DeliveryQueue
+        clock = utils.FakeClock()
+        breaker = make_breaker(clock, failure_threshold=1)
+        breaker.record_failure()
+        results = []
+        queue = DeliveryQueue(utils.MockTelegramBot(), breaker=breaker)
+        queue.start()
+        queue.send_message('1', 'held', on_done=results.append)
+        queue.close(timeout=5)
+        assert not queue._thread.is_alive(), (
+            'Остановка не должна ждать восстановления Telegram.'
+        )
+        assert results == [False], (
+            'Отброшенное сообщение должно остаться недоставленным в '
+            'журнале.'
+        )
+
+    def test_direct_send_waits_for_breaker(self, monkeypatch):
+        import time
+
+        import homework
+        from fanout import FanOut
+        breaker = make_breaker(time.monotonic, failure_threshold=1,
+                               recovery_timeout=0.05)
+        monkeypatch.setattr(homework, 'TELEGRAM_BREAKER', breaker)
+        fanout = FanOut(defer=lambda chat_id: breaker.retry_in(chat_id))
+        monkeypatch.setattr(homework, 'FANOUT', fanout)
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '123456789')
+        bot = utils.MockTelegramBot()
+        sent = []
+        bot.send_message = lambda chat_id, text, **kwargs: sent.append(text)
+        breaker.record_failure()
+        homework.send_message(bot, 'held')
+        assert not sent
+        for _ in range(50):
+            if sent:
+                break
+            time.sleep(0.02)
+        assert sent == ['held'], (
+            'Пока предохранитель разомкнут, сообщение должно ждать '
+            'в очереди, а не теряться.'
+        )
+        homework.send_message(bot, 'next')
+        assert sent == ['held', 'next']
+        fanout.close()
@@ -0,0 +1,192 @@
+import asyncio
+
+import pytest
+
+import utils
+
+
+class TestRequestCoalescer:
+
+    def test_concurrent_requests_share_one_call(self):
+        from coalescing import RequestCoalescer
+        coalescer = RequestCoalescer(ttl=0)
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {'current_date': 1}
+
+        async def run():
+            return await asyncio.gather(
+                *(coalescer.do(('token', 0), fetch) for _ in range(3)),
+                coalescer.do(('token', 5), fetch),
+            )
+
+        results = asyncio.run(run())
+        assert len(calls) == 2, (
+            'Одновременные запросы с одним токеном и курсором должны '
+            'объединяться в один.'
+        )
+        assert results[0] is results[1] is results[2]
+
+    def test_cache_expires(self):
+        from coalescing import RequestCoalescer
+        clock = utils.FakeClock()
+        coalescer = RequestCoalescer(ttl=5, clock=clock)
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            return len(calls)
+
+        assert asyncio.run(coalescer.do('key', fetch)) == 1
+        clock.now += 4
+        assert asyncio.run(coalescer.do('key', fetch)) == 1, (
+            'Ответ должен отдаваться из кэша в пределах `ttl`.'
+        )
+        clock.now += 2
+        assert asyncio.run(coalescer.do('key', fetch)) == 2
+
+    def test_errors_are_shared_but_not_cached(self):
+        from coalescing import RequestCoalescer
+        coalescer = RequestCoalescer(ttl=60)
+        calls = []
+
+        async def fail():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError('сбой')
+
+        async def run():
+            return await asyncio.gather(
+                coalescer.do('key', fail), coalescer.do('key', fail),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(result, ValueError) for result in results)
+        with pytest.raises(ValueError):
+            asyncio.run(coalescer.do('key', fail))
+        assert len(calls) == 2, 'Ошибки не должны кэшироваться.'
+
+    def test_follower_retries_after_leader_cancelled(self):
+        from coalescing import RequestCoalescer
+        coalescer = RequestCoalescer(ttl=0)
+
+        async def slow():
+            await asyncio.sleep(60)
+
+        async def fast():
+            return 'ответ'
+
+        async def run():
+            leader = asyncio.ensure_future(coalescer.do('key', slow))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(coalescer.do('key', fast))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower
+
+        assert asyncio.run(run()) == 'ответ', (
+            'Отмена запроса одного студента не должна отменять запросы '
+            'остальных.'
+        )
+
+
+class TestEngineCoalescing:
+
+    def test_chats_with_one_token_share_request(self):
+        import engine
+        requested = []
+
+        def request(headers, timestamp):
+            requested.append(timestamp)
+            return {
+                'homeworks': [
+                    {'id': 1, 'homework_name': 'hw', 'status': 'approved'}
+                ],
+                'current_date': 100,
+            }
+
+        bot = utils.MockTelegramBot()
+        sent = []
+        bot.send_message = lambda chat_id, text, **kwargs: sent.append(
+            chat_id
+        )
+        tenants = [engine.Tenant('token', chat_id, timestamp=0)
+                   for chat_id in ('student', 'mentor', 'curator')]
+        polling_engine = engine.PollingEngine(tenants, bot, request=request)
+        try:
+            asyncio.run(polling_engine.poll_once())
+        finally:
+            polling_engine.close()
+
+        assert requested == [0], (
+            'Чаты с одним токеном должны получать ответ одного запроса.'
+        )
+        assert sorted(sent) == ['curator', 'mentor', 'student'], (
+            'Новый статус должен отправляться в каждый чат.'
+        )
+        assert all(tenant.timestamp == 100 for tenant in tenants)
+
+    def test_shared_request_uses_earliest_cursor(self):
+        import engine
+        requested = []
+
+        def request(headers, timestamp):
+            requested.append(timestamp)
+            return {'homeworks': [], 'current_date': 100}
+
+        tenants = [engine.Tenant('token', 'student', timestamp=50),
+                   engine.Tenant('token', 'mentor', timestamp=30)]
+        polling_engine = engine.PollingEngine(
+            tenants, utils.MockTelegramBot(), request=request
+        )
+        try:
+            asyncio.run(polling_engine.poll_once())
+            latecomer = engine.Tenant('token', 'curator', timestamp=10)
+            polling_engine.tenants.append(latecomer)
+            polling_engine._index_tokens()
+            asyncio.run(polling_engine.poll_tenant(latecomer))
+        finally:
+            polling_engine.close()
+
+        assert requested == [30, 10], (
+            'Общий запрос должен идти с самого раннего курсора, а чат '
+            'с курсором раньше закэшированного — запрашивать API сам.'
+        )
+        assert all(tenant.timestamp == 100 for tenant in tenants)
+
+    def test_schedulers_of_one_token_agree(self):
+        import engine
+        first = engine.Tenant('token', '1')
+        second = engine.Tenant('token', '2')
+        delays = []
+        for tenant in (first, second):
+            for _ in range(4):
+                tenant.scheduler.record_success(False)
+            delays.append(
+                [tenant.scheduler.next_delay() for _ in range(3)]
+            )
+        assert delays[0] == delays[1], (
+            'Паузы чатов одного токена не должны расходиться, иначе их '
+            'запросы перестанут объединяться.'
+        )
+
+
+class TestSharding:
+
+    def test_chats_of_one_token_share_worker(self):
+        import engine
+        from supervisor import HashRing, shard_tenants
+        ring = HashRing(range(4))
+        tenants = [engine.Tenant('token', str(chat_id))
+                   for chat_id in range(20)]
+        owners = [
+            shard for shard in range(4)
+            if shard_tenants(tenants, ring, shard)
+        ]
+        assert len(owners) == 1, (
+            'Чаты одного токена должны опрашиваться одним процессом.'
+        )
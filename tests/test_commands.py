@@ -0,0 +1,104 @@
+from types import SimpleNamespace
+
+
+VERDICTS = {'approved': 'Принята.', 'reviewing': 'На проверке.'}
+
+
+class UpdatesBot:
+
+    def __init__(self, updates):
+        self.updates = updates
+        self.calls = []
+
+    def get_updates(self, **kwargs):
+        self.calls.append(kwargs)
+        updates, self.updates = self.updates, []
+        return updates
+
+
+def make_update(update_id, chat_id, text):
+    return SimpleNamespace(
+        update_id=update_id,
+        effective_message=SimpleNamespace(chat_id=chat_id, text=text),
+    )
+
+
+class TestSnapshotCache:
+
+    def test_status_from_snapshot(self):
+        from commands import SnapshotCache
+        cache = SnapshotCache(VERDICTS)
+        assert 'пока нет' in cache.status('1')
+        cache.update('1', [{'id': 1, 'homework_name': 'hw1',
+                            'status': 'reviewing'}])
+        cache.update('1', [{'id': 1, 'homework_name': 'hw1',
+                            'status': 'approved'}, {'bad': 'record'}])
+        answer = cache.status('1')
+        assert 'hw1: Принята.' in answer, (
+            'Ответ /status должен содержать последний статус работы.'
+        )
+        assert 'На проверке' not in answer
+
+    def test_history_is_bounded(self):
+        from commands import SnapshotCache
+        cache = SnapshotCache(VERDICTS, history_size=2)
+        for index in range(3):
+            cache.record_transition(
+                '1', {'homework_name': f'hw{index}', 'status': 'approved'}
+            )
+        answer = cache.history('1')
+        assert 'hw0' not in answer and 'hw2' in answer, (
+            'История должна хранить только последние изменения.'
+        )
+
+    def test_staleness(self):
+        from commands import SnapshotCache
+        cache = SnapshotCache(VERDICTS, ttl=60)
+        assert cache.is_stale('1')
+        cache.update('1', [], now=1000)
+        assert not cache.is_stale('1', now=1030)
+        assert cache.is_stale('1', now=1061)
+
+
+class TestCommandListener:
+
+    def test_answers_known_chats_from_cache(self):
+        from commands import CommandListener, SnapshotCache
+        cache = SnapshotCache(VERDICTS)
+        cache.update('1', [{'homework_name': 'hw', 'status': 'approved'}])
+        sent, stale = [], []
+        bot = UpdatesBot([
+            make_update(10, 1, '/status'),
+            make_update(11, 2, '/status'),
+            make_update(12, 1, 'привет'),
+            make_update(13, 1, '/history@homework_bot'),
+        ])
+        listener = CommandListener(
+            bot, cache, send=lambda chat, text: sent.append((chat, text)),
+            chat_ids=['1'], on_stale=stale.append,
+        )
+        assert listener.poll() == 4
+        assert [chat for chat, _ in sent] == ['1', '1'], (
+            'Бот должен отвечать только на команды из известных чатов.'
+        )
+        assert 'hw: Принята.' in sent[0][1]
+        assert listener.offset == 14, (
+            'Следующий getUpdates должен подтверждать полученные обновления.'
+        )
+        assert not stale
+
+    def test_stale_snapshot_requests_refresh(self):
+        from commands import CommandListener, SnapshotCache
+        cache = SnapshotCache(VERDICTS, ttl=0)
+        cache.update('1', [], now=0)
+        sent, stale = [], []
+        listener = CommandListener(
+            UpdatesBot([]), cache,
+            send=lambda chat, text: sent.append(text),
+            chat_ids=['1'], on_stale=stale.append,
+        )
+        listener.handle('1', '/status')
+        assert sent, 'Устаревший снимок должен отдаваться сразу.'
+        assert stale == ['1'], (
+            'Устаревший снимок должен запрашивать обновление у цикла опроса.'
+        )
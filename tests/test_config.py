@@ -0,0 +1,262 @@
+import asyncio
+import os
+import signal
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import utils
+
+
+def write_env(path, **values):
+    path.write_text(
+        ''.join(f'{name}={value}\n' for name, value in values.items())
+    )
+
+
+class TestConfigValues:
+
+    def test_file_overrides_environment(self, tmp_path, monkeypatch):
+        from config import read_values
+        monkeypatch.setenv('PRACTICUM_TOKEN', 'old')
+        path = tmp_path / '.env'
+        write_env(path, PRACTICUM_TOKEN='new')
+        assert read_values(str(path))['PRACTICUM_TOKEN'] == 'new', (
+            'При перечитывании значения из env-файла должны быть важнее '
+            'унаследованных процессом.'
+        )
+        assert read_values(str(tmp_path / 'missing'))[
+            'PRACTICUM_TOKEN'
+        ] == 'old'
+
+    def test_invalid_values_are_rejected(self):
+        from config import validate_values
+        from exceptions import EnvironmentParameterError
+        required = ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN')
+        validate_values(
+            {'PRACTICUM_TOKEN': 'a', 'TELEGRAM_TOKEN': '1234:abc'}, required
+        )
+        with pytest.raises(EnvironmentParameterError):
+            validate_values({'TELEGRAM_TOKEN': '1234:abc'}, required)
+        with pytest.raises(EnvironmentParameterError):
+            validate_values(
+                {'PRACTICUM_TOKEN': 'a', 'TELEGRAM_TOKEN': 'broken'}, required
+            )
+
+
+class TestConfigReloader:
+
+    def test_invalid_config_keeps_previous(self):
+        import metrics
+        from config import ConfigReloader
+        metrics.reset()
+        results = iter([ValueError('broken'), 'second'])
+
+        def load():
+            result = next(results)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        reloader = ConfigReloader(load, enabled=True)
+        assert not reloader.reload()
+        assert reloader.take() is None, (
+            'Настройки с ошибкой не должны применяться.'
+        )
+        assert reloader.reload()
+        assert reloader.take() == 'second'
+        assert reloader.take() is None, (
+            'Снимок настроек должен применяться один раз.'
+        )
+        counters = metrics.snapshot()['counters']
+        assert counters['config_reloads_total', 'result', 'rejected'] == 1
+        assert counters['config_reloads_total', 'result', 'applied'] == 1
+
+    def test_file_change_triggers_reload(self, tmp_path):
+        from config import ConfigReloader
+        path = tmp_path / 'tenants.json'
+        path.write_text('[]')
+        reloader = ConfigReloader(
+            path.read_text, [str(path)], interval=0.02, enabled=True,
+        ).start()
+        try:
+            path.write_text('[1]')
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            for _ in range(100):
+                config = reloader.take()
+                if config is not None:
+                    break
+                time.sleep(0.01)
+        finally:
+            reloader.stop()
+        assert config == '[1]', (
+            'При изменении файла настройки должны перечитываться.'
+        )
+
+    def test_sighup_triggers_reload(self):
+        from config import ConfigReloader
+        previous = signal.getsignal(signal.SIGHUP)
+        reloader = ConfigReloader(
+            lambda: 'config', interval=0, enabled=True
+        ).start()
+        try:
+            os.kill(os.getpid(), signal.SIGHUP)
+            for _ in range(100):
+                config = reloader.take()
+                if config is not None:
+                    break
+                time.sleep(0.01)
+        finally:
+            reloader.stop()
+            signal.signal(signal.SIGHUP, previous)
+        assert config == 'config', (
+            'По сигналу SIGHUP настройки должны перечитываться.'
+        )
+
+    def test_disabled_reloader_does_not_start(self):
+        from config import ConfigReloader
+        reloader = ConfigReloader(lambda: 'config', enabled=False).start()
+        assert reloader._thread is None
+        reloader.request()
+        assert reloader.take() is None
+
+
+class TestHomeworkConfig:
+
+    def test_apply_config_swaps_tokens(self, tmp_path, monkeypatch):
+        import config
+        import homework
+        path = tmp_path / '.env'
+        write_env(path, PRACTICUM_TOKEN='rotated', TELEGRAM_TOKEN='1:new',
+                  TELEGRAM_CHAT_ID='777')
+        monkeypatch.setattr(
+            homework, 'read_values', lambda: config.read_values(str(path))
+        )
+        for name in ('PRACTICUM_TOKEN', 'TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID',
+                     'HEADERS', 'RENDERER'):
+            monkeypatch.setattr(homework, name, getattr(homework, name))
+
+        assert homework.apply_config(homework.load_config()), (
+            'Смена токена Telegram должна требовать нового бота.'
+        )
+        assert homework.HEADERS == {'Authorization': 'OAuth rotated'}
+        assert homework.TELEGRAM_CHAT_ID == '777'
+        bot = utils.MockTelegramBot()
+        homework.send_message(bot, 'message')
+        assert bot.chat_id == '777', (
+            'После применения настроек сообщения должны уходить в новый чат.'
+        )
+        assert not homework.apply_config(homework.load_config())
+
+    def test_reload_updates_command_chats(self, tmp_path, monkeypatch):
+        import config
+        import homework
+        from commands import CommandListener
+        path = tmp_path / '.env'
+        write_env(path, PRACTICUM_TOKEN='token', TELEGRAM_TOKEN='1:same',
+                  TELEGRAM_CHAT_ID='777, 888')
+        monkeypatch.setattr(
+            homework, 'read_values', lambda: config.read_values(str(path))
+        )
+        for name in ('PRACTICUM_TOKEN', 'TELEGRAM_CHAT_ID', 'HEADERS',
+                     'RENDERER'):
+            monkeypatch.setattr(homework, name, getattr(homework, name))
+        monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', '1:same')
+        pending = homework.load_config()
+        reloader = SimpleNamespace(take=lambda: pending)
+        listener = CommandListener(
+            utils.MockTelegramBot(), homework.SNAPSHOTS,
+            send=lambda chat_id, text: None, chat_ids=['1'],
+        )
+        bot = utils.MockTelegramBot()
+        assert homework.apply_pending_config(reloader, bot, listener) is bot
+        assert listener.chat_ids == {'777'}, (
+            'После смены TELEGRAM_CHAT_ID команды должны приниматься из '
+            'нового основного чата.'
+        )
+
+    def test_broken_templates_are_rejected(self, tmp_path, monkeypatch):
+        import homework
+        from exceptions import TemplateError
+        templates = tmp_path / 'templates.json'
+        templates.write_text('{"en": {"message": "no name"}}')
+        values = dict(os.environ, TEMPLATES_FILE=str(templates))
+        monkeypatch.setattr(homework, 'read_values', lambda: values)
+        with pytest.raises(TemplateError):
+            homework.load_config()
+
+
+class TestEngineReload:
+
+    def test_update_tenants_keeps_running_tenants(self):
+        import engine
+        first = engine.Tenant('token-1', '1')
+        second = engine.Tenant('token-2', '2')
+        polling_engine = engine.PollingEngine(
+            [first, second], utils.MockTelegramBot()
+        )
+
+        async def reload():
+            for tenant in polling_engine.tenants:
+                polling_engine._start_tenant(tenant)
+            removed = polling_engine._tasks['1']
+            polling_engine.update_tenants([
+                engine.Tenant('rotated', '2'), engine.Tenant('token-3', '3'),
+            ])
+            await asyncio.sleep(0)
+            tasks = dict(polling_engine._tasks)
+            for task in tasks.values():
+                task.cancel()
+            return removed, tasks
+
+        try:
+            removed, tasks = asyncio.run(reload())
+        finally:
+            polling_engine.close()
+        assert removed.cancelled(), (
+            'Опрос удалённого студента должен останавливаться.'
+        )
+        assert sorted(tasks) == ['2', '3'], (
+            'Новый студент должен начинать опрашиваться сразу.'
+        )
+        assert polling_engine.tenants[0] is second, (
+            'У оставшегося студента должно сохраняться состояние опроса.'
+        )
+        assert second.headers == {'Authorization': 'OAuth rotated'}
+
+    def test_reload_updates_command_chats(self, monkeypatch):
+        import engine
+        import homework
+        from commands import CommandListener
+        from config import Config
+        for name in ('PRACTICUM_TOKEN', 'TELEGRAM_CHAT_ID', 'HEADERS',
+                     'RENDERER'):
+            monkeypatch.setattr(homework, name, getattr(homework, name))
+        monkeypatch.setattr(homework, 'TELEGRAM_TOKEN', '1:same')
+        config = Config(
+            {'TELEGRAM_TOKEN': '1:same'}, homework.RENDERER,
+            [engine.Tenant('token-1', '1'), engine.Tenant('token-2', '2')],
+        )
+        polling_engine = engine.PollingEngine(
+            [engine.Tenant('token-1', '1')], utils.MockTelegramBot()
+        )
+        listener = CommandListener(
+            utils.MockTelegramBot(), homework.SNAPSHOTS,
+            send=lambda chat_id, text: None, chat_ids=['1'],
+        )
+
+        async def reload():
+            engine.apply_engine_config(config, polling_engine, listener)
+            for task in polling_engine._tasks.values():
+                task.cancel()
+
+        try:
+            asyncio.run(reload())
+        finally:
+            polling_engine.close()
+        assert listener.chat_ids == {'1', '2'}, (
+            'Новые студенты должны получать ответы на команды без '
+            'перезапуска.'
+        )
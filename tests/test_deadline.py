@@ -0,0 +1,205 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import requests
+
+import utils
+
+
+class TestDeadline:
+
+    def test_timeout_is_limited_by_budget(self):
+        from deadline import Deadline
+        now = [0.0]
+        deadline = Deadline(5, clock=lambda: now[0])
+        assert deadline.timeout(10) == 5, (
+            'Таймаут операции не должен превышать остаток бюджета.'
+        )
+        assert deadline.timeout(3) == 3
+        now[0] = 7
+        assert deadline.timeout(10, floor=1) == 1, (
+            'Таймаут не должен становиться меньше `floor`.'
+        )
+
+    def test_scope_sets_and_restores_deadline(self):
+        import deadline
+        assert deadline.current() is None
+        with deadline.scope(30) as current:
+            assert deadline.current() is current
+            with deadline.scope(0):
+                assert deadline.current() is current, (
+                    'Без бюджета должен действовать внешний бюджет.'
+                )
+        assert deadline.current() is None, (
+            'После выхода из блока бюджет должен сниматься.'
+        )
+
+    def test_requests_get_timeouts(self, monkeypatch):
+        import transport
+        monkeypatch.setattr(transport, 'HTTP_KEEP_ALIVE', False)
+        calls = []
+        monkeypatch.setattr(
+            requests, 'get', lambda url, **kwargs: calls.append(kwargs)
+        )
+        transport.get('https://example.com')
+        assert calls[0]['timeout'] == (
+            transport.HTTP_CONNECT_TIMEOUT, transport.HTTP_READ_TIMEOUT
+        ), 'Запрос к API должен отправляться с таймаутами.'
+
+    def test_expired_budget_skips_api_request(self, monkeypatch):
+        import deadline
+        import homework
+        from exceptions import DeadlineExceededError
+        calls = []
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: calls.append(1)
+        )
+        with deadline.scope(30) as current:
+            current.expires_at = 0
+            with pytest.raises(DeadlineExceededError):
+                homework.get_api_answer(0)
+        assert not calls, (
+            'После исчерпания бюджета запрос к API не должен отправляться.'
+        )
+
+    def test_send_message_timeout_follows_budget(self):
+        import deadline
+        import homework
+        import transport
+
+        class TimeoutBot(utils.MockTelegramBot):
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                self.timeout = kwargs['timeout']
+
+        bot = TimeoutBot()
+        with deadline.scope(30) as current:
+            current.expires_at = current.clock() + 2
+            homework.send_message(bot, 'message')
+        assert 1 <= bot.timeout <= 2, (
+            'Таймаут отправки должен ограничиваться бюджетом цикла.'
+        )
+        with deadline.scope(30) as current:
+            current.expires_at = 0
+            homework.send_message(bot, 'message')
+        assert bot.timeout == transport.TELEGRAM_MIN_TIMEOUT, (
+            'Сообщение должно отправляться и после исчерпания бюджета.'
+        )
+
+    def test_engine_threads_see_tenant_budget(self):
+        import deadline
+        import engine
+        polling_engine = engine.PollingEngine([], utils.MockTelegramBot())
+
+        async def poll():
+            with deadline.scope(30) as current:
+                seen = await polling_engine._in_thread(deadline.current)
+            return current, seen
+
+        try:
+            current, seen = asyncio.run(poll())
+        finally:
+            polling_engine.close()
+        assert seen is current, (
+            'Бюджет цикла должен доходить до запросов в пуле потоков.'
+        )
+
+
+class TestHedgedRequests:
+
+    def test_slow_request_is_hedged(self, monkeypatch):
+        import metrics
+        import transport
+        metrics.reset()
+        release = threading.Event()
+        calls = []
+
+        class Response:
+            def __init__(self, name):
+                self.name = name
+                self.closed = False
+
+            def close(self):
+                self.closed = True
+
+        slow = Response('slow')
+
+        def send_get(url, **kwargs):
+            calls.append(url)
+            if len(calls) == 1:
+                release.wait(5)
+                return slow
+            return Response('fast')
+
+        monkeypatch.setattr(transport, 'send_get', send_get)
+        response = transport.hedged_get('https://example.com', 0.05)
+        release.set()
+        assert response.name == 'fast', (
+            'Должен возвращаться первый полученный ответ.'
+        )
+        counters = metrics.snapshot()['counters']
+        assert counters['hedged_requests_total', 'kind', 'won'] == 1
+        for _ in range(50):
+            if slow.closed:
+                break
+            time.sleep(0.01)
+        assert slow.closed, 'Ответ опоздавшего запроса должен закрываться.'
+
+    def test_fast_request_is_not_hedged(self, monkeypatch):
+        import transport
+        calls = []
+        monkeypatch.setattr(
+            transport, 'send_get',
+            lambda url, **kwargs: calls.append(url) or url,
+        )
+        assert transport.hedged_get('https://example.com', 5) == (
+            'https://example.com'
+        )
+        assert len(calls) == 1, 'Быстрый запрос не должен дублироваться.'
+
+    def test_hedge_needs_governor_token(self, monkeypatch):
+        import metrics
+        import transport
+        metrics.reset()
+        calls = []
+
+        def send_get(url, **kwargs):
+            calls.append(url)
+            time.sleep(0.1)
+            return url
+
+        monkeypatch.setattr(transport, 'send_get', send_get)
+        assert transport.hedged_get(
+            'https://example.com', 0.01, lambda: False
+        ) == 'https://example.com'
+        assert len(calls) == 1, (
+            'Без разрешения ограничителя запрос не должен дублироваться.'
+        )
+        counters = metrics.snapshot()['counters']
+        assert counters['hedged_requests_total', 'kind', 'skipped'] == 1
+
+    def test_error_is_raised_only_if_both_fail(self, monkeypatch):
+        import transport
+        calls = []
+
+        def send_get(url, **kwargs):
+            calls.append(url)
+            if len(calls) == 1:
+                time.sleep(0.2)
+                raise requests.ConnectionError('slow failure')
+            return 'hedge'
+
+        monkeypatch.setattr(transport, 'send_get', send_get)
+        assert transport.hedged_get('https://example.com', 0.05) == 'hedge'
+
+        calls.clear()
+
+        def always_fail(url, **kwargs):
+            calls.append(url)
+            time.sleep(0.1)
+            raise requests.ConnectionError('down')
+
+        monkeypatch.setattr(transport, 'send_get', always_fail)
+        with pytest.raises(requests.ConnectionError):
+            transport.hedged_get('https://example.com', 0.05)
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+import requests
+
+import utils
+
+
+def chunked(data, size):
+    data = data.encode()
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestDecoding:
+    RESPONSE = {
+        'homeworks': [
+            {'id': 2, 'homework_name': 'Работа 2', 'status': 'approved'},
+            {'id': 1, 'homework_name': 'Работа 1', 'status': 'rejected'},
+        ],
+        'current_date': 1581604970,
+    }
+
+    @pytest.mark.parametrize('chunk_size', [1, 3, 7, 1024])
+    def test_stream_yields_homeworks(self, chunk_size):
+        from decoding import HomeworkStream
+        stream = HomeworkStream(
+            chunked(json.dumps(self.RESPONSE, ensure_ascii=False), chunk_size)
+        )
+        assert list(stream) == self.RESPONSE['homeworks'], (
+            'Потоковый разбор должен отдавать все работы по порядку.'
+        )
+        assert stream.current_date == 1581604970
+
+    def test_stream_current_date_first(self):
+        from decoding import HomeworkStream
+        data = '{"current_date": 12345, "homeworks": []}'
+        stream = HomeworkStream(chunked(data, 4))
+        assert list(stream) == []
+        assert stream.current_date == 12345, (
+            'Число на границе кусков должно разбираться целиком.'
+        )
+
+    @pytest.mark.parametrize('data, error', [
+        ('[1, 2]', TypeError),
+        ('{"homeworks": {}}', TypeError),
+        ('{"current_date": 1}', 'ResponseKeyError'),
+        ('{"homeworks": [{"id": 1', 'ResponseJsonError'),
+    ])
+    def test_stream_invalid_response(self, data, error):
+        import exceptions
+        from decoding import HomeworkStream
+        if isinstance(error, str):
+            error = getattr(exceptions, error)
+        with pytest.raises(error):
+            list(HomeworkStream(chunked(data, 5)))
+
+    def test_decode_response(self):
+        from decoding import decode_response
+        response = requests.Response()
+        response._content = json.dumps(self.RESPONSE).encode()
+        response.status_code = 200
+        assert decode_response(response) == self.RESPONSE
+        mock = utils.MockResponseGET(random_timestamp=1)
+        assert decode_response(mock) == mock.json(), (
+            'Для объектов, похожих на ответ, должен вызываться `json()`.'
+        )
@@ -0,0 +1,72 @@
+import time
+
+import utils
+
+
+class TestDelivery:
+
+    def test_token_bucket(self):
+        from delivery import TokenBucket
+        bucket = TokenBucket(rate=1, capacity=2)
+        assert bucket.wait_time() == 0
+        bucket.consume()
+        bucket.consume()
+        assert 0 < bucket.wait_time() <= 1, (
+            'Пустое ведро должно требовать ожидания нового токена.'
+        )
+
+    def test_coalesce_respects_limit(self):
+        from delivery import coalesce
+        assert coalesce(['a', 'b', 'c'], limit=10) == ['a\n\nb\n\nc']
+        parts = coalesce(['a' * 6, 'b' * 6, 'c' * 25], limit=10)
+        assert all(len(part) <= 10 for part in parts), (
+            'Склеенные сообщения не должны превышать лимит Telegram.'
+        )
+        assert ''.join(parts).replace('\n', '') == (
+            'a' * 6 + 'b' * 6 + 'c' * 25
+        )
+
+    def test_queue_coalesces_messages_per_chat(self):
+        from delivery import DeliveryQueue
+        bot = utils.RecordingBot()
+        queue = DeliveryQueue(bot, chat_rate=1, chat_burst=1)
+        queue.send_message('1', 'first')
+        queue.send_message('2', 'other')
+        queue.send_message('1', 'second')
+        queue.start()
+        queue.close(timeout=5)
+        assert sorted(bot.sent) == [
+            ('1', 'first\n\nsecond'), ('2', 'other')
+        ], 'Ожидающие сообщения одного чата должны склеиваться в одно.'
+
+    def test_queue_does_not_block_sender(self):
+        from delivery import DeliveryQueue
+
+        class SlowBot(utils.RecordingBot):
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                time.sleep(0.2)
+                super().send_message(chat_id, text)
+
+        bot = SlowBot()
+        queue = DeliveryQueue(bot).start()
+        start = time.monotonic()
+        queue.send_message('1', 'text')
+        assert time.monotonic() - start < 0.1, (
+            'Постановка в очередь не должна ждать Telegram.'
+        )
+        queue.close(timeout=5)
+        assert bot.sent == [('1', 'text')]
+
+    def test_coalesce_keeps_parse_mode(self):
+        from delivery import coalesce
+        from templates import FormattedMessage
+        parts = coalesce([
+            FormattedMessage('<b>a</b>', 'HTML'),
+            FormattedMessage('<b>b</b>', 'HTML'),
+            'plain <c>',
+        ])
+        assert parts == ['<b>a</b>\n\n<b>b</b>', 'plain <c>'], (
+            'Сообщения с разной разметкой не должны склеиваться.'
+        )
+        assert parts[0].parse_mode == 'HTML'
+        assert getattr(parts[1], 'parse_mode', None) is None
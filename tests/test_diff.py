@@ -0,0 +1,81 @@
+import time
+
+import requests
+
+import utils
+
+
+class TestDiff:
+
+    def test_diff_returns_only_transitions(self):
+        from diff import diff_homeworks
+        known = {'1': 'reviewing', '2': 'approved'}
+        homeworks = [
+            {'id': 3, 'homework_name': 'hw3', 'status': 'reviewing'},
+            {'id': 1, 'homework_name': 'hw1', 'status': 'rejected'},
+            {'id': 2, 'homework_name': 'hw2', 'status': 'approved'},
+        ]
+        transitions = diff_homeworks(known, homeworks)
+        assert [hw['id'] for hw in transitions] == [1, 3], (
+            'Убедитесь, что возвращаются только изменившиеся работы '
+            'в хронологическом порядке.'
+        )
+
+    def test_diff_uses_newest_record(self):
+        from diff import diff_homeworks
+        homeworks = [
+            {'homework_name': 'hw', 'status': 'approved'},
+            {'homework_name': 'hw', 'status': 'reviewing'},
+        ]
+        transitions = diff_homeworks({}, homeworks)
+        assert transitions == [homeworks[0]], (
+            'Для повторяющейся работы должна учитываться самая новая запись.'
+        )
+
+    def test_render_collects_errors(self):
+        from diff import render_transitions
+        from homework import HOMEWORK_SCHEMA, render_status
+        homeworks = [
+            {'homework_name': 'hw1', 'status': 'approved'},
+            {'homework_name': 'hw2', 'status': 'unknown'},
+        ]
+        messages, errors = render_transitions(
+            homeworks, HOMEWORK_SCHEMA, render_status
+        )
+        assert [hw for hw, _ in messages] == [homeworks[0]]
+        assert len(errors) == 1, (
+            'Ошибка одной работы не должна мешать остальным.'
+        )
+
+    def test_main_sends_every_transition(self, monkeypatch, homework_module):
+        data = {
+            'homeworks': [
+                {'id': 2, 'homework_name': 'hw2', 'status': 'approved'},
+                {'id': 1, 'homework_name': 'hw1', 'status': 'rejected'},
+            ],
+            'current_date': 1,
+        }
+
+        def mock_response_get(*args, **kwargs):
+            response = utils.MockResponseGET(*args, **kwargs)
+            response.json = lambda: data
+            return response
+
+        def sleep_to_interrupt(secs):
+            raise utils.BreakInfiniteLoop('break')
+
+        sent = []
+        monkeypatch.setattr(requests, 'get', mock_response_get)
+        monkeypatch.setattr(time, 'sleep', sleep_to_interrupt)
+        monkeypatch.setattr(
+            homework_module, 'send_message',
+            lambda bot, message: sent.append(message)
+        )
+        monkeypatch.setattr(homework_module, 'TELEGRAM_CHAT_ID', '12345')
+        try:
+            homework_module.main()
+        except utils.BreakInfiniteLoop:
+            pass
+        assert len(sent) == 2 and '"hw1"' in sent[0], (
+            'Убедитесь, что бот сообщает обо всех изменившихся работах.'
+        )
@@ -0,0 +1,164 @@
+import asyncio
+import json
+
+import pytest
+import requests
+
+import utils
+
+
+class TestEngine:
+
+    def test_load_tenants(self, tmp_path):
+        import engine
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'token1', 'chat_id': 1},
+            {'practicum_token': 'token2', 'chat_id': '2'},
+        ]))
+        tenants = engine.load_tenants(str(path))
+        assert [tenant.chat_id for tenant in tenants] == ['1', '2'], (
+            'Проверьте, что `load_tenants` читает всех студентов из файла.'
+        )
+        assert tenants[0].headers['Authorization'] == 'OAuth token1'
+
+    def test_load_tenants_without_token(self, tmp_path):
+        import engine
+        from exceptions import EnvironmentParameterError
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([{'chat_id': 1}]))
+        with pytest.raises(EnvironmentParameterError):
+            engine.load_tenants(str(path))
+
+    def test_poll_once_uses_tenant_headers(self, monkeypatch,
+                                           random_timestamp):
+        import engine
+        seen_tokens = []
+
+        def mock_response_get(*args, **kwargs):
+            seen_tokens.append(kwargs['headers']['Authorization'])
+            return utils.MockResponseGET(
+                *args, random_timestamp=random_timestamp, **kwargs
+            )
+
+        monkeypatch.setattr(requests, 'get', mock_response_get)
+        tenants = [engine.Tenant(f'token{i}', str(i)) for i in range(5)]
+        polling_engine = engine.PollingEngine(tenants, utils.MockTelegramBot())
+        try:
+            assert asyncio.run(polling_engine.poll_once()) == 5
+        finally:
+            polling_engine.close()
+
+        assert sorted(seen_tokens) == [f'OAuth token{i}' for i in range(5)], (
+            'Убедитесь, что каждый студент опрашивается со своим токеном.'
+        )
+        assert all(
+            tenant.timestamp == random_timestamp for tenant in tenants
+        ), 'Убедитесь, что после опроса обновляется `timestamp` студента.'
+
+    def test_poll_tenant_sends_error_once(self, monkeypatch):
+        import engine
+
+        def mock_request_get_with_exception(*args, **kwargs):
+            raise requests.RequestException('Something wrong')
+
+        monkeypatch.setattr(requests, 'get', mock_request_get_with_exception)
+        bot = utils.MockTelegramBot()
+        sent = []
+        monkeypatch.setattr(
+            bot, 'send_message',
+            lambda chat_id, text, **kwargs: sent.append(text),
+        )
+        tenant = engine.Tenant('token', '1')
+        polling_engine = engine.PollingEngine([tenant], bot)
+        try:
+            asyncio.run(polling_engine.poll_once())
+            asyncio.run(polling_engine.poll_once())
+        finally:
+            polling_engine.close()
+        assert len(sent) == 1, (
+            'Убедитесь, что повторяющаяся ошибка отправляется один раз.'
+        )
+
+    def test_status_command_interrupts_pause(self):
+        import engine
+        from commands import CommandListener, SnapshotCache
+        requested = []
+
+        def request(headers, timestamp):
+            requested.append(timestamp)
+            return {'homeworks': [], 'current_date': timestamp}
+
+        tenant = engine.Tenant('token', '1', timestamp=0)
+        tenant.retry_period = 0
+        tenant.scheduler.floor = 0.1
+        polling_engine = engine.PollingEngine(
+            [tenant], utils.MockTelegramBot(), request=request
+        )
+        polling_engine.coalescer.ttl = 0
+        listener = CommandListener(
+            None, SnapshotCache({}, ttl=-1), send=lambda *args: None,
+            chat_ids=['1'], on_stale=polling_engine.expedite,
+        )
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            task = loop.create_task(polling_engine.run_tenant(tenant))
+            while not requested:
+                await asyncio.sleep(0.01)
+            await loop.run_in_executor(None, listener.handle, '1', '/status')
+            started = loop.time()
+            while len(requested) < 2 and loop.time() - started < 2:
+                await asyncio.sleep(0.01)
+            task.cancel()
+
+        try:
+            asyncio.run(run())
+        finally:
+            polling_engine.close()
+        assert len(requested) == 2, (
+            'Команда /status во время паузы должна ускорять опрос API.'
+        )
+
+    def test_disk_writes_leave_event_loop(self, tmp_path, monkeypatch):
+        import threading
+
+        import engine
+        from outbox import Outbox
+        threads = {}
+        outbox = Outbox(str(tmp_path / 'outbox.jsonl'))
+        append = outbox.append
+
+        def tracked_append(chat_id, text):
+            threads['outbox'] = threading.get_ident()
+            return append(chat_id, text)
+
+        async def deliver_outbox():
+            pass
+
+        monkeypatch.setattr(outbox, 'append', tracked_append)
+        monkeypatch.setattr(
+            engine.HISTORY, 'record',
+            lambda chat_id, homeworks: threads.update(
+                history=threading.get_ident()
+            ),
+        )
+        polling_engine = engine.PollingEngine(
+            [engine.Tenant('token', '1')], utils.MockTelegramBot(),
+            outbox=outbox,
+        )
+        monkeypatch.setattr(polling_engine, 'deliver_outbox', deliver_outbox)
+        homeworks = [{'id': 1, 'homework_name': 'hw', 'status': 'approved'}]
+        try:
+            asyncio.run(polling_engine.notify_transitions(
+                polling_engine.tenants[0], homeworks
+            ))
+        finally:
+            polling_engine.close()
+            outbox.close()
+        assert outbox.pending() == 1
+        assert set(threads) == {'outbox', 'history'}
+        assert threading.get_ident() not in threads.values(), (
+            'Запись журнала сообщений и истории не должна задерживать '
+            'цикл событий.'
+        )
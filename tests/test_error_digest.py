@@ -0,0 +1,46 @@
+class TestErrorAggregator:
+
+    def test_alternating_errors_are_sent_once(self):
+        from error_digest import ErrorAggregator
+        from exceptions import RequestError, RequestStatusCodeError
+        errors = ErrorAggregator(window=3600)
+        sent = []
+        for cycle in range(6):
+            error = (
+                RequestStatusCodeError('Код ответа API: 500')
+                if cycle % 2 else RequestError('Таймаут')
+            )
+            message = errors.record(error, now=cycle)
+            if message:
+                sent.append(message)
+        assert len(sent) == 2, (
+            'Чередующиеся ошибки должны отправляться по одному разу.'
+        )
+
+    def test_fingerprint_ignores_numbers(self):
+        from error_digest import fingerprint
+        from exceptions import RequestStatusCodeError
+        assert fingerprint(RequestStatusCodeError('Код ответа API: 500')) == (
+            fingerprint(RequestStatusCodeError('Код ответа API: 502'))
+        )
+        assert fingerprint(ValueError('x')) != fingerprint(TypeError('x'))
+
+    def test_digest_after_window(self):
+        from error_digest import ErrorAggregator
+        errors = ErrorAggregator(window=60)
+        errors.record(ValueError('boom'), now=0)
+        errors.record(ValueError('boom'), now=10)
+        errors.record(ValueError('boom'), now=20)
+        assert errors.pop_digests(now=30) == []
+        digests = errors.pop_digests(now=61)
+        assert len(digests) == 1 and 'повторился 2 раз' in digests[0], (
+            'По истечении окна должна отправляться одна сводка.'
+        )
+        assert errors.record(ValueError('boom'), now=70) is None, (
+            'Пока ошибка повторяется, о ней сообщают только сводки.'
+        )
+        errors.pop_digests(now=125)
+        assert errors.pop_digests(now=200) == []
+        assert errors.record(ValueError('boom'), now=201), (
+            'После окна без повторов ошибка снова считается новой.'
+        )
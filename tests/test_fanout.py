@@ -0,0 +1,120 @@
+import json
+import threading
+
+import utils
+
+
+class TestFanOut:
+
+    def test_parse_chat_ids(self):
+        from fanout import parse_chat_ids
+        assert parse_chat_ids('1, -100200,1,') == ['1', '-100200']
+        assert parse_chat_ids([1, '2']) == ['1', '2']
+        assert parse_chat_ids(12345) == ['12345']
+        assert parse_chat_ids(None) == []
+
+    def test_slow_chat_does_not_block_others(self):
+        from fanout import FanOut
+        fanout = FanOut(workers=3)
+        release = threading.Event()
+        delivered = threading.Event()
+        sent = []
+
+        def deliver(chat_id, text):
+            if chat_id == 'slow':
+                release.wait(5)
+            sent.append(chat_id)
+            if len(sent) == 2:
+                delivered.set()
+
+        fanout.submit(deliver, [(chat_id, 'text', None)
+                                for chat_id in ('slow', 'a', 'b')])
+        assert delivered.wait(5) and sorted(sent) == ['a', 'b'], (
+            'Медленный чат не должен задерживать доставку в остальные.'
+        )
+        release.set()
+        fanout.close()
+        assert sent[-1] == 'slow'
+
+    def test_retries_and_accounting_per_destination(self):
+        from fanout import FanOut
+        delays = []
+        fanout = FanOut(retries=2, retry_delay=1,
+                        is_retryable=lambda error: 'сеть' in str(error),
+                        sleep=delays.append)
+        attempts = {'flaky': 0, 'blocked': 0}
+
+        def deliver(chat_id, text):
+            attempts[chat_id] += 1
+            if chat_id == 'blocked':
+                raise ValueError('бот заблокирован')
+            if attempts[chat_id] < 3:
+                raise ConnectionError('сеть')
+
+        results = []
+        fanout.submit(deliver, [('flaky', 'text', results.append)])
+        fanout.submit(deliver, [('blocked', 'text', results.append)])
+        assert results == [True, False]
+        assert delays == [1, 2], (
+            'Повторы при сбое сети должны идти с растущей паузой.'
+        )
+        assert attempts['blocked'] == 1, (
+            'Отказ конкретного чата не должен повторяться.'
+        )
+        flaky = fanout.destinations['flaky']
+        blocked = fanout.destinations['blocked']
+        assert (flaky.delivered, flaky.failed) == (1, 0)
+        assert (blocked.delivered, blocked.failed) == (0, 1), (
+            'Ошибки доставки должны учитываться для каждого чата отдельно.'
+        )
+        assert blocked.last_error == 'бот заблокирован'
+
+    def test_messages_of_one_chat_keep_order(self):
+        from fanout import FanOut
+        fanout = FanOut(workers=4)
+        sent = []
+        fanout.submit(
+            lambda chat_id, text: sent.append((chat_id, text)),
+            [(chat_id, str(number), None)
+             for number in range(20) for chat_id in ('1', '2')],
+        )
+        fanout.close()
+        for chat_id in ('1', '2'):
+            assert [text for chat, text in sent if chat == chat_id] == [
+                str(number) for number in range(20)
+            ], 'Сообщения одного чата должны приходить по порядку.'
+
+
+class TestDestinations:
+
+    def test_notification_reaches_every_chat(self, tmp_path, monkeypatch):
+        import homework
+        from outbox import Outbox
+        from state import StateStore
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '1, -100200')
+        outbox = Outbox(str(tmp_path / 'outbox.jsonl'))
+        bot = utils.RecordingBot()
+        state = StateStore()
+        homeworks = [{'id': 1, 'homework_name': 'hw', 'status': 'approved'}]
+        homework.notify_transitions(bot, state, homeworks, outbox)
+        homework.FANOUT.close()
+        assert sorted(chat_id for chat_id, _ in bot.sent) == [
+            '-100200', '1'
+        ], 'Сообщение о новом статусе должно приходить в каждый чат.'
+        assert outbox.pending() == 0
+        assert state.statuses('1'), (
+            'Состояние опроса должно храниться по основному чату.'
+        )
+        outbox.close()
+
+    def test_tenant_destinations(self, tmp_path):
+        import engine
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'token', 'chat_id': [1, '-100200']},
+        ]))
+        tenant, = engine.read_tenants(str(path))
+        assert tenant.chat_id == '1'
+        assert tenant.destinations == ['1', '-100200'], (
+            'В файле студентов можно указать несколько чатов.'
+        )
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+import requests
+
+import utils
+
+
+class TestRateGovernor:
+
+    def test_bucket_limits_rate(self):
+        from exceptions import DeadlineExceededError
+        from governor import RateGovernor
+        clock = utils.FakeClock()
+        governor = RateGovernor(rate=2, burst=2, clock=clock)
+        assert governor.acquire() == 0 and governor.acquire() == 0
+        assert governor.delay() == pytest.approx(0.5), (
+            'После исчерпания запаса запросы должны ждать токена.'
+        )
+        with pytest.raises(DeadlineExceededError):
+            governor.acquire(max_wait=0.1)
+        clock.now += 0.5
+        assert governor.acquire() == 0
+
+    def test_try_acquire_does_not_wait(self):
+        from governor import RateGovernor
+        clock = utils.FakeClock()
+        governor = RateGovernor(rate=1, burst=1, clock=clock)
+        assert governor.try_acquire()
+        assert not governor.try_acquire(), (
+            'Без свободного токена запрос должен пропускаться, а не ждать.'
+        )
+        governor.pause(5)
+        clock.now += 2
+        assert not governor.try_acquire(), (
+            'Во время паузы по Retry-After запросы не должны уходить.'
+        )
+        clock.now += 3
+        assert governor.try_acquire()
+
+    def test_retry_after_pauses_requests(self):
+        from governor import RateGovernor, admitted, parse_retry_after
+        clock = utils.FakeClock()
+        governor = RateGovernor(rate=0, clock=clock)
+        assert governor.delay() == 0, (
+            'Без `rate` частота запросов не должна ограничиваться.'
+        )
+        governor.pause(parse_retry_after('30'))
+        assert governor.delay() == 30
+        with admitted():
+            assert governor.acquire(max_wait=0) == 0, (
+                'Запрос, уже получивший разрешение, не должен ждать снова.'
+            )
+        assert parse_retry_after(
+            'Wed, 21 Oct 2015 07:28:30 GMT', now=lambda: 1445412480
+        ) == 30
+        assert parse_retry_after('soon') is None
+
+    def test_priority_order(self):
+        from governor import ACTIVE, IDLE, WAITING, RateGovernor
+        governor = RateGovernor(rate=50, burst=1)
+        served = []
+
+        async def request(priority):
+            await governor.acquire_async(priority)
+            served.append(priority)
+
+        async def run():
+            await governor.acquire_async()
+            await asyncio.gather(
+                request(IDLE), request(WAITING), request(ACTIVE)
+            )
+
+        asyncio.run(run())
+        assert served == [ACTIVE, WAITING, IDLE], (
+            'Студенты с работами на проверке должны обслуживаться первыми.'
+        )
+
+    def test_async_wait_respects_budget(self):
+        from exceptions import DeadlineExceededError
+        from governor import RateGovernor
+        governor = RateGovernor(rate=0)
+        governor.pause(60)
+        with pytest.raises(DeadlineExceededError):
+            asyncio.run(governor.acquire_async(max_wait=0.01))
+
+    def test_tenant_priority(self):
+        from governor import ACTIVE, IDLE, WAITING, tenant_priority
+        assert tenant_priority(['approved', 'reviewing']) == ACTIVE
+        assert tenant_priority(['approved']) == WAITING
+        assert tenant_priority([]) == IDLE
+
+
+class TestRateLimitedResponse:
+
+    def test_too_many_requests_pauses_api(self, monkeypatch):
+        import deadline
+        import homework
+        from exceptions import (
+            DeadlineExceededError, RateLimitedError, RequestStatusCodeError
+        )
+        from governor import RateGovernor
+        governor = RateGovernor(rate=0)
+        monkeypatch.setattr(homework, 'GOVERNOR', governor)
+        calls = []
+
+        def too_many_requests(*args, **kwargs):
+            calls.append(1)
+            response = utils.MockResponseGET(*args, http_status=429, **kwargs)
+            response.headers = {'Retry-After': '120'}
+            return response
+
+        monkeypatch.setattr(requests, 'get', too_many_requests)
+        with pytest.raises(RateLimitedError) as error:
+            homework.get_api_answer(0)
+        assert isinstance(error.value, RequestStatusCodeError)
+        assert governor.delay() > 100, (
+            'Ответ 429 с Retry-After должен приостанавливать запросы.'
+        )
+        with deadline.scope(5):
+            with pytest.raises(DeadlineExceededError):
+                homework.get_api_answer(0)
+        assert len(calls) == 1, (
+            'Во время паузы запросы к API не должны отправляться.'
+        )
@@ -0,0 +1,148 @@
+from datetime import datetime, timezone
+import os
+
+import pytest
+
+START = 1700000000
+
+
+def iso(offset):
+    return datetime.fromtimestamp(START + offset, timezone.utc).strftime(
+        '%Y-%m-%dT%H:%M:%SZ'
+    )
+
+
+def transition(homework_id, status, offset, comment=''):
+    return {
+        'id': homework_id, 'homework_name': f'hw{homework_id}',
+        'status': status, 'date_updated': iso(offset),
+        'reviewer_comment': comment,
+    }
+
+
+def fill(history):
+    history.record('1', [transition(1, 'reviewing', 0),
+                         transition(2, 'reviewing', 0)])
+    history.record('1', [transition(2, 'approved', 600),
+                         transition(1, 'rejected', 3600, 'Поправьте тесты')])
+    history.record('1', [transition(1, 'reviewing', 7200)])
+    history.record('1', [transition(1, 'approved', 9000)])
+    history.record('2', [transition(1, 'reviewing', 0),
+                         transition(1, 'rejected', 100)])
+
+
+class TestTransitionHistory:
+
+    def test_stats_survive_restart(self, tmp_path):
+        from history import TransitionHistory
+        path = str(tmp_path / 'history')
+        history = TransitionHistory(path)
+        fill(history)
+        history.close()
+
+        stats = TransitionHistory(path).stats('1')
+        assert stats['rows'] == 6
+        assert stats['reviews'] == 3, (
+            'Каждая пара «на проверке» → вердикт должна считаться проверкой.'
+        )
+        assert stats['turnaround'] == {
+            'p50': 1800.0, 'p90': pytest.approx(3240.0), 'max': 3600.0,
+        }
+        assert stats['rejection_rate'] == pytest.approx(1 / 3)
+        assert stats['time_in_reviewing'] == 3000.0, (
+            'Время на проверке должно суммироваться по всем раундам работы.'
+        )
+        assert TransitionHistory(path).stats()['reviews'] == 4
+
+    def test_torn_rows_are_dropped(self, tmp_path):
+        from history import TransitionHistory
+        path = tmp_path / 'history'
+        history = TransitionHistory(str(path))
+        fill(history)
+        history.close()
+        with open(path / 'status.I', 'ab') as file:
+            file.write(b'\x01\x00')
+        with open(path / 'strings.jsonl', 'ab') as file:
+            file.write(b'"torn')
+
+        restarted = TransitionHistory(str(path))
+        restarted.record('3', [transition(5, 'reviewing', 0),
+                               transition(5, 'approved', 60)])
+        restarted.close()
+        stats = TransitionHistory(str(path)).stats('3')
+        assert stats['rows'] == 2 and stats['reviews'] == 1, (
+            'Недописанные при сбое записи не должны портить историю.'
+        )
+
+    def test_disabled_history(self, tmp_path):
+        from history import TransitionHistory
+        history = TransitionHistory('')
+        assert history.record('1', [transition(1, 'reviewing', 0)]) == 0
+        assert history.stats()['rows'] == 0
+        assert not os.listdir(tmp_path)
+
+    def test_report(self, tmp_path):
+        from history import TransitionHistory
+        history = TransitionHistory(str(tmp_path / 'history'))
+        assert 'пока нет' in history.report('1')
+        fill(history)
+        report = history.report('1')
+        assert 'проверок: 3' in report and 'возвратов: 33%' in report, (
+            'Ответ /stats должен содержать число проверок и долю возвратов.'
+        )
+        assert 'медиана 30 мин' in report
+
+    def test_numpy_matches_python(self, tmp_path):
+        numpy = pytest.importorskip('numpy')
+        import history as history_module
+        history = history_module.TransitionHistory(str(tmp_path / 'history'))
+        fill(history)
+        # Переходы одной работы с одинаковой датой записаны не по
+        # порядку работ: нестабильная сортировка их переставила бы.
+        history.record('3', [transition(homework_id, 'reviewing', 0)
+                             for homework_id in range(1, 31)])
+        for homework_id in range(30, 0, -1):
+            history.record('3', [
+                transition(homework_id, 'rejected', 60),
+                transition(homework_id, 'reviewing', 60),
+                transition(homework_id, 'approved', 60 * homework_id),
+            ])
+        for chat_id in ('1', '2', '3', None):
+            columns = history.columns()
+            codes = {
+                'chat': None if chat_id is None else history.code(chat_id),
+                'reviewing': history.code('reviewing'),
+                'rejected': history.code('rejected'),
+                'verdicts': [history.code('approved'),
+                             history.code('rejected')],
+            }
+            python_columns = {
+                name: [int(value) for value in values]
+                for name, values in columns.items()
+            }
+            expected = history_module.python_stats(python_columns, codes)
+            stats = history_module.numpy_stats(numpy, columns, codes)
+            assert stats.pop('turnaround') == pytest.approx(
+                expected.pop('turnaround')
+            )
+            assert stats == pytest.approx(expected), (
+                'Расчёт с numpy и без него должен совпадать.'
+            )
+
+
+class TestStatsCommand:
+
+    def test_stats_command(self, tmp_path):
+        from commands import CommandListener, SnapshotCache
+        from history import TransitionHistory
+        history = TransitionHistory(str(tmp_path / 'history'))
+        fill(history)
+        sent = []
+        listener = CommandListener(
+            None, SnapshotCache({}), send=lambda *args: sent.append(args),
+            chat_ids=['2'], stats=history.report,
+        )
+        listener.handle('2', '/stats')
+        assert sent and 'проверок: 1' in sent[0][1], (
+            'Бот должен отвечать на /stats статистикой своего чата.'
+        )
@@ -0,0 +1,67 @@
+import json
+import logging
+import queue
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(self.format(record))
+
+
+class TestLogPipeline:
+
+    def test_json_formatter(self):
+        from log_pipeline import JsonFormatter
+        record = logging.LogRecord(
+            'homework_bot', logging.ERROR, __file__, 1,
+            'Код ответа API: %s', (500,), None
+        )
+        data = json.loads(JsonFormatter().format(record))
+        assert data['level'] == 'ERROR'
+        assert data['message'] == 'Код ответа API: 500', (
+            'Проверьте, что JSON-форматтер подставляет аргументы сообщения.'
+        )
+
+    def test_lazy_queue_handler_does_not_format(self):
+        from log_pipeline import LazyQueueHandler
+        records = queue.Queue()
+        handler = LazyQueueHandler(records)
+        record = logging.LogRecord(
+            'homework_bot', logging.DEBUG, __file__, 1, 'a %s', ('b',), None
+        )
+        handler.handle(record)
+        queued = records.get_nowait()
+        assert queued.msg == 'a %s' and queued.args == ('b',), (
+            'Сообщение не должно форматироваться в вызывающем потоке.'
+        )
+
+    def test_lazy_queue_handler_drops_when_full(self):
+        from log_pipeline import LazyQueueHandler
+        handler = LazyQueueHandler(queue.Queue(maxsize=1))
+        record = logging.LogRecord(
+            'homework_bot', logging.DEBUG, __file__, 1, 'a', (), None
+        )
+        handler.handle(record)
+        handler.handle(record)
+
+    def test_make_async_delivers_records(self):
+        from log_pipeline import make_async
+        target = ListHandler()
+        target.setFormatter(logging.Formatter('%(message)s'))
+        logger = logging.getLogger('homework_bot.test_log_pipeline')
+        logger.propagate = False
+        handler = make_async(target)
+        logger.addHandler(handler)
+        try:
+            logger.warning('Код ответа API: %s', 500)
+            handler.listener.stop()
+        finally:
+            logger.removeHandler(handler)
+        assert target.messages == ['Код ответа API: 500'], (
+            'Записи должны доходить до обработчика через фоновый поток.'
+        )
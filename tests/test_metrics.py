@@ -0,0 +1,121 @@
+import urllib.request
+
+import pytest
+
+import utils
+
+
+class TestMetrics:
+
+    def setup_method(self):
+        import metrics
+        metrics.reset()
+
+    def test_timed_records_latency_and_errors(self):
+        import metrics
+        from exceptions import ResponseKeyError
+
+        @metrics.timed('stage')
+        def stage(fail):
+            if fail:
+                raise ResponseKeyError('homeworks')
+
+        stage(False)
+        with pytest.raises(ResponseKeyError):
+            stage(True)
+        data = metrics.snapshot()
+        assert data['histograms']['stage'][2] == 2, (
+            'Каждый вызов этапа должен попадать в гистограмму.'
+        )
+        assert data['counters'][
+            'errors_total', 'exception', 'ResponseKeyError'
+        ] == 1, 'Ошибки должны считаться по имени класса исключения.'
+
+    def test_render_prometheus_text(self):
+        import metrics
+        metrics.observe('check_response', 0.002)
+        metrics.increment('errors_total', 'RequestError')
+        metrics.set_gauge('loop_lag_seconds', 0.5)
+        text = metrics.render()
+        assert (
+            'homework_bot_stage_seconds_bucket'
+            '{stage="check_response",le="0.0025"} 1'
+        ) in text
+        assert (
+            'homework_bot_stage_seconds_count{stage="check_response"} 1'
+        ) in text
+        assert 'homework_bot_errors_total{exception="RequestError"} 1' in text
+        assert 'homework_bot_loop_lag_seconds 0.5' in text
+
+    def test_metrics_endpoint(self):
+        import metrics
+        metrics.increment('errors_total', 'RequestError')
+        server = metrics.start_server(0)
+        try:
+            host, port = server.server_address[:2]
+            with urllib.request.urlopen(
+                f'http://{host}:{port}/metrics', timeout=5
+            ) as response:
+                body = response.read().decode()
+        finally:
+            server.shutdown()
+        assert 'homework_bot_errors_total' in body, (
+            'Показатели должны отдаваться по адресу /metrics.'
+        )
+
+    def test_homework_functions_are_instrumented(self, homework_module):
+        import metrics
+        homework_module.check_response({'homeworks': [], 'current_date': 1})
+        assert 'check_response' in metrics.snapshot()['histograms']
+
+    def test_notifications_are_timed(self, monkeypatch):
+        import homework
+        import metrics
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '12345')
+        homework.send_message(utils.MockTelegramBot(), 'message')
+        assert metrics.snapshot()['histograms']['send_message'][2] == 1, (
+            'Отправка уведомлений должна попадать в этап send_message.'
+        )
+
+    def test_batch_rendering_is_timed(self):
+        import homework
+        import metrics
+        messages, errors = homework.render_homeworks([
+            {'homework_name': 'hw', 'status': 'approved'},
+            {'homework_name': 'hw', 'status': 'unknown'},
+        ])
+        data = metrics.snapshot()
+        assert len(messages) == 1 and len(errors) == 1
+        assert data['histograms']['render_transitions'][2] == 1, (
+            'Пакетная проверка статусов должна попадать в этап '
+            'render_transitions.'
+        )
+        assert 'parse_status' not in data['histograms'], (
+            'В этапе parse_status не должны смешиваться пакеты и '
+            'отдельные работы.'
+        )
+        assert data['counters'][
+            'errors_total', 'exception', type(errors[0]).__name__
+        ] == 1, 'Ошибки некорректных работ должны учитываться.'
+
+    def test_merge_snapshots_of_processes(self):
+        import metrics
+        metrics.observe('check_response', 0.002)
+        metrics.increment('errors_total', 'RequestError')
+        metrics.set_gauge('loop_lag_seconds', 0.5)
+        first = metrics.snapshot()
+        metrics.set_gauge('loop_lag_seconds', 0.25)
+        second = metrics.snapshot()
+        merged = metrics.merge([first, second])
+        assert merged['histograms']['check_response'][2] == 2, (
+            'Гистограммы процессов должны суммироваться.'
+        )
+        assert merged['counters'][
+            'errors_total', 'exception', 'RequestError'
+        ] == 2, 'Счётчики процессов должны суммироваться.'
+        assert merged['gauges']['loop_lag_seconds'] == 0.5, (
+            'Для показателей должно браться наибольшее значение.'
+        )
+        assert first['histograms']['check_response'][2] == 1, (
+            'Объединение не должно менять исходные снимки.'
+        )
@@ -0,0 +1,130 @@
+import json
+import os
+
+import utils
+
+
+class TestOutbox:
+
+    def test_undelivered_entries_survive_restart(self, tmp_path):
+        from outbox import Outbox
+        path = str(tmp_path / 'outbox.jsonl')
+        outbox = Outbox(path)
+        first = outbox.append('1', 'first')
+        outbox.append('1', 'second')
+        outbox.take_pending()
+        outbox.complete(first, True)
+        outbox.close()
+        with open(path, 'a', encoding='utf-8') as file:
+            file.write('{"id": 3, "chat_')
+
+        restarted = Outbox(path)
+        assert [text for _, _, text in restarted.take_pending()] == [
+            'second'
+        ], 'После перезапуска должны отправляться только недоставленные.'
+        assert restarted.append('1', 'third') == 3, (
+            'Номера сообщений не должны повторяться после перезапуска.'
+        )
+
+    def test_fsync_is_grouped(self, tmp_path, monkeypatch):
+        from outbox import Outbox
+        outbox = Outbox(str(tmp_path / 'outbox.jsonl'))
+        calls = []
+        fsync = os.fsync
+        monkeypatch.setattr(
+            os, 'fsync', lambda descriptor: calls.append(descriptor)
+            or fsync(descriptor)
+        )
+        for number in range(3):
+            outbox.append('1', f'message {number}')
+        assert outbox.sync() and len(calls) == 1, (
+            'Записи группы сообщений должны сбрасываться одним fsync.'
+        )
+        for entry_id, _, _ in outbox.take_pending():
+            outbox.complete(entry_id, True)
+        assert len(calls) == 1, (
+            'Отметки о доставке не должны сбрасываться на диск по одной.'
+        )
+        outbox.close()
+
+    def test_failed_entry_is_retried(self, tmp_path):
+        from outbox import Outbox
+        outbox = Outbox(str(tmp_path / 'outbox.jsonl'))
+        entry_id = outbox.append('1', 'message')
+        assert len(outbox.take_pending()) == 1
+        assert not outbox.take_pending(), (
+            'Отправляемое сообщение не должно выбираться повторно.'
+        )
+        outbox.complete(entry_id, False)
+        assert len(outbox.take_pending()) == 1, (
+            'Недоставленное сообщение должно отправляться повторно.'
+        )
+        outbox.close()
+
+    def test_compaction_drops_delivered(self, tmp_path):
+        from outbox import Outbox
+        from templates import FormattedMessage
+        path = tmp_path / 'outbox.jsonl'
+        outbox = Outbox(str(path), compact_records=4)
+        for number in range(3):
+            outbox.append('1', f'message {number}')
+        outbox.append('1', FormattedMessage('<b>kept</b>', 'HTML'))
+        assert not outbox.compact()
+        for entry_id, _, text in outbox.take_pending():
+            outbox.complete(entry_id, text != '<b>kept</b>')
+        assert outbox.compact(), (
+            'Журнал с доставленными записями должен переписываться.'
+        )
+        outbox.close()
+        records = [json.loads(line) for line in path.read_text().split('\n')
+                   if line]
+        assert [record['text'] for record in records] == ['<b>kept</b>']
+        (_, _, text), = Outbox(str(path)).take_pending()
+        assert text.parse_mode == 'HTML', (
+            'Режим разметки должен восстанавливаться из журнала.'
+        )
+
+
+class TestOutboxDelivery:
+
+    def test_notification_is_kept_until_delivered(self, tmp_path,
+                                                  monkeypatch):
+        import homework
+        from outbox import Outbox
+        from state import StateStore
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', '12345')
+        path = str(tmp_path / 'outbox.jsonl')
+        outbox = Outbox(path)
+        bot = utils.RecordingBot(down=True)
+        homeworks = [{'id': 1, 'homework_name': 'hw', 'status': 'approved'}]
+        homework.notify_transitions(bot, StateStore(), homeworks, outbox)
+        outbox.close()
+
+        outbox = Outbox(path)
+        bot.down = False
+        assert homework.deliver_outbox(bot, outbox) == 1
+        assert len(bot.sent) == 1 and bot.sent[0][0] == '12345', (
+            'Не отправленное из-за сбоя сообщение должно '
+            'отправляться повторно.'
+        )
+        assert homework.deliver_outbox(bot, outbox) == 0
+        assert outbox.pending() == 0
+        outbox.close()
+
+    def test_queue_reports_delivery(self):
+        from delivery import DeliveryQueue
+        bot = utils.RecordingBot()
+        queue = DeliveryQueue(bot, chat_rate=100, chat_burst=100)
+        results = []
+        queue.send_message('1', 'first', on_done=results.append)
+        queue.send_message('1', 'second', on_done=results.append)
+        chat_id, batch = queue._next_batch()
+        queue._deliver(chat_id, batch)
+        assert results == [True, True], (
+            'Очередь должна сообщать о доставке каждого сообщения.'
+        )
+        bot.down = True
+        queue.send_message('1', 'lost', on_done=results.append)
+        chat_id, batch = queue._next_batch()
+        queue._deliver(chat_id, batch)
+        assert results[-1] is False
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+import requests
+
+
+def make_response(data, status=200, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(data).encode() if data else b''
+    response.headers.update(headers or {})
+    return response
+
+
+class TestRevalidation:
+
+    HOMEWORKS = [{'id': 1, 'homework_name': 'hw', 'status': 'approved'}]
+
+    @pytest.fixture
+    def responses(self, monkeypatch):
+        import homework
+        import metrics
+        metrics.reset()
+        homework.RESPONSES.clear()
+        monkeypatch.setattr(homework.RESPONSES, 'enabled', True)
+        queue = []
+        sent_headers = []
+
+        def mock_get(url, headers=None, **kwargs):
+            sent_headers.append(headers)
+            return queue.pop(0)
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        yield queue, sent_headers
+        homework.RESPONSES.clear()
+
+    def test_body_digest_ignores_current_date(self):
+        from revalidation import body_digest
+        first, first_date = body_digest(b'{"homeworks": [], "current_date": 1}')
+        second, second_date = body_digest(b'{"homeworks": [],"current_date":22}')
+        third, _ = body_digest(b'{"homeworks": [1], "current_date": 1}')
+        assert (first_date, second_date) == (1, 22)
+        assert first != third, 'Разные работы должны давать разный хэш.'
+        assert body_digest(b'{"homeworks": [], "current_date": 7}')[0] == (
+            first
+        ), 'Хэш не должен зависеть от `current_date`.'
+
+    def test_unchanged_body_skips_decoding(self, responses, monkeypatch):
+        import homework
+        import metrics
+        queue, _ = responses
+        queue.append(make_response(
+            {'homeworks': self.HOMEWORKS, 'current_date': 100}
+        ))
+        queue.append(make_response(
+            {'homeworks': self.HOMEWORKS, 'current_date': 200}
+        ))
+        first = homework.request_api_answer(homework.HEADERS, 0)
+
+        def fail_decoding(response):
+            raise AssertionError('Неизменившийся ответ не должен разбираться.')
+
+        monkeypatch.setattr(homework, 'decode_response', fail_decoding)
+        second = homework.request_api_answer(homework.HEADERS, 100)
+        assert second == {'homeworks': first['homeworks'],
+                          'current_date': 200}, (
+            'Для неизменившегося ответа берётся новый `current_date`.'
+        )
+        counters = metrics.snapshot()['counters']
+        assert counters[
+            'response_savings_total', 'kind', 'body_unchanged'
+        ] == 1, 'Пропуск разбора должен учитываться в счётчике.'
+
+    def test_not_modified_returns_previous_data(self, responses):
+        import homework
+        import metrics
+        queue, sent_headers = responses
+        data = {'homeworks': self.HOMEWORKS, 'current_date': 100}
+        queue.append(make_response(data, headers={'ETag': '"v1"'}))
+        queue.append(make_response(None, status=304))
+        homework.request_api_answer(homework.HEADERS, 0)
+        assert homework.request_api_answer(homework.HEADERS, 100) == data
+        assert sent_headers[1]['If-None-Match'] == '"v1"', (
+            'Повторный запрос должен передавать ETag прошлого ответа.'
+        )
+        assert 'If-None-Match' not in homework.HEADERS
+        assert metrics.snapshot()['counters'][
+            'response_savings_total', 'kind', 'not_modified'
+        ] == 1
+
+    def test_unexpected_not_modified_is_error(self, responses):
+        import homework
+        from exceptions import RequestStatusCodeError
+        queue, _ = responses
+        queue.append(make_response(None, status=304))
+        with pytest.raises(RequestStatusCodeError):
+            homework.request_api_answer(homework.HEADERS, 0)
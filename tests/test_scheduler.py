@@ -0,0 +1,70 @@
+class TestPollScheduler:
+
+    def test_first_idle_delay_is_base(self):
+        from scheduler import PollScheduler
+        scheduler = PollScheduler(600)
+        scheduler.record_success(changed=0)
+        assert scheduler.next_delay() == 600, (
+            'Первая пауза без изменений должна быть равна базовой.'
+        )
+
+    def test_active_review_uses_floor(self):
+        from scheduler import PollScheduler
+        scheduler = PollScheduler(600, floor=60)
+        scheduler.record_success(changed=1, statuses=['reviewing'])
+        assert scheduler.next_delay() == 60, (
+            'Пока работа на проверке, опрос должен идти чаще.'
+        )
+
+    def test_idle_backoff_is_bounded(self):
+        from scheduler import PollScheduler
+        scheduler = PollScheduler(600, ceiling=2000, backoff=2, jitter=0.5)
+        delays = []
+        for _ in range(6):
+            scheduler.record_success(changed=0, statuses=['approved'])
+            delays.append(scheduler.next_delay())
+        assert delays[0] == 600
+        assert 600 < delays[1] <= 1200
+        assert all(600 <= delay <= 2000 for delay in delays), (
+            'Пауза должна оставаться в пределах `floor` и `ceiling`.'
+        )
+
+    def test_errors_back_off_and_reset(self):
+        from scheduler import PollScheduler
+        scheduler = PollScheduler(600, ceiling=10000, jitter=0)
+        for _ in range(3):
+            scheduler.record_error()
+        assert scheduler.next_delay() == 2400, (
+            'Подряд идущие ошибки должны увеличивать паузу.'
+        )
+        scheduler.record_success(changed=1)
+        assert scheduler.next_delay() == 600, (
+            'После успешного ответа пауза должна сбрасываться.'
+        )
+
+    def test_expedite_shortens_next_delay_once(self):
+        from scheduler import PollScheduler
+        scheduler = PollScheduler(600, floor=60)
+        scheduler.record_success(changed=0)
+        scheduler.expedite()
+        assert scheduler.next_delay() == 60, (
+            'Запрошенное обновление должно сокращать паузу до `floor`.'
+        )
+        assert scheduler.next_delay() == 600
+
+    def test_expedite_interrupts_wait(self):
+        import threading
+        import time
+
+        from scheduler import PollScheduler
+        scheduler = PollScheduler(600, floor=0.1)
+        threading.Timer(0.05, scheduler.expedite).start()
+        started = time.monotonic()
+        assert scheduler.wait(600)
+        assert time.monotonic() - started < 1, (
+            'Запрос обновления во время паузы должен приводить к опросу '
+            'не позже чем через `floor`.'
+        )
+        assert scheduler.next_delay() == 600, (
+            'Сокращённая пауза не должна сокращать и следующую.'
+        )
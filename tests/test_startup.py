@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestStartup:
+
+    def test_import_does_not_load_heavy_dependencies(self):
+        result = subprocess.run(
+            [sys.executable, '-c', (
+                'import sys, homework, engine\n'
+                'print(" ".join(sorted(m for m in ("requests", "telegram", '
+                '"http.server") if m in sys.modules)))'
+            )],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        assert result.stdout.strip() == '', (
+            'Импорт бота не должен загружать тяжёлые зависимости: '
+            f'{result.stdout.strip()}.'
+        )
+
+    def test_sync_bot_does_not_load_asyncio(self):
+        result = subprocess.run(
+            [sys.executable, '-c', (
+                'import sys, homework\n'
+                'print("asyncio" in sys.modules)'
+            )],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        assert result.stdout.strip() == 'False', (
+            'Однопоточный бот не должен загружать asyncio при импорте.'
+        )
+
+    def test_import_does_not_configure_logging(self):
+        result = subprocess.run(
+            [sys.executable, '-c', (
+                'import logging, homework\n'
+                'print(len(logging.getLogger("homework_bot").handlers))'
+            )],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        assert result.stdout.strip() == '0', (
+            'Обработчики журнала должны настраиваться при запуске, '
+            'а не при импорте модуля.'
+        )
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+
+class TestStateStore:
+
+    def test_state_survives_restart(self, tmp_path):
+        from state import StateStore
+        path = str(tmp_path / 'state.json')
+        store = StateStore(path, flush_interval=0)
+        homework = {'id': 1, 'homework_name': 'hw', 'status': 'reviewing'}
+        store.set_cursor('12345', 1000)
+        store.set_status('12345', homework)
+        assert store.flush(), 'Изменения должны записываться на диск.'
+
+        restarted = StateStore(path)
+        assert restarted.get_cursor('12345', 0) == 1000, (
+            'Убедитесь, что курсор восстанавливается после перезапуска.'
+        )
+        assert not restarted.is_new_status('12345', homework), (
+            'Убедитесь, что отправленный статус не считается новым '
+            'после перезапуска.'
+        )
+        homework['status'] = 'approved'
+        assert restarted.is_new_status('12345', homework)
+
+    def test_flush_is_batched(self, tmp_path):
+        from state import StateStore
+        path = tmp_path / 'state.json'
+        store = StateStore(str(path), flush_interval=3600)
+        store.set_cursor('1', 1)
+        assert store.flush(), 'Первая запись должна выполняться сразу.'
+        store.set_cursor('1', 2)
+        assert not store.flush(), (
+            'Убедитесь, что запись откладывается до `flush_interval`.'
+        )
+        assert json.loads(path.read_text())['tenants']['1']['cursor'] == 1
+        assert store.flush(force=True)
+        assert json.loads(path.read_text())['tenants']['1']['cursor'] == 2
+        assert not store.flush(force=True), (
+            'Без изменений запись выполняться не должна.'
+        )
+
+    def test_memory_only_store(self):
+        from state import StateStore
+        store = StateStore()
+        store.set_cursor('1', 5)
+        assert store.get_cursor('1', 0) == 5
+        assert not store.flush(force=True)
+
+    def test_corrupted_state_file(self, tmp_path):
+        from exceptions import StateStoreError
+        from state import StateStore
+        path = tmp_path / 'state.json'
+        path.write_text('{not json')
+        with pytest.raises(StateStoreError):
+            StateStore(str(path))
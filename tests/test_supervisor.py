@@ -0,0 +1,185 @@
+import json
+
+
+class FakeProcess:
+
+    def __init__(self, pid, alive=True, exitcode=None):
+        self.pid = pid
+        self.alive = alive
+        self.exitcode = exitcode
+
+    def is_alive(self):
+        return self.alive
+
+
+class TestHashRing:
+
+    def test_assignment_is_stable(self):
+        from supervisor import HashRing
+        keys = [str(chat_id) for chat_id in range(1000)]
+        first = [HashRing(range(4)).node_for(key) for key in keys]
+        second = [HashRing(range(4)).node_for(key) for key in keys]
+        assert first == second, (
+            'Распределение студентов не должно зависеть от процесса.'
+        )
+        assert set(first) == {0, 1, 2, 3}, (
+            'Студенты должны достаться всем рабочим процессам.'
+        )
+
+    def test_new_node_takes_only_its_share(self):
+        from supervisor import HashRing
+        keys = [str(chat_id) for chat_id in range(2000)]
+        before = HashRing(range(4))
+        after = HashRing(range(5))
+        moved = [key for key in keys
+                 if before.node_for(key) != after.node_for(key)]
+        assert all(after.node_for(key) == 4 for key in moved), (
+            'При добавлении процесса студенты должны переезжать '
+            'только к нему.'
+        )
+        assert len(moved) < len(keys) * 0.35, (
+            'К новому процессу должна переходить лишь часть студентов.'
+        )
+
+
+class TestRebalanceState:
+
+    def test_state_follows_ring(self, tmp_path):
+        from state import StateStore
+        from supervisor import HashRing, rebalance_state, shard_state_path
+        path = str(tmp_path / 'state.json')
+        base = StateStore(path, flush_interval=0)
+        for chat_id in range(20):
+            base.set_cursor(str(chat_id), chat_id)
+        base.flush()
+        stale = StateStore(shard_state_path(path, 0), flush_interval=0)
+        stale.set_cursor('3', 100)
+        stale.flush()
+        extra = tmp_path / 'state.7.json'
+        extra.write_text(json.dumps({'tenants': {}}))
+
+        ring = HashRing(range(2))
+        rebalance_state(path, ring, 2)
+
+        assert not extra.exists(), (
+            'Файлы лишних рабочих процессов должны удаляться.'
+        )
+        for shard in range(2):
+            tenants = StateStore(shard_state_path(path, shard)).export()
+            assert all(ring.node_for(key) == shard for key in tenants), (
+                'Состояние студента должно лежать в файле его процесса.'
+            )
+        merged = {}
+        for shard in range(2):
+            merged.update(StateStore(shard_state_path(path, shard)).export())
+        assert len(merged) == 20, 'Состояние студентов не должно теряться.'
+        assert merged['3']['cursor'] == 100, (
+            'Из нескольких записей должна браться с самым поздним курсором.'
+        )
+
+
+class TestRebalanceOutboxes:
+
+    def test_orphaned_messages_move_to_owner(self, tmp_path):
+        from delivery import with_mode
+        from outbox import Outbox
+        from supervisor import HashRing, rebalance_outboxes, shard_state_path
+        path = str(tmp_path / 'outbox.jsonl')
+        kept = Outbox(shard_state_path(path, 0))
+        kept.append('1', 'остаётся')
+        kept.close()
+        orphan = Outbox(shard_state_path(path, 3))
+        for chat_id in range(10):
+            orphan.append(str(chat_id), with_mode(str(chat_id), 'HTML'))
+        delivered = orphan.append('99', 'доставлено')
+        orphan.complete(delivered, True)
+        orphan.close()
+
+        ring = HashRing(range(2))
+        owners = {str(chat_id): 'token' for chat_id in range(10)}
+        assert rebalance_outboxes(path, ring, 2, owners) == 10
+
+        assert not (tmp_path / 'outbox.3.jsonl').exists(), (
+            'Журналы лишних рабочих процессов должны удаляться.'
+        )
+        owner = ring.node_for('token')
+        pending = {}
+        for shard in range(2):
+            outbox = Outbox(shard_state_path(path, shard))
+            pending[shard] = outbox.take_pending()
+            outbox.close()
+        moved = [entry for entry in pending[owner] if entry[2] != 'остаётся']
+        assert sorted(chat_id for _, chat_id, _ in moved) == sorted(
+            owners
+        ), 'Недоставленные сообщения должны переходить к владельцу чата.'
+        assert all(text.parse_mode == 'HTML' for _, _, text in moved), (
+            'Режим разметки сообщений должен сохраняться.'
+        )
+        assert ('1', 'остаётся') in [
+            (chat_id, text) for _, chat_id, text in pending[0]
+        ], 'Сообщения оставшихся процессов не должны теряться.'
+
+
+class TestSupervisor:
+
+    def test_crashed_worker_restarts_with_backoff(self, monkeypatch):
+        import metrics
+        from supervisor import Supervisor
+        metrics.reset()
+        supervisor = Supervisor(workers=1, restart_delay=1)
+        started = []
+
+        def start_worker(shard):
+            started.append(shard)
+            supervisor.processes[shard] = FakeProcess(len(started))
+            supervisor._started[shard] = now
+
+        monkeypatch.setattr(supervisor, 'start_worker', start_worker)
+        now = 0
+        start_worker(0)
+        delays = []
+        for _ in range(3):
+            supervisor.processes[0].alive = False
+            supervisor.check_workers(now)
+            restart_at = supervisor._restart_at[0]
+            delays.append(restart_at - now)
+            supervisor.check_workers(restart_at - 0.5)
+            assert len(started) == len(delays), (
+                'Процесс не должен перезапускаться до конца паузы.'
+            )
+            now = restart_at
+            supervisor.check_workers(now)
+        assert delays == [1, 2, 4], (
+            'Пауза перед перезапуском должна расти экспоненциально.'
+        )
+        assert metrics.snapshot()['counters'][
+            'worker_restarts_total', 'worker', '0'
+        ] == 3, 'Перезапуски должны учитываться в показателях.'
+
+    def test_combined_metrics_drop_gauges_of_dead_workers(self):
+        import metrics
+        from supervisor import Supervisor
+        metrics.reset()
+        supervisor = Supervisor(workers=2)
+        supervisor.processes = {0: FakeProcess(10), 1: FakeProcess(12)}
+        worker = {
+            'histograms': {},
+            'counters': {('errors_total', 'exception', 'RequestError'): 1},
+            'gauges': {'loop_lag_seconds': 3.0},
+        }
+        supervisor._snapshots = {
+            10: worker, 11: worker,
+            12: {**worker, 'gauges': {'loop_lag_seconds': 1.0}},
+        }
+        combined = supervisor.combined_metrics()
+        assert combined['counters'][
+            'errors_total', 'exception', 'RequestError'
+        ] == 3, (
+            'Счётчики завершившихся процессов должны сохраняться.'
+        )
+        assert combined['gauges']['loop_lag_seconds'] == 3.0
+        supervisor.processes[0] = FakeProcess(13)
+        combined = supervisor.combined_metrics()
+        assert combined['gauges']['loop_lag_seconds'] == 1.0, (
+            'Показатели завершившихся процессов должны отбрасываться.'
+        )
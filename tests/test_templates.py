@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+
+class TestTemplates:
+
+    def test_default_message_is_unchanged(self):
+        from homework import HOMEWORK_VERDICTS, render_status
+        for status, verdict in HOMEWORK_VERDICTS.items():
+            assert render_status(
+                {'homework_name': 'hw', 'status': status}
+            ) == f'Изменился статус проверки работы "hw". {verdict}', (
+                'Сообщение по умолчанию не должно меняться.'
+            )
+
+    def test_renderer_is_memoized(self):
+        from homework import TEMPLATES
+        renderer = TEMPLATES.renderer('ru', 'plain', cache_size=2)
+        first = renderer.render('hw', 'approved')
+        assert renderer.render('hw', 'approved') is first, (
+            'Повторное сообщение должно браться из кэша.'
+        )
+        renderer.render('hw2', 'approved')
+        renderer.render('hw3', 'approved')
+        assert renderer.render.cache_info().currsize == 2, (
+            'Кэш сообщений должен быть ограничен по размеру.'
+        )
+
+    def test_html_escaping(self):
+        from homework import TEMPLATES
+        message = TEMPLATES.renderer('ru', 'html').render('a<b>&c', 'approved')
+        assert '<b>a&lt;b&gt;&amp;c</b>' in message, (
+            'Название работы должно экранироваться для HTML.'
+        )
+        assert message.parse_mode == 'HTML'
+
+    def test_markdown_v2_escaping(self):
+        from homework import TEMPLATES
+        from templates import send_options
+        message = TEMPLATES.renderer('ru', 'markdown_v2').render(
+            'hw_1.py', 'approved'
+        )
+        assert '*hw\\_1\\.py*' in message, (
+            'Название работы должно экранироваться для MarkdownV2.'
+        )
+        assert message.endswith('Ура\\!'), (
+            'Текст шаблона тоже должен экранироваться для MarkdownV2.'
+        )
+        assert send_options(message) == {'parse_mode': 'MarkdownV2'}
+
+    def test_locale_from_file(self, tmp_path):
+        from templates import TemplateRegistry
+        path = tmp_path / 'templates.json'
+        path.write_text(json.dumps({
+            'de': {'message': '{homework_name}: {verdict}',
+                   'verdicts': {'approved': 'Angenommen.'}},
+        }), encoding='utf-8')
+        registry = TemplateRegistry({'ru': {
+            'message': '{homework_name} {verdict}',
+            'verdicts': {'approved': 'Принята.', 'rejected': 'Вернули.'},
+        }})
+        registry.load_file(str(path))
+        renderer = registry.renderer('de', 'plain')
+        assert renderer.render('hw', 'approved') == 'hw: Angenommen.'
+        assert renderer.render('hw', 'rejected') == 'hw: Вернули.', (
+            'Отсутствующий в локали вердикт берётся из локали по умолчанию.'
+        )
+
+    def test_unknown_format(self):
+        from exceptions import TemplateError
+        from homework import TEMPLATES
+        with pytest.raises(TemplateError):
+            TEMPLATES.renderer('ru', 'rtf')
@@ -0,0 +1,64 @@
+import requests
+
+import utils
+
+
+class TestTransport:
+
+    def test_get_without_keep_alive_uses_requests_get(self, monkeypatch):
+        import transport
+        monkeypatch.setattr(transport, 'HTTP_KEEP_ALIVE', False)
+        monkeypatch.setattr(requests, 'get', utils.MockResponseGET)
+        response = transport.get('https://example.com', params={})
+        assert isinstance(response, utils.MockResponseGET), (
+            'Без HTTP_KEEP_ALIVE запрос должен выполняться '
+            'через `requests.get`.'
+        )
+
+    def test_get_with_keep_alive_reuses_session(self, monkeypatch):
+        import transport
+        transport.configure(keep_alive=True, pool_maxsize=3)
+        try:
+            session = transport.get_session()
+            calls = []
+            monkeypatch.setattr(
+                session, 'get',
+                lambda url, **kwargs: calls.append(url) or url
+            )
+            transport.get('https://example.com/1')
+            transport.get('https://example.com/2')
+            assert transport.get_session() is session, (
+                'Убедитесь, что сессия создаётся один раз.'
+            )
+            assert calls == ['https://example.com/1',
+                             'https://example.com/2']
+            adapter = session.get_adapter('https://example.com')
+            assert adapter._pool_maxsize == 3, (
+                'Проверьте, что размер пула соединений настраивается.'
+            )
+        finally:
+            transport.configure(keep_alive=False)
+
+    def test_bot_uses_connection_pool(self):
+        import telegram
+
+        import homework
+        bot = homework.use_connection_pool(
+            telegram.Bot(token='123456:' + 'a' * 35)
+        )
+        assert bot._request._con_pool_size == homework.FANOUT.workers + 1, (
+            'Пула соединений бота должно хватать всем потокам рассылки '
+            'и опросу команд.'
+        )
+
+    def test_hedge_pool_covers_concurrency(self, monkeypatch):
+        import transport
+        monkeypatch.setattr(transport, 'HTTP_HEDGE_WORKERS', 8)
+        try:
+            transport.configure(keep_alive=False, concurrency=64)
+            assert transport.get_hedge_executor()._max_workers == 128, (
+                'Пул дублирующих запросов должен вмещать основной и '
+                'дублирующий запрос каждого потока.'
+            )
+        finally:
+            transport.configure(keep_alive=False)
@@ -0,0 +1,70 @@
+import logging
+
+import pytest
+
+
+class TestSchema:
+
+    @pytest.mark.parametrize('homework, error, key', [
+        ({'status': 'approved'}, 'HomeworkKeyError', 'homework_name'),
+        ({'homework_name': 'hw'}, 'HomeworkKeyError', 'status'),
+        ({'homework_name': 'hw', 'status': 'unknown'},
+         'StatusHomeworkError', 'unknown'),
+        ({'homework_name': 'hw', 'status': ['approved']},
+         'StatusHomeworkError', 'approved'),
+        (['hw'], 'TypeError', 'homework'),
+    ])
+    def test_homework_errors(self, homework, error, key, caplog):
+        import exceptions
+        from homework import HOMEWORK_SCHEMA
+        error = getattr(exceptions, error, TypeError)
+        with caplog.at_level(logging.ERROR):
+            with pytest.raises(error) as exc_info:
+                HOMEWORK_SCHEMA.validate(homework)
+        assert key in str(exc_info.value), (
+            'Текст ошибки должен указывать на некорректное поле.'
+        )
+        assert any(
+            record.levelno == logging.ERROR for record in caplog.records
+        ), 'Ошибка проверки должна логироваться с уровнем `ERROR`.'
+
+    def test_valid_records_are_not_logged(self, caplog):
+        from homework import HOMEWORK_SCHEMA, RESPONSE_SCHEMA
+        with caplog.at_level(logging.DEBUG):
+            RESPONSE_SCHEMA.validate({'homeworks': [], 'current_date': 1})
+            HOMEWORK_SCHEMA.validate(
+                {'homework_name': 'hw', 'status': 'approved'}
+            )
+        assert not caplog.records, (
+            'Корректные данные не должны порождать записей в журнале.'
+        )
+
+    def test_partition(self):
+        from exceptions import StatusHomeworkError
+        from homework import HOMEWORK_SCHEMA
+        records = [
+            {'homework_name': 'hw1', 'status': 'approved'},
+            {'homework_name': 'hw2', 'status': 'unknown'},
+            {'homework_name': 'hw3', 'status': 'reviewing'},
+        ]
+        valid, errors = HOMEWORK_SCHEMA.partition(records)
+        assert valid == [records[0], records[2]]
+        assert len(errors) == 1
+        assert isinstance(errors[0], StatusHomeworkError)
+
+    def test_response_not_list(self):
+        from homework import RESPONSE_SCHEMA
+        with pytest.raises(TypeError) as exc_info:
+            RESPONSE_SCHEMA.validate({'homeworks': {}})
+        assert 'не в виде списка' in str(exc_info.value)
+
+    def test_dict_subclasses_are_accepted(self):
+        from collections import OrderedDict
+
+        import homework
+        assert homework.check_response(
+            OrderedDict(homeworks=[], current_date=1)
+        ) == [], 'Подклассы dict должны проходить проверку ответа.'
+        assert 'hw' in homework.parse_status(
+            OrderedDict(homework_name='hw', status='approved')
+        ), 'Подклассы dict должны проходить проверку работы.'
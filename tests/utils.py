@@ -101,5 +101,25 @@ class MockTelegramBot:
         self.text = text
 
 
+class RecordingBot(MockTelegramBot):
+    def __init__(self, down=False, **kwargs):
+        super().__init__(**kwargs)
+        self.down = down
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        if self.down:
+            raise ConnectionError('Telegram недоступен')
+        self.sent.append((chat_id, text))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
 class BreakInfiniteLoop(Exception):
     pass
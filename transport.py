@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import threading
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
+
+import deadline
+import metrics
+from settings import env_flag, env_float, env_int
+
+if TYPE_CHECKING:
+    import requests
+    from telegram.utils.request import Request
+
+HTTP_KEEP_ALIVE = env_flag('HTTP_KEEP_ALIVE')
+HTTP_POOL_CONNECTIONS = env_int('HTTP_POOL_CONNECTIONS', 4)
+HTTP_POOL_MAXSIZE = env_int('HTTP_POOL_MAXSIZE', 64)
+TELEGRAM_POOL_SIZE = env_int('TELEGRAM_POOL_SIZE', 8)
+HTTP_CONNECT_TIMEOUT = env_float('HTTP_CONNECT_TIMEOUT', 3.05)
+HTTP_READ_TIMEOUT = env_float('HTTP_READ_TIMEOUT', 10)
+HTTP_HEDGE_AFTER = env_float('HTTP_HEDGE_AFTER', 0)
+HTTP_HEDGE_WORKERS = env_int('HTTP_HEDGE_WORKERS', 8)
+TELEGRAM_CONNECT_TIMEOUT = env_float('TELEGRAM_CONNECT_TIMEOUT', 3.05)
+TELEGRAM_TIMEOUT = env_float('TELEGRAM_TIMEOUT', 10)
+# Отправка сообщения не пропускается и после исчерпания бюджета
+# цикла, иначе уведомление о статусе будет потеряно.
+TELEGRAM_MIN_TIMEOUT = 1
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_hedge_executor: Optional[ThreadPoolExecutor] = None
+
+
+def configure(keep_alive: bool = True,
+              pool_connections: Optional[int] = None,
+              pool_maxsize: Optional[int] = None,
+              concurrency: Optional[int] = None) -> None:
+    """Включает общую сессию и задаёт размеры пула соединений.
+
+    `concurrency` — сколько потоков одновременно выполняют запросы.
+    Каждый из них может занять в пуле дублирующих запросов два потока,
+    поэтому пул расширяется до удвоенного числа, иначе запросы ждали
+    бы в его очереди и сами считались бы медленными.
+    """
+    global HTTP_KEEP_ALIVE, HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE
+    global HTTP_HEDGE_WORKERS, _hedge_executor
+    HTTP_KEEP_ALIVE = keep_alive
+    if pool_connections is not None:
+        HTTP_POOL_CONNECTIONS = pool_connections
+    if pool_maxsize is not None:
+        HTTP_POOL_MAXSIZE = pool_maxsize
+    if concurrency is not None and HTTP_HEDGE_WORKERS < 2 * concurrency:
+        HTTP_HEDGE_WORKERS = 2 * concurrency
+        with _session_lock:
+            executor, _hedge_executor = _hedge_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+    close()
+
+
+def get_session() -> requests.Session:
+    """Возвращает общую сессию с пулом постоянных соединений."""
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def http_timeout() -> Tuple[float, float]:
+    """Возвращает таймауты соединения и чтения с учётом бюджета цикла."""
+    deadline.check('запрос к API')
+    return (
+        deadline.timeout(HTTP_CONNECT_TIMEOUT),
+        deadline.timeout(HTTP_READ_TIMEOUT),
+    )
+
+
+def telegram_timeout() -> float:
+    """Возвращает таймаут ответа Telegram с учётом бюджета цикла."""
+    return deadline.timeout(TELEGRAM_TIMEOUT, TELEGRAM_MIN_TIMEOUT)
+
+
+def always_admit() -> bool:
+    """Разрешает дублирующий запрос без ограничений."""
+    return True
+
+
+def get(url: str, admit_hedge: Callable[[], bool] = always_admit,
+        **kwargs) -> requests.Response:
+    """Выполняет GET-запрос с таймаутами через общую сессию.
+
+    Без HTTP_KEEP_ALIVE запрос уходит через `requests.get`,
+    который открывает новое соединение на каждый вызов. С
+    HTTP_HEDGE_AFTER обычный запрос дублируется, если не получил
+    ответа за это время и `admit_hedge` разрешает ещё один запрос.
+    """
+    kwargs.setdefault('timeout', http_timeout())
+    if HTTP_HEDGE_AFTER and not kwargs.get('stream'):
+        return hedged_get(url, HTTP_HEDGE_AFTER, admit_hedge, **kwargs)
+    return send_get(url, **kwargs)
+
+
+def send_get(url: str, **kwargs) -> requests.Response:
+    """Отправляет один GET-запрос."""
+    if HTTP_KEEP_ALIVE:
+        return get_session().get(url, **kwargs)
+    import requests
+
+    return requests.get(url, **kwargs)
+
+
+def hedged_get(url: str, hedge_after: float,
+               admit: Callable[[], bool] = always_admit,
+               **kwargs) -> requests.Response:
+    """Дублирует медленный запрос и возвращает первый полученный ответ.
+
+    Если за `hedge_after` секунд ответа нет, отправляется второй
+    такой же запрос — только если `admit` разрешает его сразу, иначе
+    дожидается первый. Ответ опоздавшего запроса закрывается, когда он
+    придёт. Ошибка возвращается, только если не удались оба запроса.
+    """
+    executor = get_hedge_executor()
+    primary = executor.submit(send_get, url, **kwargs)
+    done, _ = wait([primary], timeout=hedge_after)
+    if done:
+        return primary.result()
+    if not admit():
+        metrics.increment('hedged_requests_total', 'skipped',
+                          label_name='kind')
+        return primary.result()
+    metrics.increment('hedged_requests_total', 'sent', label_name='kind')
+    pending = {primary, executor.submit(send_get, url, **kwargs)}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is not primary:
+                    metrics.increment('hedged_requests_total', 'won',
+                                      label_name='kind')
+                for late in pending:
+                    late.add_done_callback(close_response)
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def close_response(future) -> None:
+    """Закрывает ответ опоздавшего запроса."""
+    if future.exception() is None:
+        future.result().close()
+
+
+def get_hedge_executor() -> ThreadPoolExecutor:
+    """Возвращает пул потоков для дублирующих запросов."""
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _session_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=HTTP_HEDGE_WORKERS,
+                    thread_name_prefix='hedge',
+                )
+    return _hedge_executor
+
+
+def telegram_request(con_pool_size: Optional[int] = None) -> Request:
+    """Создаёт транспорт Telegram бота с пулом постоянных соединений."""
+    from telegram.utils.request import Request
+
+    return Request(
+        con_pool_size=con_pool_size or TELEGRAM_POOL_SIZE,
+        connect_timeout=TELEGRAM_CONNECT_TIMEOUT,
+        read_timeout=TELEGRAM_TIMEOUT,
+    )
+
+
+def is_telegram_outage(error: Exception) -> bool:
+    """Проверяет, что ошибка отправки вызвана недоступностью Telegram.
+
+    Отказы в конкретном чате (`BadRequest`, `Unauthorized`) говорят
+    о том, что сервис отвечает, и сбоем не считаются.
+    """
+    from telegram.error import BadRequest, NetworkError, RetryAfter
+
+    return (
+        isinstance(error, (NetworkError, RetryAfter))
+        and not isinstance(error, BadRequest)
+    )
+
+
+def close() -> None:
+    """Закрывает общую сессию и её соединения."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,109 @@
+import logging
+from typing import Any, Callable, Iterable, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger('homework_bot.validation')
+
+TYPE_NAMES = {list: 'списка', dict: 'словаря', str: 'строки', int: 'числа'}
+
+
+class Schema:
+    """Описание обязательных полей записи ответа API.
+
+    Правило поля: `None` — поле только должно присутствовать, тип —
+    значение должно быть этого типа, множество — значение должно
+    входить в множество. По описанию один раз собирается функция
+    проверки без ветвлений и исключений на корректных данных; текст
+    ошибки строится и логируется только для некорректной записи.
+    """
+
+    def __init__(self, name: str, fields: Mapping[str, Any],
+                 missing_error: type = KeyError,
+                 value_error: type = ValueError,
+                 value_message: str = "Неожиданное значение {key}: '{value}'."
+                 ) -> None:
+        """Собирает функцию проверки по описанию полей."""
+        self.name = name
+        self.fields = dict(fields)
+        self.missing_error = missing_error
+        self.value_error = value_error
+        self.value_message = value_message
+        self.is_valid = self._compile()
+
+    def _compile(self) -> Callable[[Any], bool]:
+        namespace = {}
+        checks = ['isinstance(record, dict)']
+        for index, (key, rule) in enumerate(self.fields.items()):
+            namespace[f'rule{index}'] = rule
+            if rule is None:
+                checks.append(f'{key!r} in record')
+            elif isinstance(rule, type):
+                checks.append(f'isinstance(record.get({key!r}), rule{index})')
+            else:
+                checks.append(f'record.get({key!r}) in rule{index}')
+        source = (
+            'def is_valid(record):\n'
+            '    try:\n'
+            f'        return {" and ".join(checks)}\n'
+            '    except TypeError:\n'
+            '        return False\n'
+        )
+        exec(source, namespace)
+        return namespace['is_valid']
+
+    def error(self, record: Any) -> Exception:
+        """Строит и логирует исключение для некорректной записи."""
+        error = self._describe(record)
+        logger.error('Сбой в работе программы: %s', error)
+        return error
+
+    def _describe(self, record: Any) -> Exception:
+        if not isinstance(record, dict):
+            return TypeError(f"Полученные данные '{self.name}' "
+                             'не в виде словаря.')
+        for key, rule in self.fields.items():
+            if key not in record:
+                return self.missing_error(
+                    f"Отсутвует ожидаемый ключ '{key}'."
+                )
+            value = record[key]
+            if rule is None:
+                continue
+            if isinstance(rule, type):
+                if not isinstance(value, rule):
+                    return TypeError(
+                        f"Полученные данные под ключом '{key}' "
+                        f'не в виде {TYPE_NAMES.get(rule, rule.__name__)}.'
+                    )
+                continue
+            try:
+                allowed = value in rule
+            except TypeError:
+                allowed = False
+            if not allowed:
+                return self.value_error(
+                    self.value_message.format(key=key, value=value)
+                )
+        return ValueError(f"Некорректные данные '{self.name}'.")
+
+    def validate(self, record: Any) -> None:
+        """Проверяет одну запись и выбрасывает исключение при ошибке."""
+        if not self.is_valid(record):
+            raise self.error(record)
+
+    def partition(self, records: Iterable[Any],
+                  ) -> Tuple[List[Any], List[Exception]]:
+        """Проверяет пакет записей за один проход.
+
+        Возвращает корректные записи и исключения для остальных.
+        """
+        is_valid = self.is_valid
+        valid = []
+        errors: Optional[List[Exception]] = None
+        for record in records:
+            if is_valid(record):
+                valid.append(record)
+                continue
+            if errors is None:
+                errors = []
+            errors.append(self.error(record))
+        return valid, errors or []